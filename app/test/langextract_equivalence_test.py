@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- encoding utf-8 -*-
+
+"""
+langextract 等价性测试与基准
+
+把当前 app/utils/langextract 的分词、句子范围、分块、精确/模糊对齐、多轮合并和
+输出解析结果，与某个 git 版本中的实现逐条比较，并打印两边各部分被测调用的耗时。
+默认的参考版本是中文按字分词之后、性能重写之前的提交，其后的改动都应保持结果不变。
+
+两个版本各在一个子进程里运行，对同一批确定的语料（本目录的测试文本加上固定
+种子的随机文本）逐条计算摘要，主进程比较摘要并报告第一处不同。
+
+用法（在仓库任意目录下）:
+    python app/test/langextract_equivalence_test.py
+    python app/test/langextract_equivalence_test.py --ref <git 版本>
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+# 中文按字分词（有意改变了分词结果）之后、分词/分块/对齐/解析性能重写之前的版本
+DEFAULT_REF = "a05c0daea433b7a38ab0c1d43e7362beeb3f5983"
+UTILS_DIR = os.path.join(os.path.dirname(TEST_DIR), "utils")
+
+# 随机文本的组成片段：中英文、缩写、数字、斜杠缩写、各种换行和标点
+PIECES = [
+    "Dr.", "Smith", " ", "went", ".", "\n", "\n\n", "Hello", "world", "!", "?",
+    "。", "患者", "出现", "发热", "；", "”", " ", "the", "U.S.", "A", "b", "3.5",
+    "\r\n", "\r", "  ", "(", ")", "x.", " Mr. ", "Big", "b/c", "42", "é", "😀",
+    "𠀋", "Ｆｕｌｌ", "苏某，", "中共党员。", "“民主”。",
+]
+ENGLISH = (
+    "Dr. Smith met Ms. Jones at 5 pm.\nThey discussed the cats and dogs. "
+    "Patient takes aspirin 100mg daily! Is it OK? Yes.\r\n"
+    "The committee reviewed 3/4 of the U.S. report; a fine of 500,000 yuan "
+    "was imposed.\n\n"
+)
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(repr(value).encode("utf-8")).hexdigest()[:16]
+
+
+def _corpus() -> list[tuple[str, str]]:
+    """返回 (名称, 文本) 列表：测试文本、英文样例和固定种子的随机文本。"""
+    sys.path.insert(0, TEST_DIR)
+    import temp_text
+
+    texts = [
+        ("test.txt", open(os.path.join(TEST_DIR, "test.txt"), encoding="utf-8").read()),
+        ("test2.txt", open(os.path.join(TEST_DIR, "test2.txt"), encoding="utf-8").read()),
+        ("temp_text.text1", temp_text.text1),
+        ("temp_text.text2", temp_text.text2),
+        ("english", ENGLISH * 5),
+        ("empty", ""),
+    ]
+    rng = random.Random(0)
+    for i in range(3000):
+        texts.append(
+            (f"random[{i}]", "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 40))))
+        )
+    return texts
+
+
+def _big_text() -> str:
+    """约 1.3M 字符的中英混合文本，用于基准。"""
+    sys.path.insert(0, TEST_DIR)
+    import temp_text
+
+    return ((temp_text.text1 + temp_text.text2) * 2 + ENGLISH * 20) * 120
+
+
+def _run_sections() -> dict:
+    """在当前 sys.path 上的 langextract 中计算各部分的逐条摘要和耗时。"""
+    from langextract import annotation, chunking, data, resolver, tokenizer
+
+    sections = {}
+
+    def section(name, cases):
+        """cases 逐条给出 (名称, 被测调用, 结果转为可比较值的函数)，只计被测调用的耗时。"""
+        seconds = 0.0
+        labels, digests = [], []
+        for label, run, key in cases:
+            start = time.perf_counter()
+            result = run()
+            seconds += time.perf_counter() - start
+            labels.append(label)
+            digests.append(_digest(key(result)))
+        sections[name] = {"labels": labels, "digests": digests, "seconds": seconds}
+
+    corpus = _corpus()
+    big = _big_text()
+
+    # 分词：每个词元的类型、字符区间和是否紧跟换行
+    def token_key(tokenized_text):
+        return [
+            (t.index, int(t.token_type), t.char_interval.start_pos,
+             t.char_interval.end_pos, t.first_token_after_newline)
+            for t in tokenized_text.tokens
+        ]
+
+    def tokenize_cases():
+        for name, text in corpus:
+            yield name, lambda text=text: tokenizer.tokenize(text), token_key
+
+    section("tokenize", tokenize_cases())
+    section(
+        "tokenize (1.3M chars)",
+        [("big", lambda: tokenizer.tokenize(big), token_key)],
+    )
+    tokenized = {name: tokenizer.tokenize(text) for name, text in corpus}
+    big_tokenized = tokenizer.tokenize(big)
+
+    # 句子范围：每个词元作为起点时的句子区间
+    def sentence_cases():
+        for name, text in corpus:
+            if len(text) > 2000:
+                continue
+            tokens = tokenized[name].tokens
+            yield name, lambda text=text, tokens=tokens: [
+                tokenizer.find_sentence_range(text, tokens, i)
+                for i in range(len(tokens))
+            ], lambda ranges: [(r.start_index, r.end_index) for r in ranges]
+
+    section("sentences", sentence_cases())
+
+    # 分块：各缓冲区大小下每块的词元区间、字符区间和文本
+    def chunk_key(chunks):
+        return [
+            (c.token_interval.start_index, c.token_interval.end_index,
+             c.char_interval.start_pos, c.char_interval.end_pos, c.chunk_text)
+            for c in chunks
+        ]
+
+    def chunk_cases():
+        for name, text in corpus[:5] + corpus[6:400]:
+            for buffer in (1, 10, 50, 100, 300, 1000, 10000):
+                yield f"{name} max_char_buffer={buffer}", (
+                    lambda name=name, buffer=buffer: list(
+                        chunking.ChunkIterator(tokenized[name], buffer)
+                    )
+                ), chunk_key
+
+    section("chunks", chunk_cases())
+    section(
+        "chunks (1.3M chars, max_char_buffer=1000)",
+        [("big", lambda: list(chunking.ChunkIterator(big_tokenized, 1000)), chunk_key)],
+    )
+
+    # 对齐：按块构造精确、缺词、多词和无法匹配的抽取
+    def aligned_key(extractions):
+        return [
+            (e.extraction_text, e.alignment_status and e.alignment_status.value,
+             e.token_interval and (e.token_interval.start_index, e.token_interval.end_index),
+             e.char_interval and (e.char_interval.start_pos, e.char_interval.end_pos))
+            for e in extractions
+        ]
+
+    rng = random.Random(4)
+    align_inputs = []
+    # 旧的模糊对齐在中文长块上很慢，中文块取得较小
+    for name, buffer in (("test2.txt", 100), ("english", 120), ("temp_text.text1", 150)):
+        joiner = " " if name == "english" else ""
+        for index, chunk in enumerate(chunking.ChunkIterator(tokenized[name], buffer)):
+            words = [
+                chunk.chunk_text[t.char_interval.start_pos:t.char_interval.end_pos]
+                for t in tokenizer.tokenize(chunk.chunk_text).tokens
+            ]
+            if not words:
+                continue
+            texts = []
+            for _ in range(6):
+                i = rng.randrange(len(words))
+                span = words[i:i + rng.randint(1, 6)]
+                if rng.random() < 0.3 and len(span) > 2:
+                    span = span[:1] + span[2:] + ["zz"]
+                texts.append(joiner.join(span))
+            texts.append("zzqq unmatched text")
+            align_inputs.append((f"{name} chunk {index}", chunk, texts))
+
+    # 模糊对齐的窗口默认有上限，与参考版本比较时不设上限
+    uncapped = {}
+    if "fuzzy_alignment_max_window" in inspect.signature(resolver.Resolver.align).parameters:
+        uncapped = dict(fuzzy_alignment_max_window=sys.maxsize)
+
+    def align_cases(view):
+        for label, chunk, texts in align_inputs:
+            extractions = [data.Extraction("k", t) for t in texts]
+            kwargs = dict(uncapped)
+            if view:
+                kwargs.update(
+                    tokenized_text=chunk.document_text,
+                    token_interval=chunk.token_interval,
+                )
+            yield label, lambda extractions=extractions, chunk=chunk, kwargs=kwargs: list(
+                resolver.Resolver(fence_output=False).align(
+                    extractions,
+                    chunk.chunk_text,
+                    chunk.token_interval.start_index,
+                    chunk.char_interval.start_pos,
+                    **kwargs,
+                )
+            ), aligned_key
+
+    section("align", align_cases(view=False))
+    if "tokenized_text" in inspect.signature(resolver.Resolver.align).parameters:
+        # 复用文档词元的对齐应与重新分词的对齐一致，和参考版本的 align 比较
+        section("align (document tokens)", align_cases(view=True))
+
+    # 模糊对齐：小词表上的随机源文本和抽取，覆盖各种阈值
+    def fuzzy_cases():
+        rng = random.Random(3)
+        vocab = "a b c d e f cats cat x y".split()
+        for i in range(3000):
+            source = " ".join(
+                rng.choice(vocab[:rng.randint(2, 10)]) for _ in range(rng.randint(1, 25))
+            )
+            extraction = " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 6)))
+            threshold = rng.choice([0.0, 0.3, 0.5, 0.75, 0.8, 1.0])
+            yield f"fuzzy[{i}]", lambda source=source, extraction=extraction, threshold=threshold: list(
+                resolver.Resolver(fence_output=False).align(
+                    [data.Extraction("c", extraction)],
+                    source,
+                    0,
+                    0,
+                    fuzzy_alignment_threshold=threshold,
+                    accept_match_lesser=False,
+                    **uncapped,
+                )
+            ), aligned_key
+
+    section("fuzzy align", fuzzy_cases())
+
+    # 多轮合并：随机区间（含零长度和未对齐），先出现的轮次优先
+    def make_passes(rng, passes, per_pass, span):
+        result = []
+        for p in range(passes):
+            extractions = []
+            for i in range(per_pass):
+                extraction = data.Extraction("k", f"p{p}e{i}")
+                if rng.random() > 0.05:
+                    start = rng.randrange(span)
+                    extraction.char_interval = data.CharInterval(
+                        start_pos=start, end_pos=start + rng.randint(0, 20)
+                    )
+                extractions.append(extraction)
+            result.append(extractions)
+        return result
+
+    def merge_key(extractions):
+        return [e.extraction_text for e in extractions]
+
+    def merge_cases():
+        rng = random.Random(10)
+        for i in range(3000):
+            passes = make_passes(rng, rng.randint(1, 4), rng.randint(0, 30), 200)
+            yield f"merge[{i}]", lambda passes=passes: (
+                annotation._merge_non_overlapping_extractions(passes)
+            ), merge_key
+
+    section("merge", merge_cases())
+    big_passes = make_passes(random.Random(11), 3, 2000, 100000)
+    section(
+        "merge (2000 extractions x 3 passes)",
+        [("big", lambda: annotation._merge_non_overlapping_extractions(big_passes), merge_key)],
+    )
+
+    # 解析：随机抽取以 JSON/YAML、带或不带代码块输出后的解析结果
+    def resolve_cases():
+        import yaml
+
+        rng = random.Random(25)
+        values = [
+            "苏某", "person number 7", "O'Brien \"quoted\"", "line\nbreak", "",
+            "123456789012345678901234567890", "3.14", "yes", "null", "😀",
+        ]
+        for i in range(2000):
+            items = []
+            for j in range(rng.randint(0, 8)):
+                item = {}
+                for cls in rng.sample(["人员", "person", "amount"], rng.randint(1, 2)):
+                    item[cls] = rng.choice(values + [rng.randint(-10, 10**20), 1.5])
+                    item[f"{cls}_index"] = rng.choice([j, str(j), j + 1])
+                    if rng.random() < 0.5:
+                        item[f"{cls}_attributes"] = {
+                            "n": rng.randint(0, 10**20), "note": rng.choice(values)
+                        }
+                items.append(item)
+            format_type = rng.choice([data.FormatType.JSON, data.FormatType.YAML])
+            fence = rng.random() < 0.5
+            if format_type == data.FormatType.JSON:
+                body = json.dumps({"extractions": items}, ensure_ascii=rng.random() < 0.5)
+                output = f"```json\n{body}\n```" if fence else body
+            else:
+                body = yaml.safe_dump({"extractions": items}, allow_unicode=True)
+                output = f"```yaml\n{body}\n```" if fence else body
+            yield f"resolve[{i}] {format_type.value} fence={fence}", (
+                lambda output=output, fence=fence, format_type=format_type: resolve(
+                    output, fence, format_type
+                )
+            ), resolved_key
+
+    def resolve(output, fence, format_type):
+        try:
+            return resolver.Resolver(
+                fence_output=fence, format_type=format_type
+            ).resolve(output)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return e
+
+    def resolved_key(extractions):
+        if isinstance(extractions, Exception):
+            return type(extractions).__name__
+        return [
+            (e.extraction_class, e.extraction_text, e.extraction_index,
+             e.group_index, e.attributes)
+            for e in extractions
+        ]
+
+    section("resolve", resolve_cases())
+    return sections
+
+
+def _export_ref(ref: str, target: str) -> str:
+    """把 ref 版本的 langextract 解压到 target，返回其中的 utils 目录。"""
+    top = subprocess.check_output(
+        ["git", "rev-parse", "--show-toplevel"], cwd=TEST_DIR, text=True
+    ).strip()
+    package = os.path.relpath(os.path.join(UTILS_DIR, "langextract"), top)
+    archive = subprocess.run(
+        ["git", "archive", ref, package], cwd=top, check=True, capture_output=True
+    ).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+    return os.path.join(target, os.path.dirname(package))
+
+
+def _run_worker(utils_dir: str, out: str) -> dict:
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", utils_dir, out],
+        check=True,
+    )
+    with open(out, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ref", default=DEFAULT_REF, help=f"参考的 git 版本，默认 {DEFAULT_REF[:7]}")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        utils_dir, out = args.worker
+        sys.path.insert(0, utils_dir)
+        from absl import logging
+
+        logging.set_verbosity(logging.FATAL)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(_run_sections(), f)
+        return
+
+    ref = args.ref
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"参考版本 {ref}，计算中……")
+        expected = _run_worker(_export_ref(ref, tmp), os.path.join(tmp, "ref.json"))
+        actual = _run_worker(UTILS_DIR, os.path.join(tmp, "current.json"))
+
+    failed = False
+    for name, result in actual.items():
+        # 复用文档词元的对齐与参考版本的普通对齐比较
+        ref_result = expected.get(name) or expected.get(name.split(" (")[0])
+        if ref_result is None or ref_result["labels"] != result["labels"]:
+            print(f"{name}: 参考版本没有对应的用例，跳过")
+            continue
+        mismatches = [
+            label
+            for label, a, b in zip(result["labels"], ref_result["digests"], result["digests"])
+            if a != b
+        ]
+        print(
+            f"{name}: {len(result['labels'])} 个用例, "
+            f"{'全部一致' if not mismatches else f'{len(mismatches)} 个不一致'}; "
+            f"参考 {ref_result['seconds']:.2f}s, 当前 {result['seconds']:.2f}s"
+        )
+        if mismatches:
+            failed = True
+            print("    不一致的用例:", ", ".join(mismatches[:5]))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
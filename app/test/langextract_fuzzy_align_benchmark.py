@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- encoding utf-8 -*-
+
+"""
+langextract 模糊对齐基准
+
+在中文块上比较某个 git 版本（默认与等价性测试相同，即模糊对齐重写之前）和当前
+app/utils/langextract 的模糊对齐耗时。当前版本分别按默认窗口上限（抽取词元数的
+4 倍）和不设上限运行，并报告两者的结果是否与参考版本一致。不设上限时应全部一致；
+默认上限只在参考版本选中的窗口超过上限时不同，这时参考版本给十几个字的抽取对齐到
+上百字的区间，默认上限则对齐到抽取附近的短区间。
+
+用例都经过 Resolver.align，抽取在块中没有精确匹配，只走模糊对齐:
+
+- test2.txt 的 300 字块，每块 5 个打乱或改字后的片段
+- 小字母表随机文本上的 8 字抽取
+- 抽取的字只以逆序重复出现的文本，SequenceMatcher 在长窗口上也达不到阈值，
+  不设上限时要给大量长窗口打分
+
+参考版本逐个扫描所有窗口，只跑 300 字的用例；1000 字的用例只跑当前版本。
+
+用法（在仓库任意目录下）:
+    python app/test/langextract_fuzzy_align_benchmark.py
+    python app/test/langextract_fuzzy_align_benchmark.py --ref <git 版本>
+"""
+import argparse
+import inspect
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TEST_DIR)
+
+from langextract_equivalence_test import DEFAULT_REF, UTILS_DIR, _digest, _export_ref
+
+# 参考版本只跑不超过这个长度的块
+REF_MAX_CHARS = 300
+ALPHABET = "的一是在不了有和人这"
+
+
+def _reversed_runs(rng, extraction, length):
+    """抽取的字逆序重复出现，偶尔打乱，中间夹杂无关的字。"""
+    chars = []
+    while len(chars) < length:
+        run = list(reversed(extraction))
+        if rng.random() < 0.2:
+            rng.shuffle(run)
+        chars += run + [rng.choice("人这")]
+    return "".join(chars[:length])
+
+
+def _cases() -> list[tuple[str, str, list[str]]]:
+    """返回 (名称, 块文本, 抽取文本列表)。"""
+    rng = random.Random(0)
+    text = "".join(open(os.path.join(TEST_DIR, "test2.txt"), encoding="utf-8").read().split())
+    cases = []
+    for i in range(5):
+        chunk = text[i * 600 : i * 600 + 300]
+        extractions = []
+        for _ in range(5):
+            start = rng.randrange(len(chunk) - 12)
+            span = list(chunk[start : start + 12])
+            # 交换两个字并改掉一个字，使其没有精确匹配
+            a, b = rng.sample(range(12), 2)
+            span[a], span[b] = span[b], span[a]
+            span[rng.randrange(12)] = "某"
+            extractions.append("".join(span))
+        cases.append((f"test2.txt 300 字块 {i}", chunk, extractions))
+    for length in (300, 1000):
+        chunk = "".join(rng.choice(ALPHABET) for _ in range(length))
+        cases.append((f"随机 {length} 字", chunk, ["的一是在不了有和", "在是一的在是一的"]))
+        extraction = "的一是在不了有和"
+        cases.append((f"逆序重复 {length} 字", _reversed_runs(rng, extraction, length), [extraction]))
+    return cases
+
+
+def _run_cases() -> dict:
+    """在当前 sys.path 上的 langextract 中对齐各用例，返回各方式的耗时和结果摘要。"""
+    from langextract import data, resolver
+
+    variants = {"参考": {}}
+    if "fuzzy_alignment_max_window" in inspect.signature(resolver.Resolver.align).parameters:
+        variants = {"默认上限": {}, "不设上限": {"fuzzy_alignment_max_window": sys.maxsize}}
+    results = {}
+    for name, chunk, texts in _cases():
+        if "参考" in variants and len(chunk) > REF_MAX_CHARS:
+            continue
+        results[name] = {}
+        for variant, kwargs in variants.items():
+            extractions = [data.Extraction("k", t) for t in texts]
+            start = time.perf_counter()
+            aligned = list(
+                resolver.Resolver(fence_output=False).align(
+                    extractions, chunk, 0, 0, accept_match_lesser=False, **kwargs
+                )
+            )
+            seconds = time.perf_counter() - start
+            key = [
+                (e.char_interval and (e.char_interval.start_pos, e.char_interval.end_pos),
+                 e.alignment_status and e.alignment_status.value)
+                for e in aligned
+            ]
+            results[name][variant] = {"seconds": seconds, "digest": _digest(key)}
+    return results
+
+
+def _run_worker(utils_dir: str, out: str) -> dict:
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", utils_dir, out],
+        check=True,
+    )
+    with open(out, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ref", default=DEFAULT_REF, help=f"参考的 git 版本，默认 {DEFAULT_REF[:7]}")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        utils_dir, out = args.worker
+        sys.path.insert(0, utils_dir)
+        from absl import logging
+
+        logging.set_verbosity(logging.FATAL)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(_run_cases(), f)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"参考版本 {args.ref}，计算中……")
+        expected = _run_worker(_export_ref(args.ref, tmp), os.path.join(tmp, "ref.json"))
+        actual = _run_worker(UTILS_DIR, os.path.join(tmp, "current.json"))
+
+    for name, variants in actual.items():
+        ref = expected.get(name, {}).get("参考")
+        parts = [f"参考 {ref['seconds']:.3f}s" if ref else "参考 跳过"]
+        for variant, result in variants.items():
+            part = f"{variant} {result['seconds']:.3f}s"
+            if ref:
+                part += " 结果一致" if result["digest"] == ref["digest"] else " 结果不同"
+            parts.append(part)
+        print(f"{name}: " + ", ".join(parts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- encoding utf-8 -*-
+
+"""
+langextract 本地替身服务测试
+
+在本机启动一个兼容 OpenAI chat/completions 接口（含 SSE 流式输出）的替身服务，
+它按固定延迟返回提示中问题部分出现的人名和 "person number N"，用来检查
+CustomAPIModel 及其上层的并发、流式、异步和负载均衡行为，并打印耗时:
+
+- CustomAPIModel.infer 按 max_workers 并发，结果保持提示顺序
+- lx.extract 与 lx.extract_stream 的抽取结果一致，流式的首个抽取更早到达
+- 同一块中重复出现的名字，流式对齐与 annotate_text 一致
+- 提前停止流式读取时，未读完的响应会被及时关闭
+- 长时间的流式读取不会被限流器当作延迟尖峰而降低并发上限
+- lx.extract_async 与 lx.extract 结果一致，且不长时间阻塞事件循环
+- 负载均衡池中失败的后端会被切换掉
+
+用法（在仓库任意目录下）:
+    python app/test/langextract_stand_in_server_test.py
+"""
+import asyncio
+import http.server
+import json
+import os
+import re
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils"))
+
+from absl import logging
+
+import langextract as lx
+from langextract import annotation, data, inference, load_balancing, prompting, rate_limit, resolver
+
+logging.set_verbosity(logging.ERROR)
+
+# 每次请求的延迟，流式时为每个片段的间隔
+LATENCY = 0.2
+PIECE_INTERVAL = 0.005
+MENTION_PATTERN = re.compile(r"person number \d+|\b(?:Alice|Bob|Carol|Dave)\b")
+
+
+class StandInState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.open_streams = 0
+
+
+state = StandInState()
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with state.lock:
+            state.requests += 1
+        if self.path.startswith("/fail"):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        prompt = body["messages"][0]["content"]
+        # 只抽取最后一个问题部分，跳过提示中的示例
+        question = prompt.rsplit("Q:", 1)[-1]
+        if prompt.startswith("echo:"):
+            text = prompt.upper()
+        else:
+            items = [{"person": m.group()} for m in MENTION_PATTERN.finditer(question)]
+            text = json.dumps({"extractions": items}, indent=1)
+        if not body.get("stream"):
+            time.sleep(LATENCY)
+            out = json.dumps({"choices": [{"message": {"content": text}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        with state.lock:
+            state.open_streams += 1
+        try:
+            for i in range(0, len(text), 8):
+                event = {"choices": [{"delta": {"content": text[i:i + 8]}}]}
+                self.wfile.write(b"data: " + json.dumps(event).encode() + b"\n\n")
+                self.wfile.flush()
+                time.sleep(PIECE_INTERVAL)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with state.lock:
+                state.open_streams -= 1
+            self.close_connection = True
+
+
+class StandInServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+server = StandInServer(("127.0.0.1", 0), StandInHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+API_URL = BASE_URL + "/v1/chat/completions"
+
+TEXT = " ".join(f"Alice met person number {i} today." for i in range(400))
+EXAMPLES = [
+    data.ExampleData(
+        text="Alice met person number 7.",
+        extractions=[data.Extraction(extraction_class="person", extraction_text="person number 7")],
+    )
+]
+EXTRACT_KWARGS = dict(
+    prompt_description="people",
+    examples=EXAMPLES,
+    model_id="stand-in",
+    api_key="key",
+    language_model_type=inference.CustomAPIModel,
+    language_model_params={"api_url": API_URL},
+    use_schema_constraints=False,
+    fence_output=False,
+    max_char_buffer=2000,
+    max_workers=8,
+)
+
+
+def make_resolver():
+    # 替身服务返回的抽取不带 _index 字段
+    return resolver.Resolver(
+        format_type=data.FormatType.JSON, fence_output=False, extraction_index_suffix=None
+    )
+
+
+def extraction_key(extraction):
+    return (
+        extraction.extraction_class,
+        extraction.extraction_text,
+        extraction.char_interval and extraction.char_interval.start_pos,
+        extraction.alignment_status,
+    )
+
+
+def test_concurrent_infer():
+    """CustomAPIModel.infer 按 max_workers 并发，结果保持提示顺序。"""
+    prompts = [f"echo: prompt {i}" for i in range(10)]
+    for max_workers in (1, 5, 10):
+        model = inference.CustomAPIModel(
+            model_id="stand-in", api_key="key", api_url=API_URL, max_workers=max_workers
+        )
+        start = time.perf_counter()
+        outputs = [output[0].output for output in model.infer(prompts)]
+        elapsed = time.perf_counter() - start
+        model.close()
+        assert outputs == [p.upper() for p in prompts], outputs
+        print(f"infer 10 个提示, max_workers={max_workers}: {elapsed:.2f}s")
+
+
+def test_extract_stream():
+    """lx.extract_stream 与 lx.extract 的抽取结果一致。"""
+    start = time.perf_counter()
+    document = lx.extract(TEXT, debug=False, batch_length=8, **EXTRACT_KWARGS)
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    first = None
+    streamed = []
+    for extraction in lx.extract_stream(TEXT, **EXTRACT_KWARGS):
+        if first is None:
+            first = time.perf_counter() - start
+        streamed.append(extraction)
+    stream_seconds = time.perf_counter() - start
+    assert sorted(map(extraction_key, streamed), key=str) == sorted(
+        map(extraction_key, document.extractions), key=str
+    )
+    print(
+        f"extract: {len(document.extractions)} 个抽取 {batch_seconds:.2f}s; "
+        f"extract_stream: 首个 {first:.3f}s, 全部 {stream_seconds:.2f}s, 结果一致"
+    )
+
+
+def test_stream_repeated_mentions():
+    """同一块中重复出现的名字，流式对齐结果与 annotate_text 一致。"""
+    names = ["Carol", "Bob", "Alice", "Dave"]
+    text = " ".join(
+        f"{names[i % 4]} paid {names[(i * 3 + 1) % 4]} {i} dollars." for i in range(300)
+    )
+    annotator = annotation.Annotator(
+        inference.CustomAPIModel(model_id="stand-in", api_key="key", api_url=API_URL),
+        prompting.PromptTemplateStructured(description="people"),
+        format_type=data.FormatType.JSON,
+        fence_output=False,
+    )
+    for max_char_buffer in (500, 100000):
+        batch = annotator.annotate_text(
+            text, make_resolver(), max_char_buffer=max_char_buffer, debug=False
+        )
+        streamed = list(
+            annotator.annotate_text_stream(
+                text, make_resolver(), max_char_buffer=max_char_buffer, max_concurrency=4
+            )
+        )
+        assert sorted(map(extraction_key, streamed), key=str) == sorted(
+            map(extraction_key, batch.extractions), key=str
+        ), max_char_buffer
+        print(f"重复名字 max_char_buffer={max_char_buffer}: {len(streamed)} 个抽取, 流式与批量一致")
+
+
+def test_stream_stop():
+    """提前停止流式读取时，未读完的响应会被及时关闭。"""
+    annotator = annotation.Annotator(
+        inference.CustomAPIModel(model_id="stand-in", api_key="key", api_url=API_URL),
+        prompting.PromptTemplateStructured(description="people"),
+        format_type=data.FormatType.JSON,
+    )
+    stream = annotator.annotate_text_stream(
+        TEXT,
+        make_resolver(),
+        max_char_buffer=2000,
+        max_concurrency=3,
+    )
+    requests_before = state.requests
+    next(stream)
+    stream.close()
+    start = time.perf_counter()
+    while state.open_streams and time.perf_counter() - start < 5:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    assert state.open_streams == 0 and elapsed < 1, (state.open_streams, elapsed)
+    assert state.requests - requests_before <= 3, state.requests - requests_before
+    print(
+        f"停止流式读取: 共发出 {state.requests - requests_before} 个请求, "
+        f"{elapsed:.2f}s 后全部关闭"
+    )
+
+
+def test_extract_async():
+    """lx.extract_async 与 lx.extract 结果一致，事件循环不被长时间阻塞。"""
+    text = TEXT * 20
+    expected = lx.extract(text, debug=False, batch_length=8, **EXTRACT_KWARGS)
+
+    async def run():
+        stalls = []
+        done = False
+
+        async def heartbeat():
+            last = time.perf_counter()
+            while not done:
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                stalls.append(now - last - 0.005)
+                last = now
+
+        beat = asyncio.create_task(heartbeat())
+        start = time.perf_counter()
+        document = await lx.extract_async(text, debug=False, **EXTRACT_KWARGS)
+        elapsed = time.perf_counter() - start
+        done = True
+        await beat
+        return document, elapsed, stalls
+
+    document, elapsed, stalls = asyncio.run(run())
+    assert list(map(extraction_key, document.extractions)) == list(
+        map(extraction_key, expected.extractions)
+    )
+    long_stalls = [s for s in stalls if s > 0.05]
+    print(
+        f"extract_async: {len(text) // 1000} KB 文本 {elapsed:.2f}s, 结果一致; "
+        f"事件循环最长停顿 {max(stalls):.3f}s, 超过 50ms 的停顿 {len(long_stalls)} 次"
+        f"共 {sum(long_stalls):.2f}s"
+    )
+
+
+def test_stream_rate_limit():
+    """流式读取只在等待首个片段时占用限流器，整个流的时长不算作请求延迟。"""
+    limiter = rate_limit.RateLimiter(max_concurrency=8)
+    model = inference.CustomAPIModel(
+        model_id="stand-in", api_key="key", api_url=API_URL, max_workers=4, rate_limiter=limiter
+    )
+    # 先用普通请求建立平均延迟
+    list(model.infer([f"echo: prompt {i}" for i in range(12)]))
+    start = time.perf_counter()
+    pieces = 0
+    for _ in model.infer_stream("Q: " + TEXT[:4000]):
+        pieces += 1
+        assert limiter.in_flight == 0, limiter.in_flight
+    elapsed = time.perf_counter() - start
+    model.close()
+    assert limiter.concurrency_limit == 8, limiter.concurrency_limit
+    assert limiter.stats.latency_spikes == 0, limiter.stats
+    print(
+        f"流式限流: {pieces} 个片段 {elapsed:.2f}s, 并发上限仍为 {limiter.concurrency_limit}, "
+        f"延迟尖峰 {limiter.stats.latency_spikes} 次"
+    )
+
+
+def test_load_balancing_failover():
+    """负载均衡池中失败的后端会被切换掉，结果仍然完整。"""
+    bad = inference.CustomAPIModel(model_id="stand-in", api_key="key", api_url=BASE_URL + "/fail")
+    good = inference.CustomAPIModel(model_id="stand-in", api_key="key", api_url=API_URL)
+    with load_balancing.LoadBalancedLanguageModel([bad, good]) as pool:
+        prompts = [f"echo: prompt {i}" for i in range(6)]
+        outputs = [output[0].output for output in pool.infer(prompts)]
+        assert outputs == [p.upper() for p in prompts], outputs
+        print(
+            "负载均衡: 结果完整; (请求, 失败, 切换) =",
+            [(b.stats.requests, b.stats.failures, b.stats.failovers) for b in pool.backends],
+        )
+
+
+if __name__ == "__main__":
+    test_concurrent_infer()
+    test_extract_stream()
+    test_stream_repeated_mentions()
+    test_stream_stop()
+    test_extract_async()
+    test_stream_rate_limit()
+    test_load_balancing_failover()
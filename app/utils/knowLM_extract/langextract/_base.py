@@ -11,6 +11,8 @@ class LangextractConfig(ModelConfig):
     language_model_type: Type[lx.LanguageModelT] = lx.inference.CustomAPIModel  # 用于推理的语言模型类型
     format_type: lx.data.FormatType = lx.data.FormatType.JSON  # 输出格式类型（JSON或YAML）
     max_char_buffer: int = 1000  # 推理时的最大字符数
+    # 每个提示的模型token预算（含任务描述与示例），文本块按剩余token装填；同时仍受max_char_buffer限制
+    max_prompt_tokens: int | None = None
     temperature: float = 0.5  # 生成时的采样温度，较高值可以减少重复输出
     fence_output: bool = False  # 是否期望/生成带围栏的输出
     use_schema_constraints: bool = True  # 是否为模型生成模式约束以启用结构化输出
@@ -21,3 +23,8 @@ class LangextractConfig(ModelConfig):
     # language_model_params: dict | None = None  # 语言模型的额外参数
     debug: bool = True  # 是否填充调试字段
     extraction_passes: int = 1  # 顺序提取尝试次数，用于提高召回率
+    # 动态few-shot：每个文本块只放入与其最相似的示例（字符n-gram TF-IDF），两者均为None时放入全部示例
+    max_examples: int | None = None  # 每个提示最多放入的示例数量
+    max_example_tokens: int | None = None  # 每个提示中示例的估算token上限
+    # 额外的模型接口（其他API key或兼容接口地址），与主接口组成负载均衡池，请求按负载分发，失败时切换到其他接口
+    extra_endpoints: list[ModelConfig] = []
@@ -4,19 +4,83 @@
 """
 langextract抽取
 """
+import asyncio
+import hashlib
 import json
 import os
+import threading
 import time
 
 # 修复可视化问题的方案
 from utils import langextract as lx
+from models.v2_LLMs import ModelConfig
 from utils.knowLM_extract.langextract._base import LangextractConfig
 
 
 class LangExtractor:
-    def __init__(self):
+    def __init__(
+            self,
+            response_cache: lx.caching.ResponseCache | None = None,
+            checkpoint_store: lx.checkpoint.CheckpointStore | None = None,
+            retry_policy: lx.retry.RetryPolicy | None = None,
+            rate_limiter: lx.rate_limit.RateLimiter | None = None,
+            hedging_policy: lx.hedging.HedgingPolicy | None = None
+    ):
+        """
+        Args:
+           response_cache (lx.caching.ResponseCache | None): 模型响应缓存，重试时已成功的文本块不再重复请求
+           checkpoint_store (lx.checkpoint.CheckpointStore | None): 断点存储，记录已完成的文本块与文档，
+               重试或进程重启后只处理尚未完成的文本块
+           retry_policy (lx.retry.RetryPolicy | None): 文本块级别的重试策略（限流、5xx、超时、JSON解析失败），
+               只重试失败的文本块；默认使用 lx.retry.RetryPolicy()
+           rate_limiter (lx.rate_limit.RateLimiter | None): 客户端限流器（每分钟请求数/token数、自适应并发）；
+               默认按接口地址和API key共享 lx.rate_limit.get_rate_limiter，并发上限为 max_workers，遇到429或延迟突增时自动降低并发；
+               配置了 extra_endpoints 时每个接口各用一个共享限流器
+           hedging_policy (lx.hedging.HedgingPolicy | None): 对冲请求策略，请求耗时超过历史P95时再发一份（配置了
+               extra_endpoints 时发往其他接口），取先返回的结果，避免个别慢请求拖慢整批；默认不启用
+        """
         self.max_retries = 3
+        self.response_cache = response_cache
+        self.checkpoint_store = checkpoint_store
+        self.retry_policy = retry_policy if retry_policy is not None else lx.retry.RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.hedging_policy = hedging_policy
         self.project_root = os.path.join(os.path.dirname(__file__), "..", "..", "..", "..")
+        # 负载均衡模型按配置缓存，在多次调用和重试间复用，连接池与接口剔除状态得以保留；由 close/aclose 统一释放
+        self._language_models: dict[str, lx.load_balancing.LoadBalancedLanguageModel] = {}
+        self._language_models_lock = threading.Lock()
+
+    def close(self):
+        """
+        关闭缓存的负载均衡模型及其连接池
+        """
+        with self._language_models_lock:
+            language_models = list(self._language_models.values())
+            self._language_models.clear()
+        for language_model in language_models:
+            language_model.close()
+
+    async def aclose(self):
+        """
+        close 的异步版本，同时关闭异步请求使用的连接池（httpx AsyncClient）
+        """
+        with self._language_models_lock:
+            language_models = list(self._language_models.values())
+            self._language_models.clear()
+        for language_model in language_models:
+            await language_model.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
 
     def splicing_prompt_format(self, prompt, prompt_format):
         return prompt + """
@@ -25,6 +89,144 @@ class LangExtractor:
 请严格按照如下JSON字符串的格式回答：
 """ + prompt_format
 
+    def _extract_kwargs(
+            self,
+            prompt: str,
+            examples: list,
+            input_text: str,
+            langextract_config: LangextractConfig
+    ) -> dict:
+        """
+        构造 lx.extract 与 lx.extract_async 共用的参数
+        """
+        # 使用附加模型language_model_type=CustomAPIModel时，需要为language_model_params添加参数"api_url"
+        if langextract_config.language_model_type == lx.inference.CustomAPIModel:
+            langextract_config.config["api_url"] = langextract_config.api_url
+
+        # 配置了多个接口时，由负载均衡模型在各接口间分发请求
+        language_model = None
+        if langextract_config.extra_endpoints:
+            language_model = self._load_balanced_model(langextract_config)
+
+        # 按相似度为每个文本块挑选示例，减少每次请求的输入token
+        example_selector = None
+        if langextract_config.max_examples is not None or langextract_config.max_example_tokens is not None:
+            example_selector = lx.example_selection.ExampleSelector(
+                max_examples=langextract_config.max_examples,
+                max_tokens=langextract_config.max_example_tokens,
+            )
+
+        return dict(
+            text_or_documents=input_text,
+            prompt_description=prompt,
+            examples=examples,
+            model_id=langextract_config.model_name,
+            api_key=langextract_config.api_key,
+            language_model_type=langextract_config.language_model_type,
+            format_type=langextract_config.format_type,
+            max_char_buffer=langextract_config.max_char_buffer,
+            max_prompt_tokens=langextract_config.max_prompt_tokens,
+            temperature=langextract_config.temperature,
+            fence_output=langextract_config.fence_output,
+            use_schema_constraints=langextract_config.use_schema_constraints,
+            max_workers=langextract_config.max_workers,
+            additional_context=langextract_config.additional_context,
+            resolver_params=langextract_config.resolver_params,
+            debug=langextract_config.debug,
+            model_url=langextract_config.api_url,
+            extraction_passes=langextract_config.extraction_passes,
+            language_model_params=langextract_config.config,
+            response_cache=self.response_cache,
+            checkpoint_store=self.checkpoint_store,
+            retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter or self._shared_rate_limiter(langextract_config, langextract_config),
+            hedging_policy=self.hedging_policy,
+            language_model=language_model,
+            example_selector=example_selector,
+        )
+
+    def _load_balanced_model(
+            self,
+            langextract_config: LangextractConfig
+    ) -> lx.load_balancing.LoadBalancedLanguageModel:
+        """
+        返回该配置的负载均衡模型，首次使用时构造，之后复用同一个实例
+        """
+        endpoints = [langextract_config, *langextract_config.extra_endpoints]
+        model_key = hashlib.sha256(json.dumps(
+            {
+                "language_model_type": langextract_config.language_model_type.__name__,
+                "format_type": langextract_config.format_type,
+                "temperature": langextract_config.temperature,
+                "max_workers": langextract_config.max_workers,
+                "endpoints": [
+                    [endpoint.model_name, endpoint.api_url, endpoint.api_key, endpoint.config]
+                    for endpoint in endpoints
+                ],
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")).hexdigest()
+        with self._language_models_lock:
+            language_model = self._language_models.get(model_key)
+            if language_model is None:
+                language_model = lx.load_balancing.LoadBalancedLanguageModel(
+                    [self._endpoint_model(endpoint, langextract_config) for endpoint in endpoints],
+                    hedging_policy=self.hedging_policy,
+                )
+                self._language_models[model_key] = language_model
+            return language_model
+
+    @staticmethod
+    def _shared_rate_limiter(
+            endpoint: ModelConfig,
+            langextract_config: LangextractConfig
+    ) -> lx.rate_limit.RateLimiter:
+        """
+        返回接口共享的限流器：同一接口地址和API key的所有请求（多线程、多实例）共用一个，不同API key的配额相互独立
+        """
+        key_id = hashlib.sha256(endpoint.api_key.encode("utf-8")).hexdigest()[:8]
+        return lx.rate_limit.get_rate_limiter(
+            f"{endpoint.api_url or endpoint.model_name}#{key_id}",
+            max_concurrency=langextract_config.max_workers,
+        )
+
+    def _endpoint_model(
+            self,
+            endpoint: ModelConfig,
+            langextract_config: LangextractConfig
+    ) -> lx.inference.BaseLanguageModel:
+        """
+        为负载均衡池中的一个接口构造语言模型，除接口地址、API key和模型配置外与主接口参数一致
+        """
+        model_params = dict(
+            model_id=endpoint.model_name,
+            api_key=endpoint.api_key,
+            format_type=langextract_config.format_type,
+            temperature=langextract_config.temperature,
+            max_workers=langextract_config.max_workers,
+            rate_limiter=self._shared_rate_limiter(endpoint, langextract_config),
+        )
+        if langextract_config.language_model_type == lx.inference.CustomAPIModel:
+            model_params["api_url"] = endpoint.api_url
+        else:
+            model_params["model_url"] = endpoint.api_url
+        model_params.update(endpoint.config)
+        return langextract_config.language_model_type(**model_params)
+
+    def _retry_wait_seconds(self, attempt: int, error: Exception) -> int:
+        """
+        计算第 attempt 次失败后的等待时间（秒）
+        """
+        # 指数退避策略: 等待 30 * 2^attempt 秒
+        wait_time = 30 * (2 ** attempt)
+        # 特殊处理API限流错误
+        if lx.retry.classify_error(error) is lx.retry.FailureKind.RATE_LIMIT:
+            # 对于限流错误，等待更长时间
+            wait_time += 5 * (attempt + 1)
+        return wait_time
+
     def extract_list_of_dict(
             self, raw_prompt: str,
             result_format: dict,
@@ -60,30 +262,9 @@ class LangExtractor:
             try:
                 print(f"尝试第 {attempt + 1}/{self.max_retries} 次提取...")
 
-                # 使用附加模型language_model_type=CustomAPIModel时，需要为language_model_params添加参数"api_url"
-                if langextract_config.language_model_type == lx.inference.CustomAPIModel:
-                    langextract_config.config["api_url"] = langextract_config.api_url
-
                 result = lx.extract(
-                    text_or_documents=input_text,
-                    prompt_description=prompt,
-                    examples=examples,
-                    model_id=langextract_config.model_name,
-                    api_key=langextract_config.api_key,
-                    language_model_type=langextract_config.language_model_type,
-                    format_type=langextract_config.format_type,
-                    max_char_buffer=langextract_config.max_char_buffer,
-                    temperature=langextract_config.temperature,
-                    fence_output=langextract_config.fence_output,
-                    use_schema_constraints=langextract_config.use_schema_constraints,
                     batch_length=langextract_config.batch_length,
-                    max_workers=langextract_config.max_workers,
-                    additional_context=langextract_config.additional_context,
-                    resolver_params=langextract_config.resolver_params,
-                    debug=langextract_config.debug,
-                    model_url=langextract_config.api_url,
-                    extraction_passes=langextract_config.extraction_passes,
-                    language_model_params=langextract_config.config
+                    **self._extract_kwargs(prompt, examples, input_text, langextract_config),
                 )
 
                 print(f"第 {attempt + 1} 次尝试成功!")
@@ -95,23 +276,107 @@ class LangExtractor:
 
                 # 如果不是最后一次尝试，等待一段时间再重试
                 if attempt < self.max_retries - 1:
-                    # 指数退避策略: 等待 2^attempt 秒
-                    wait_time = 30 * (2 ** attempt)
+                    wait_time = self._retry_wait_seconds(attempt, e)
                     print(f"等待 {wait_time} 秒后进行下一次尝试...")
                     time.sleep(wait_time)
 
-                    # 特殊处理API限流错误
-                    if "429" in str(e) or "rate limit" in str(e).lower():
-                        # 对于限流错误，等待更长时间
-                        additional_wait = 5 * (attempt + 1)
-                        print(f"检测到限流错误，额外等待 {additional_wait} 秒...")
-                        time.sleep(additional_wait)
+        # 所有重试都失败
+        print(f"所有 {self.max_retries} 次尝试都失败了。")
+        raise Exception(f"知识提取失败，已重试 {self.max_retries} 次。最后一次错误: {last_exception}") \
+            from last_exception
+
+    async def extract_list_of_dict_async(
+            self, raw_prompt: str,
+            result_format: dict,
+            examples: list,
+            input_text: str,
+            langextract_config: LangextractConfig
+    ):
+        """
+        从文本中提取知识，包含重试机制。extract_list_of_dict 的异步版本，不阻塞事件循环
+
+        Args:
+           raw_prompt (str): 提示词
+           result_format (dict): 输出结果格式
+           examples (list): 示例数据
+           input_text (str): 输入文本
+           langextract_config (LangextractConfig): 模型配置
+        Returns:
+           list(dict): 提取结果
+
+        Raises:
+           Exception: 如果所有重试都失败则抛出异常
+        """
+        # 检查输入文本是否为空
+        if not input_text or not input_text.strip():
+            print("警告: 输入文本为空或只包含空白字符")
+            return []
+            
+        prompt = self.splicing_prompt_format(raw_prompt, json.dumps(result_format))
+        # 初始化重试参数
+        last_exception = None
+
+        for attempt in range(self.max_retries):
+            try:
+                print(f"尝试第 {attempt + 1}/{self.max_retries} 次提取...")
+
+                result = await lx.extract_async(
+                    **self._extract_kwargs(prompt, examples, input_text, langextract_config),
+                )
+
+                print(f"第 {attempt + 1} 次尝试成功!")
+                return self.convert_annotated_document_to_dict(result)
+
+            except Exception as e:
+                last_exception = e
+                print(f"第 {attempt + 1} 次尝试失败: {e}")
+
+                # 如果不是最后一次尝试，等待一段时间再重试
+                if attempt < self.max_retries - 1:
+                    wait_time = self._retry_wait_seconds(attempt, e)
+                    print(f"等待 {wait_time} 秒后进行下一次尝试...")
+                    await asyncio.sleep(wait_time)
 
         # 所有重试都失败
         print(f"所有 {self.max_retries} 次尝试都失败了。")
         raise Exception(f"知识提取失败，已重试 {self.max_retries} 次。最后一次错误: {last_exception}") \
             from last_exception
 
+    def extract_stream(
+            self, raw_prompt: str,
+            result_format: dict,
+            examples: list,
+            input_text: str,
+            langextract_config: LangextractConfig
+    ):
+        """
+        流式提取知识：模型边生成边解析，每条抽取结果（如关系）生成完整后立即对齐并返回，
+        适合输出很长（数百条关系）的提示词。已返回的结果无法撤回，因此不做整体重试，也不做多轮抽取
+
+        Args:
+           raw_prompt (str): 提示词
+           result_format (dict): 输出结果格式
+           examples (list): 示例数据
+           input_text (str): 输入文本
+           langextract_config (LangextractConfig): 模型配置
+        Yields:
+           dict: 单条提取结果，格式同 convert_annotated_document_to_dict 的 extractions 中的元素
+        """
+        # 检查输入文本是否为空
+        if not input_text or not input_text.strip():
+            print("警告: 输入文本为空或只包含空白字符")
+            return
+
+        prompt = self.splicing_prompt_format(raw_prompt, json.dumps(result_format))
+        extract_kwargs = self._extract_kwargs(prompt, examples, input_text, langextract_config)
+        # 流式抽取不支持多轮抽取、断点续跑、文本块重试和对冲请求
+        for key in ("extraction_passes", "checkpoint_store", "retry_policy", "hedging_policy", "debug"):
+            extract_kwargs.pop(key)
+        extract_kwargs["text"] = extract_kwargs.pop("text_or_documents")
+
+        for extraction in lx.extract_stream(**extract_kwargs):
+            yield self.convert_extraction_to_dict(extraction)
+
     def convert_annotated_document_to_dict(
             self,
             annotated_doc: lx.data.AnnotatedDocument):
@@ -136,42 +401,7 @@ class LangExtractor:
             for extraction in annotated_doc.extractions:
                 if not extraction:
                     continue
-                    
-                # 处理 char_interval
-                char_interval_dict = None
-                if hasattr(extraction, 'char_interval') and extraction.char_interval:
-                    char_interval_dict = {
-                        'start_pos': getattr(extraction.char_interval, 'start_pos', None),
-                        'end_pos': getattr(extraction.char_interval, 'end_pos', None)
-                    }
-
-                # 处理 alignment_status
-                alignment_status_value = None
-                if hasattr(extraction, 'alignment_status') and extraction.alignment_status:
-                    alignment_status_value = extraction.alignment_status.value \
-                        if hasattr(extraction.alignment_status, 'value') else str(extraction.alignment_status)
-
-                # 处理 token_interval
-                token_interval_dict = None
-                if hasattr(extraction, 'token_interval') and extraction.token_interval:
-                    token_interval_dict = {
-                        'start_index': getattr(extraction.token_interval, 'start_index', None),
-                        'end_index': getattr(extraction.token_interval, 'end_index', None)
-                    }
-
-                # 构建每个提取项的字典
-                extraction_dict = {
-                    'extraction_class': getattr(extraction, 'extraction_class', ''),
-                    'extraction_text': getattr(extraction, 'extraction_text', ''),
-                    'char_interval': char_interval_dict,
-                    'alignment_status': alignment_status_value,
-                    'extraction_index': getattr(extraction, 'extraction_index', None),
-                    'group_index': getattr(extraction, 'group_index', None),
-                    'description': getattr(extraction, 'description', None),
-                    'attributes': getattr(extraction, 'attributes', {}),  # attributes 本身应该是一个字典
-                    'token_interval': token_interval_dict
-                }
-                extractions_list.append(extraction_dict)
+                extractions_list.append(self.convert_extraction_to_dict(extraction))
 
         # 构建最终返回的文档字典
         doc_dict = {
@@ -181,4 +411,43 @@ class LangExtractor:
 
         return doc_dict
 
+    def convert_extraction_to_dict(self, extraction: lx.data.Extraction) -> dict:
+        """
+        将单个 Extraction 对象转换为字典
+        """
+        # 处理 char_interval
+        char_interval_dict = None
+        if hasattr(extraction, 'char_interval') and extraction.char_interval:
+            char_interval_dict = {
+                'start_pos': getattr(extraction.char_interval, 'start_pos', None),
+                'end_pos': getattr(extraction.char_interval, 'end_pos', None)
+            }
+
+        # 处理 alignment_status
+        alignment_status_value = None
+        if hasattr(extraction, 'alignment_status') and extraction.alignment_status:
+            alignment_status_value = extraction.alignment_status.value \
+                if hasattr(extraction.alignment_status, 'value') else str(extraction.alignment_status)
+
+        # 处理 token_interval
+        token_interval_dict = None
+        if hasattr(extraction, 'token_interval') and extraction.token_interval:
+            token_interval_dict = {
+                'start_index': getattr(extraction.token_interval, 'start_index', None),
+                'end_index': getattr(extraction.token_interval, 'end_index', None)
+            }
+
+        # 构建每个提取项的字典
+        return {
+            'extraction_class': getattr(extraction, 'extraction_class', ''),
+            'extraction_text': getattr(extraction, 'extraction_text', ''),
+            'char_interval': char_interval_dict,
+            'alignment_status': alignment_status_value,
+            'extraction_index': getattr(extraction, 'extraction_index', None),
+            'group_index': getattr(extraction, 'group_index', None),
+            'description': getattr(extraction, 'description', None),
+            'attributes': getattr(extraction, 'attributes', {}),  # attributes 本身应该是一个字典
+            'token_interval': token_interval_dict
+        }
+
 # langExtractor = LangExtractor()
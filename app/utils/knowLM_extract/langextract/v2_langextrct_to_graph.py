@@ -31,6 +31,12 @@ class LangextractToGraph:
         )
         self.langextractor = LangExtractor()
 
+    async def aclose(self):
+        """
+        释放抽取器复用的模型及其连接池
+        """
+        await self.langextractor.aclose()
+
     # 抽取图谱
     async def extract_graph(
             self,
@@ -169,7 +175,7 @@ examples = [{
         try:
             input_prompt = prompt_for_node(prompt, node_schema)
             input_examples = self.generate_examples(examples)
-            extract_result = self.langextractor.extract_list_of_dict(
+            extract_result = await self.langextractor.extract_list_of_dict_async(
                 input_prompt,
                 node_format,
                 input_examples,
@@ -240,7 +246,7 @@ examples = [{
 
             input_prompt = prompt_for_edge(prompt, node_list, edge_schema)
             input_examples = self.generate_examples(examples)
-            extract_result = self.langextractor.extract_list_of_dict(
+            extract_result = await self.langextractor.extract_list_of_dict_async(
                 input_prompt,
                 edge_format,
                 input_examples,
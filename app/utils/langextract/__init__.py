@@ -16,7 +16,9 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable, Sequence
+import asyncio
+from collections.abc import Iterable, Iterator, Sequence
+import contextlib
 import os
 from typing import Any, cast, Type, TypeVar
 import warnings
@@ -24,25 +26,44 @@ import warnings
 import dotenv
 
 from langextract import annotation
+from langextract import caching
+from langextract import checkpoint
+from langextract import chunking
 from langextract import data
+from langextract import example_selection
 from langextract import exceptions
+from langextract import hedging
 from langextract import inference
 from langextract import io
+from langextract import load_balancing
 from langextract import prompting
+from langextract import rate_limit
 from langextract import resolver
+from langextract import retry
 from langextract import schema
+from langextract import tokenizer
 from langextract import visualization
 
 __all__ = [
     "extract",
+    "extract_async",
+    "extract_stream",
     "visualize",
     "annotation",
+    "caching",
+    "checkpoint",
+    "chunking",
     "data",
+    "example_selection",
     "exceptions",
+    "hedging",
     "inference",
     "io",
+    "load_balancing",
     "prompting",
+    "rate_limit",
     "resolver",
+    "retry",
     "schema",
     "visualization",
 ]
@@ -76,6 +97,19 @@ def extract(
     debug: bool = True,
     model_url: str | None = None,
     extraction_passes: int = 1,
+    segmenter: tokenizer.Segmenter | None = None,
+    response_cache: caching.ResponseCache | None = None,
+    pipeline_depth: int = 0,
+    interleave_passes: bool = False,
+    checkpoint_store: checkpoint.CheckpointStore | None = None,
+    retry_policy: retry.RetryPolicy | None = None,
+    allow_partial_documents: bool = False,
+    rate_limiter: rate_limit.RateLimiter | None = None,
+    hedging_policy: hedging.HedgingPolicy | None = None,
+    language_model: inference.BaseLanguageModel | None = None,
+    example_selector: example_selection.ExampleSelector | None = None,
+    max_prompt_tokens: int | None = None,
+    token_counter: chunking.TokenCounter | None = None,
 ) -> data.AnnotatedDocument | Iterable[data.AnnotatedDocument]:
   """Extracts structured information from text.
 
@@ -116,7 +150,7 @@ def extract(
         Defaults to 10.
       max_workers: Maximum parallel workers for concurrent processing. Effective
         parallelization is limited by min(batch_length, max_workers). Supported
-        by Gemini models. Defaults to 10.
+        by Gemini, OpenAI and custom API models. Defaults to 10.
       additional_context: Additional context to be added to the prompt.txt during
         inference.
       resolver_params: Parameters for the `resolver.Resolver`, which parses the
@@ -139,6 +173,62 @@ def extract(
         for overlaps). WARNING: Each additional pass reprocesses tokens,
         potentially increasing API costs. For example, extraction_passes=3
         reprocesses tokens 3x.
+      segmenter: Optional callable that splits runs of CJK characters into
+        words (e.g. `jieba.lcut`). Used for both chunking and alignment. By
+        default every CJK character is its own token.
+      response_cache: Optional cache of model responses. Prompts already in the
+        cache (e.g. from an earlier run, a retry or another extraction pass)
+        are answered without calling the model. Later extraction passes
+        therefore reuse the first pass's responses.
+      pipeline_depth: Number of batches whose inference may run ahead of
+        resolving and aligning earlier batches, so network waits and parsing
+        overlap. Defaults to 0 (no overlap).
+      interleave_passes: When extraction_passes > 1, run all passes in one
+        sweep over the documents instead of one sweep per pass. Each batch
+        then holds every pass of batch_length chunks, and documents are
+        yielded as soon as all their passes finish. Defaults to False.
+      checkpoint_store: Optional `checkpoint.CheckpointStore` in which each
+        finished chunk and document is recorded. Calling again with the same
+        store (e.g. after a crash or in a retry) restores the finished work
+        and only sends the missing chunks to the model. Documents need stable
+        IDs to be resumed; text input gets an ID derived from the text.
+      retry_policy: Optional `retry.RetryPolicy` for chunks that hit a rate
+        limit, server error or timeout, or whose output cannot be parsed.
+        Only the failed chunks are sent again, after a jittered exponential
+        backoff. Defaults to None (no retries).
+      allow_partial_documents: Whether chunks that still fail are left out of
+        their document, with their character ranges recorded in
+        `failed_chunks`, instead of raising. Defaults to False.
+      rate_limiter: Optional `rate_limit.RateLimiter` for the model's
+        endpoint, passed to the language model. It keeps requests within the
+        endpoint's request and token budgets and lowers concurrency below
+        max_workers when the endpoint rate limits or slows down. Share one
+        limiter, e.g. from `rate_limit.get_rate_limiter`, between all
+        extractions that call the same endpoint.
+      hedging_policy: Optional `hedging.HedgingPolicy`, passed to the language
+        model. A request slower than the policy's latency percentile is sent
+        again and the first response is used, so one straggler does not hold
+        up its batch. Supported by Gemini, OpenAI and custom API models.
+      language_model: Optional language model instance to use instead of
+        building one from model_id, api_key, language_model_type, model_url,
+        language_model_params, rate_limiter and hedging_policy, which are then
+        ignored. For
+        example, a `load_balancing.LoadBalancedLanguageModel` that spreads
+        requests over several API keys or endpoints.
+      example_selector: Optional `example_selection.ExampleSelector`. Each
+        prompt.txt then carries only the examples most similar to its chunk, up
+        to the selector's number of examples and token budget, instead of all
+        examples. This cuts input tokens when the examples are long.
+      max_prompt_tokens: Optional budget of model tokens per prompt.txt. Chunks
+        are packed up to what is left after the rest of the rendered prompt.txt
+        (description, additional context and examples), so they fill the
+        model's context instead of stopping at a conservative character count.
+        max_char_buffer still applies, so raise it to let the token budget
+        decide.
+      token_counter: Counts model tokens of a text, e.g. with the model's own
+        tokenizer, for max_prompt_tokens and the example selector's budget.
+        Defaults to `tokenizer.estimate_tokens`, a fast approximation for CJK
+        and Latin text.
 
   Returns:
       An AnnotatedDocument with the extracted information when input is a
@@ -150,6 +240,326 @@ def extract(
       ValueError: If no API key is provided or found in environment variables.
       requests.RequestException: If URL download fails.
   """
+  model, annotator, res = _make_annotator_and_resolver(
+      prompt_description=prompt_description,
+      examples=examples,
+      model_id=model_id,
+      api_key=api_key,
+      language_model_type=language_model_type,
+      format_type=format_type,
+      temperature=temperature,
+      fence_output=fence_output,
+      use_schema_constraints=use_schema_constraints,
+      max_workers=max_workers,
+      resolver_params=resolver_params,
+      language_model_params=language_model_params,
+      model_url=model_url,
+      segmenter=segmenter,
+      response_cache=response_cache,
+      rate_limiter=rate_limiter,
+      hedging_policy=hedging_policy,
+      language_model=language_model,
+      example_selector=example_selector,
+      max_prompt_tokens=max_prompt_tokens,
+      token_counter=token_counter,
+  )
+
+  if max_workers is not None and batch_length < max_workers:
+    warnings.warn(
+        f"batch_length ({batch_length}) is less than max_workers"
+        f" ({max_workers}). Only {batch_length} workers will be used. For"
+        " optimal parallelization, set batch_length >= max_workers.",
+        UserWarning,
+    )
+
+  if isinstance(text_or_documents, str):
+    # A model passed in by the caller stays open for reuse.
+    with model if language_model is None else contextlib.nullcontext():
+      if io.is_url(text_or_documents):
+        text_or_documents = io.download_text_from_url(text_or_documents)
+      return annotator.annotate_text(
+          text=text_or_documents,
+          resolver=res,
+          max_char_buffer=max_char_buffer,
+          batch_length=batch_length,
+          additional_context=additional_context,
+          debug=debug,
+          extraction_passes=extraction_passes,
+          pipeline_depth=pipeline_depth,
+          interleave_passes=interleave_passes,
+          checkpoint=checkpoint_store,
+          retry_policy=retry_policy,
+          allow_partial_documents=allow_partial_documents,
+      )
+  else:
+    documents = cast(Iterable[data.Document], text_or_documents)
+    annotated_documents = annotator.annotate_documents(
+        documents=documents,
+        resolver=res,
+        max_char_buffer=max_char_buffer,
+        batch_length=batch_length,
+        debug=debug,
+        extraction_passes=extraction_passes,
+        pipeline_depth=pipeline_depth,
+        interleave_passes=interleave_passes,
+        checkpoint=checkpoint_store,
+        retry_policy=retry_policy,
+        allow_partial_documents=allow_partial_documents,
+    )
+    if language_model is not None:
+      return annotated_documents
+    return _close_when_done(model, annotated_documents)
+
+
+def _close_when_done(
+    model: inference.BaseLanguageModel,
+    annotated_documents: Iterable[data.AnnotatedDocument],
+) -> Iterator[data.AnnotatedDocument]:
+  """Yields the lazily annotated documents, then closes the model."""
+  with model:
+    yield from annotated_documents
+
+
+async def extract_async(
+    text_or_documents: str | data.Document | Iterable[data.Document],
+    prompt_description: str | None = None,
+    examples: Sequence[data.ExampleData] | None = None,
+    model_id: str = "gemini-2.5-flash",
+    api_key: str | None = None,
+    language_model_type: Type[LanguageModelT] = inference.GeminiLanguageModel,
+    format_type: data.FormatType = data.FormatType.JSON,
+    max_char_buffer: int = 1000,
+    temperature: float = 0.5,
+    fence_output: bool = False,
+    use_schema_constraints: bool = True,
+    max_workers: int = 10,
+    additional_context: str | None = None,
+    resolver_params: dict | None = None,
+    language_model_params: dict | None = None,
+    debug: bool = True,
+    model_url: str | None = None,
+    extraction_passes: int = 1,
+    segmenter: tokenizer.Segmenter | None = None,
+    response_cache: caching.ResponseCache | None = None,
+    checkpoint_store: checkpoint.CheckpointStore | None = None,
+    retry_policy: retry.RetryPolicy | None = None,
+    allow_partial_documents: bool = False,
+    rate_limiter: rate_limit.RateLimiter | None = None,
+    hedging_policy: hedging.HedgingPolicy | None = None,
+    language_model: inference.BaseLanguageModel | None = None,
+    example_selector: example_selection.ExampleSelector | None = None,
+    max_prompt_tokens: int | None = None,
+    token_counter: chunking.TokenCounter | None = None,
+) -> data.AnnotatedDocument | list[data.AnnotatedDocument]:
+  """Extracts structured information from text without blocking the event loop.
+
+  The asyncio counterpart of `extract`, taking the same arguments except
+  `batch_length`. Instead of fixed batches, up to `max_workers` requests are
+  kept in flight across chunks, documents and extraction passes, so many
+  extractions can share one event loop.
+
+  Example usage:
+    result = await lx.extract_async(text, prompt_description, examples, ...)
+
+  Args:
+      text_or_documents: The source text, a URL to download text from, or an
+        iterable of Document objects.
+      max_workers: Maximum number of inference requests in flight.
+
+  Returns:
+      An AnnotatedDocument when input is a string or URL, or a list of
+      AnnotatedDocuments in input order when input is an iterable of
+      Documents. Use `annotation.Annotator.annotate_documents_async` to
+      consume documents as they complete.
+
+  Raises:
+      ValueError: If examples is None or empty.
+      ValueError: If no API key is provided or found in environment variables.
+      requests.RequestException: If URL download fails.
+  """
+  model, annotator, res = _make_annotator_and_resolver(
+      prompt_description=prompt_description,
+      examples=examples,
+      model_id=model_id,
+      api_key=api_key,
+      language_model_type=language_model_type,
+      format_type=format_type,
+      temperature=temperature,
+      fence_output=fence_output,
+      use_schema_constraints=use_schema_constraints,
+      max_workers=max_workers,
+      resolver_params=resolver_params,
+      language_model_params=language_model_params,
+      model_url=model_url,
+      segmenter=segmenter,
+      response_cache=response_cache,
+      rate_limiter=rate_limiter,
+      hedging_policy=hedging_policy,
+      language_model=language_model,
+      example_selector=example_selector,
+      max_prompt_tokens=max_prompt_tokens,
+      token_counter=token_counter,
+  )
+
+  if isinstance(text_or_documents, str) and io.is_url(text_or_documents):
+    text_or_documents = await asyncio.to_thread(
+        io.download_text_from_url, text_or_documents
+    )
+
+  # A model passed in by the caller stays open for reuse.
+  async with model if language_model is None else contextlib.nullcontext():
+    if isinstance(text_or_documents, str):
+      return await annotator.annotate_text_async(
+          text=text_or_documents,
+          resolver=res,
+          max_char_buffer=max_char_buffer,
+          max_concurrency=max_workers,
+          additional_context=additional_context,
+          debug=debug,
+          extraction_passes=extraction_passes,
+          checkpoint=checkpoint_store,
+          retry_policy=retry_policy,
+          allow_partial_documents=allow_partial_documents,
+      )
+    documents = cast(Iterable[data.Document], text_or_documents)
+    return [
+        annotated_document
+        async for annotated_document in annotator.annotate_documents_async(
+            documents=documents,
+            resolver=res,
+            max_char_buffer=max_char_buffer,
+            max_concurrency=max_workers,
+            debug=debug,
+            extraction_passes=extraction_passes,
+            checkpoint=checkpoint_store,
+            retry_policy=retry_policy,
+            allow_partial_documents=allow_partial_documents,
+        )
+    ]
+
+
+def extract_stream(
+    text: str,
+    prompt_description: str | None = None,
+    examples: Sequence[data.ExampleData] | None = None,
+    model_id: str = "gemini-2.5-flash",
+    api_key: str | None = None,
+    language_model_type: Type[LanguageModelT] = inference.GeminiLanguageModel,
+    format_type: data.FormatType = data.FormatType.JSON,
+    max_char_buffer: int = 1000,
+    temperature: float = 0.5,
+    fence_output: bool = False,
+    use_schema_constraints: bool = True,
+    max_workers: int = 10,
+    additional_context: str | None = None,
+    resolver_params: dict | None = None,
+    language_model_params: dict | None = None,
+    model_url: str | None = None,
+    segmenter: tokenizer.Segmenter | None = None,
+    response_cache: caching.ResponseCache | None = None,
+    rate_limiter: rate_limit.RateLimiter | None = None,
+    language_model: inference.BaseLanguageModel | None = None,
+    example_selector: example_selection.ExampleSelector | None = None,
+    max_prompt_tokens: int | None = None,
+    token_counter: chunking.TokenCounter | None = None,
+) -> Iterator[data.Extraction]:
+  """Yields extractions from text while the model is still generating them.
+
+  A streaming counterpart of `extract` for long outputs, such as prompts that
+  return hundreds of relations. Model output is streamed, and each element of
+  a chunk's extractions is resolved and aligned as soon as it is complete, so
+  the first extractions arrive long before the output is finished. Takes the
+  same arguments as `extract` except those for batching, extraction passes,
+  checkpoints, retries and hedging, none of which apply to a stream.
+
+  Example usage:
+    for extraction in lx.extract_stream(text, prompt_description, examples):
+      ...
+
+  Args:
+      text: The source text, or a URL to download text from.
+      max_workers: Number of chunks streamed at the same time.
+
+  Yields:
+      Aligned extractions in the order they are completed, with intervals
+      relative to `text`. Unlike `extract`, they are neither sorted nor merged
+      across chunks. See `annotation.Annotator.annotate_text_stream`.
+
+  Raises:
+      ValueError: If examples is None or empty.
+      ValueError: If no API key is provided or found in environment variables.
+      requests.RequestException: If URL download fails.
+  """
+  model, annotator, res = _make_annotator_and_resolver(
+      prompt_description=prompt_description,
+      examples=examples,
+      model_id=model_id,
+      api_key=api_key,
+      language_model_type=language_model_type,
+      format_type=format_type,
+      temperature=temperature,
+      fence_output=fence_output,
+      use_schema_constraints=use_schema_constraints,
+      max_workers=max_workers,
+      resolver_params=resolver_params,
+      language_model_params=language_model_params,
+      model_url=model_url,
+      segmenter=segmenter,
+      response_cache=response_cache,
+      rate_limiter=rate_limiter,
+      hedging_policy=None,
+      language_model=language_model,
+      example_selector=example_selector,
+      max_prompt_tokens=max_prompt_tokens,
+      token_counter=token_counter,
+  )
+
+  if io.is_url(text):
+    text = io.download_text_from_url(text)
+
+  # A model passed in by the caller stays open for reuse.
+  with model if language_model is None else contextlib.nullcontext():
+    yield from annotator.annotate_text_stream(
+        text=text,
+        resolver=res,
+        max_char_buffer=max_char_buffer,
+        additional_context=additional_context,
+        max_concurrency=max_workers,
+    )
+
+
+def _make_annotator_and_resolver(
+    prompt_description: str | None,
+    examples: Sequence[data.ExampleData] | None,
+    model_id: str,
+    api_key: str | None,
+    language_model_type: Type[LanguageModelT],
+    format_type: data.FormatType,
+    temperature: float,
+    fence_output: bool,
+    use_schema_constraints: bool,
+    max_workers: int,
+    resolver_params: dict | None,
+    language_model_params: dict | None,
+    model_url: str | None,
+    segmenter: tokenizer.Segmenter | None,
+    response_cache: caching.ResponseCache | None,
+    rate_limiter: rate_limit.RateLimiter | None,
+    hedging_policy: hedging.HedgingPolicy | None,
+    language_model: inference.BaseLanguageModel | None,
+    example_selector: example_selection.ExampleSelector | None,
+    max_prompt_tokens: int | None,
+    token_counter: chunking.TokenCounter | None,
+) -> tuple[
+    inference.BaseLanguageModel, annotation.Annotator, resolver.Resolver
+]:
+  """Builds the pipeline shared by `extract` and `extract_async`.
+
+  See `extract` for the arguments.
+
+  Returns:
+    The language model, the annotator that calls it and the resolver.
+  """
   if not examples:
     raise ValueError(
         "Examples are required for reliable extraction. Please provide at least"
@@ -164,22 +574,71 @@ def extract(
         UserWarning,
     )
 
-  if max_workers is not None and batch_length < max_workers:
-    warnings.warn(
-        f"batch_length ({batch_length}) is less than max_workers"
-        f" ({max_workers}). Only {batch_length} workers will be used. For"
-        " optimal parallelization, set batch_length >= max_workers.",
-        UserWarning,
-    )
-
-  if isinstance(text_or_documents, str) and io.is_url(text_or_documents):
-    text_or_documents = io.download_text_from_url(text_or_documents)
-
   prompt_template = prompting.PromptTemplateStructured(
       description=prompt_description
   )
   prompt_template.examples.extend(examples)
 
+  if language_model is None:
+    language_model = _make_language_model(
+        prompt_template=prompt_template,
+        model_id=model_id,
+        api_key=api_key,
+        language_model_type=language_model_type,
+        format_type=format_type,
+        temperature=temperature,
+        use_schema_constraints=use_schema_constraints,
+        max_workers=max_workers,
+        language_model_params=language_model_params,
+        model_url=model_url,
+        rate_limiter=rate_limiter,
+        hedging_policy=hedging_policy,
+    )
+  if response_cache is not None:
+    language_model = caching.CachedLanguageModel(
+        language_model, response_cache
+    )
+
+  resolver_defaults = {
+      "fence_output": fence_output,
+      "format_type": format_type,
+      "extraction_attributes_suffix": "_attributes",
+      "extraction_index_suffix": None,
+      "segmenter": segmenter,
+  }
+  resolver_defaults.update(resolver_params or {})
+
+  res = resolver.Resolver(**resolver_defaults)
+
+  annotator = annotation.Annotator(
+      language_model=language_model,
+      prompt_template=prompt_template,
+      format_type=format_type,
+      fence_output=fence_output,
+      segmenter=segmenter,
+      example_selector=example_selector,
+      max_prompt_tokens=max_prompt_tokens,
+      token_counter=token_counter,
+  )
+
+  return language_model, annotator, res
+
+
+def _make_language_model(
+    prompt_template: prompting.PromptTemplateStructured,
+    model_id: str,
+    api_key: str | None,
+    language_model_type: Type[LanguageModelT],
+    format_type: data.FormatType,
+    temperature: float,
+    use_schema_constraints: bool,
+    max_workers: int,
+    language_model_params: dict | None,
+    model_url: str | None,
+    rate_limiter: rate_limit.RateLimiter | None,
+    hedging_policy: hedging.HedgingPolicy | None,
+) -> inference.BaseLanguageModel:
+  """Builds the language model of `extract` from its arguments."""
   # Generate schema constraints if enabled
   model_schema = None
   schema_constraint = None
@@ -210,6 +669,8 @@ def extract(
       "model_url": model_url,
       "constraint": schema_constraint,
       "max_workers": max_workers,
+      "rate_limiter": rate_limiter,
+      "hedging_policy": hedging_policy,
   }
 
   # Merge user-provided params which have precedence over defaults.
@@ -217,42 +678,4 @@ def extract(
 
   filtered_kwargs = {k: v for k, v in base_lm_kwargs.items() if v is not None}
 
-  language_model = language_model_type(**filtered_kwargs)
-
-  resolver_defaults = {
-      "fence_output": fence_output,
-      "format_type": format_type,
-      "extraction_attributes_suffix": "_attributes",
-      "extraction_index_suffix": None,
-  }
-  resolver_defaults.update(resolver_params or {})
-
-  res = resolver.Resolver(**resolver_defaults)
-
-  annotator = annotation.Annotator(
-      language_model=language_model,
-      prompt_template=prompt_template,
-      format_type=format_type,
-      fence_output=fence_output,
-  )
-
-  if isinstance(text_or_documents, str):
-    return annotator.annotate_text(
-        text=text_or_documents,
-        resolver=res,
-        max_char_buffer=max_char_buffer,
-        batch_length=batch_length,
-        additional_context=additional_context,
-        debug=debug,
-        extraction_passes=extraction_passes,
-    )
-  else:
-    documents = cast(Iterable[data.Document], text_or_documents)
-    return annotator.annotate_documents(
-        documents=documents,
-        resolver=res,
-        max_char_buffer=max_char_buffer,
-        batch_length=batch_length,
-        debug=debug,
-        extraction_passes=extraction_passes,
-    )
+  return language_model_type(**filtered_kwargs)
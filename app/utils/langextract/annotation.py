@@ -21,29 +21,229 @@ structured annotations.
 Usage example:
     annotator = Annotator(language_model, prompt_template)
     annotated_documents = annotator.annotate_documents(documents, resolver)
+
+    # Or, from a coroutine:
+    async for annotated_document in annotator.annotate_documents_async(
+        documents, resolver
+    ):
+      ...
 """
 
-from collections.abc import Iterable, Iterator, Sequence
+import asyncio
+import bisect
+import collections
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+import concurrent.futures
+import dataclasses
+import functools
 import itertools
+import math
+import queue
+import threading
 import time
+from typing import TypeVar
 
 from absl import logging
+import tqdm
 
+from langextract import caching
+from langextract import checkpoint as checkpoint_lib
 from langextract import chunking
 from langextract import data
+from langextract import example_selection
 from langextract import exceptions
 from langextract import inference
 from langextract import progress
 from langextract import prompting
 from langextract import resolver as resolver_lib
+from langextract import retry as retry_lib
+from langextract import tokenizer
 
 ATTRIBUTE_SUFFIX = "_attributes"
 
+_T = TypeVar("_T")
+
+# How often a stream waiting on a full results queue checks that the consumer
+# of `annotate_text_stream` has not stopped.
+_STREAM_POLL_SECONDS = 0.1
+
 
 class DocumentRepeatError(exceptions.LangExtractError):
   """Exception raised when identical document ids are present."""
 
 
+@dataclasses.dataclass
+class StageTimings:
+  """Wall-clock seconds spent in each stage of batch annotation.
+
+  With pipelining, the prompt and inference stages run concurrently with the
+  resolve and align stages, so the stage times can add up to more than the
+  elapsed time. `inference_wait_seconds` is how long resolution sat idle
+  waiting for inference: if it is close to zero, the resolver is the
+  bottleneck.
+
+  Attributes:
+    batches: Number of batches annotated.
+    prompt_seconds: Time spent rendering prompts.
+    inference_seconds: Time spent in `BaseLanguageModel.infer`.
+    resolve_seconds: Time spent in `Resolver.resolve`.
+    align_seconds: Time spent in `Resolver.align`.
+    inference_wait_seconds: Time resolution waited for inference results.
+    first_extraction_seconds: Time from the start of `annotate_text_stream`
+      until its first extraction was aligned, or None.
+  """
+
+  batches: int = 0
+  prompt_seconds: float = 0.0
+  inference_seconds: float = 0.0
+  resolve_seconds: float = 0.0
+  align_seconds: float = 0.0
+  inference_wait_seconds: float = 0.0
+  first_extraction_seconds: float | None = None
+
+
+@dataclasses.dataclass
+class _ChunkCheckpoint:
+  """Where a chunk's result is checkpointed, and the result if restored."""
+
+  key: checkpoint_lib.ChunkKey
+  prompt_key: str
+  restored: list[data.Extraction] | None = None
+
+
+@dataclasses.dataclass
+class _ChunkInference:
+  """A chunk of a batch with its prompt and latest inference result.
+
+  Attributes:
+    text_chunk: The chunk.
+    prompt: The rendered prompt for the chunk.
+    scored_outputs: The model's outputs, the exception inference failed with,
+      or None if the chunk was restored from a checkpoint or not inferred.
+    attempts: Number of times the prompt was sent to the model.
+    checkpoint: Where the chunk is checkpointed, if a store is in use.
+  """
+
+  text_chunk: chunking.TextChunk
+  prompt: str
+  scored_outputs: Sequence[inference.ScoredOutput] | Exception | None = None
+  attempts: int = 0
+  checkpoint: _ChunkCheckpoint | None = None
+
+  @property
+  def restored(self) -> list[data.Extraction] | None:
+    return None if self.checkpoint is None else self.checkpoint.restored
+
+
+def _run_ahead(items: Iterator[_T], depth: int) -> Iterator[_T]:
+  """Yields from `items` while a background thread computes the next ones.
+
+  Args:
+    items: Iterator to consume on the background thread.
+    depth: Maximum number of computed items waiting to be yielded.
+
+  Yields:
+    The items of `items`, in order. An exception raised by `items` is
+    re-raised here.
+  """
+  results: queue.Queue = queue.Queue(maxsize=depth)
+  stopped = threading.Event()
+  end = object()
+
+  def put(item) -> bool:
+    while not stopped.is_set():
+      try:
+        results.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  def produce() -> None:
+    try:
+      for item in items:
+        if not put((item, None)):
+          return
+      put((end, None))
+    except BaseException as e:  # pylint: disable=broad-exception-caught
+      put((None, e))
+
+  threading.Thread(
+      target=produce, name="annotation-run-ahead", daemon=True
+  ).start()
+  try:
+    while True:
+      item, error = results.get()
+      if error is not None:
+        raise error
+      if item is end:
+        return
+      yield item
+  finally:
+    # Lets the producer exit if the consumer stops early.
+    stopped.set()
+
+
+class _OverlapIndex:
+  """Answers whether a character span overlaps any span added so far.
+
+  Spans are kept as a sorted list of disjoint segments, the union of the
+  added spans. Overlap uses the same strict test as `_extractions_overlap`,
+  so spans that only touch do not overlap. Because no two segments overlap,
+  their ends are sorted along with their starts, and only the last segment
+  starting before a span's end can overlap it.
+  """
+
+  def __init__(self, spans: Iterable[tuple[int, int]] = ()):
+    """Initializes the index with `spans`, merged in a single sorted pass."""
+    self._segments: list[tuple[int, int]] = []
+    for start, end in sorted(spans):
+      if self._segments and self._segments[-1][1] > start:
+        # Sorted by start, so the last segment is the only candidate.
+        last_start, last_end = self._segments[-1]
+        if last_start < end:
+          self._segments[-1] = (last_start, max(last_end, end))
+          continue
+      self._segments.append((start, end))
+
+  def _overlapping_range(self, start: int, end: int) -> tuple[int, int]:
+    """Returns the slice of segments that overlap [start, end)."""
+    stop = bisect.bisect_left(self._segments, (end, -math.inf))
+    first = stop
+    while first > 0 and self._segments[first - 1][1] > start:
+      first -= 1
+    return first, stop
+
+  def overlaps(self, start: int, end: int) -> bool:
+    first, stop = self._overlapping_range(start, end)
+    return first < stop
+
+  def add(self, start: int, end: int) -> None:
+    first, stop = self._overlapping_range(start, end)
+    if first < stop:
+      start = min(start, self._segments[first][0])
+      end = max(end, self._segments[stop - 1][1])
+      del self._segments[first:stop]
+    bisect.insort(self._segments, (start, end))
+
+
+def _char_span(extraction: data.Extraction) -> tuple[int, int] | None:
+  """Returns the extraction's character span, or None if it is not aligned."""
+  if extraction.char_interval is None:
+    return None
+  start = extraction.char_interval.start_pos
+  end = extraction.char_interval.end_pos
+  if start is None or end is None:
+    return None
+  return start, end
+
+
 def _merge_non_overlapping_extractions(
     all_extractions: list[Iterable[data.Extraction]],
 ) -> list[data.Extraction]:
@@ -52,6 +252,7 @@ def _merge_non_overlapping_extractions(
   When extractions from different passes overlap in their character positions,
   the extraction from the earlier pass is kept (first-pass wins strategy).
   Only non-overlapping extractions from later passes are added to the result.
+  Each overlap check takes logarithmic time in the number of kept extractions.
 
   Args:
     all_extractions: List of extraction iterables from different sequential
@@ -68,19 +269,20 @@ def _merge_non_overlapping_extractions(
     return list(all_extractions[0])
 
   merged_extractions = list(all_extractions[0])
+  kept_spans = _OverlapIndex(
+      span
+      for span in map(_char_span, merged_extractions)
+      if span is not None
+  )
 
   for pass_extractions in all_extractions[1:]:
     for extraction in pass_extractions:
-      overlaps = False
-      if extraction.char_interval is not None:
-        for existing_extraction in merged_extractions:
-          if existing_extraction.char_interval is not None:
-            if _extractions_overlap(extraction, existing_extraction):
-              overlaps = True
-              break
-
-      if not overlaps:
+      span = _char_span(extraction)
+      if span is None:
+        merged_extractions.append(extraction)
+      elif not kept_spans.overlaps(*span):
         merged_extractions.append(extraction)
+        kept_spans.add(*span)
 
   return merged_extractions
 
@@ -116,10 +318,33 @@ def _extractions_overlap(
   return start1 < end2 and start2 < end1
 
 
+def _text_document_id(text: str, additional_context: str | None) -> str:
+  """Returns a document ID that is stable across runs for the same text."""
+  digest = caching.make_cache_key(
+      text=text, additional_context=additional_context
+  )
+  return f"text_{digest[:16]}"
+
+
+async def _run_in_executor(
+    executor: concurrent.futures.Executor,
+    func: Callable[..., _T],
+    *args,
+    **kwargs,
+) -> _T:
+  """Runs `func` in `executor` without blocking the event loop."""
+  return await asyncio.get_running_loop().run_in_executor(
+      executor, functools.partial(func, *args, **kwargs)
+  )
+
+
 def _document_chunk_iterator(
     documents: Iterable[data.Document],
     max_char_buffer: int,
     restrict_repeats: bool = True,
+    segmenter: tokenizer.Segmenter | None = None,
+    max_tokens: Callable[[data.Document], int | None] | None = None,
+    token_counter: chunking.TokenCounter | None = None,
 ) -> Iterator[chunking.TextChunk]:
   """Iterates over documents to yield text chunks along with the document ID.
 
@@ -128,6 +353,13 @@ def _document_chunk_iterator(
     max_char_buffer: The maximum character buffer size for the ChunkIterator.
     restrict_repeats: Whether to restrict the same document id from being
       visited more than once.
+    segmenter: Optional CJK word segmenter. When set, documents are
+      re-tokenized with it so their tokens match the resolver's alignment.
+      The chunks then refer to a copy of each document, so the caller's
+      documents keep their own tokens.
+    max_tokens: Optional function returning the maximum model tokens per
+      chunk of a document, or None for no token limit.
+    token_counter: Counts model tokens for max_tokens.
 
   Yields:
     TextChunk containing document ID for a corresponding document.
@@ -139,8 +371,17 @@ def _document_chunk_iterator(
   """
   visited_ids = set()
   for document in documents:
-    tokenized_text = document.tokenized_text
     document_id = document.document_id
+    if segmenter is not None:
+      document = data.Document(
+          text=document.text,
+          document_id=document_id,
+          additional_context=document.additional_context,
+      )
+      document.tokenized_text = tokenizer.tokenize_cached(
+          document.text, segmenter
+      )
+    tokenized_text = document.tokenized_text
     if restrict_repeats and document_id in visited_ids:
       raise DocumentRepeatError(
           f"Document id {document_id} is already visited."
@@ -149,6 +390,8 @@ def _document_chunk_iterator(
         text=tokenized_text,
         max_char_buffer=max_char_buffer,
         document=document,
+        max_tokens=None if max_tokens is None else max_tokens(document),
+        token_counter=token_counter,
     )
     visited_ids.add(document_id)
 
@@ -165,6 +408,10 @@ class Annotator:
       format_type: data.FormatType = data.FormatType.YAML,
       attribute_suffix: str = ATTRIBUTE_SUFFIX,
       fence_output: bool = False,
+      segmenter: tokenizer.Segmenter | None = None,
+      example_selector: example_selection.ExampleSelector | None = None,
+      max_prompt_tokens: int | None = None,
+      token_counter: chunking.TokenCounter | None = None,
   ):
     """Initializes Annotator.
 
@@ -178,8 +425,29 @@ class Annotator:
         ```yaml). When True, the model is prompted to generate fenced output and
         the resolver expects it. When False, raw JSON/YAML is expected. Defaults
         to True.
+      segmenter: Optional CJK word segmenter used to tokenize documents. Pass
+        the same segmenter to the resolver so alignment sees the same tokens.
+      example_selector: Optional selector of the few-shot examples most
+        similar to each chunk. By default every prompt.txt carries all
+        examples.
+      max_prompt_tokens: Optional budget of model tokens per prompt.txt.
+        Chunks are packed up to what the budget leaves after the rest of the
+        rendered prompt.txt (description, additional context, examples and
+        question and answer prefixes); max_char_buffer still applies as well.
+      token_counter: Counts model tokens, e.g. with the model's tokenizer, for
+        max_prompt_tokens and the example selector's budget. Defaults to
+        `tokenizer.estimate_tokens`.
     """
     self._language_model = language_model
+    self._segmenter = segmenter
+    self._example_selector = example_selector
+    self._max_prompt_tokens = max_prompt_tokens
+    self._token_counter = token_counter or tokenizer.estimate_tokens
+    # Token counts of the formatted examples they were computed for.
+    self._example_tokens: tuple[list[str] | None, list[int]] = (None, [])
+    # Chunk token budgets by additional context.
+    self._chunk_token_budgets: dict[str | None, int] = {}
+    self.stage_timings = StageTimings()
     self._prompt_generator = prompting.QAPromptGenerator(
         prompt_template,
         format_type=format_type,
@@ -191,6 +459,111 @@ class Annotator:
         "Initialized Annotator with prompt.txt:\n%s", self._prompt_generator
     )
 
+  def _select_examples(
+      self, text_chunk: chunking.TextChunk
+  ) -> list[int] | None:
+    """Returns the examples to prompt with for a chunk; None for all."""
+    if self._example_selector is None:
+      return None
+    return self._example_selector.select(
+        self._prompt_generator.template.examples,
+        text_chunk.chunk_text,
+        example_tokens=self._example_token_counts(),
+    )
+
+  def _example_token_counts(self) -> list[int]:
+    """Returns the model tokens of each example as formatted in the prompt."""
+    example_texts = self._prompt_generator.formatted_examples()
+    if self._example_tokens[0] is not example_texts:
+      self._example_tokens = (
+          example_texts,
+          [self._token_counter(text) for text in example_texts],
+      )
+    return self._example_tokens[1]
+
+  def _chunk_token_budget(self, document: data.Document) -> int | None:
+    """Returns the model tokens max_prompt_tokens leaves for a chunk.
+
+    Args:
+      document: The document being chunked.
+
+    Returns:
+      The budget, or None without max_prompt_tokens.
+
+    Raises:
+      ValueError: If the rest of the prompt.txt takes the whole budget.
+    """
+    if self._max_prompt_tokens is None:
+      return None
+    additional_context = document.additional_context or None
+    budget = self._chunk_token_budgets.get(additional_context)
+    if budget is not None:
+      return budget
+
+    if self._example_selector is None:
+      reserved = self._token_counter(
+          self._prompt_generator.render("", additional_context)
+      )
+    else:
+      # Reserve room for the largest selection the selector can make.
+      example_tokens = sorted(self._example_token_counts(), reverse=True)
+      if self._example_selector.max_examples is not None:
+        example_tokens = example_tokens[: self._example_selector.max_examples]
+      reserved_examples = sum(example_tokens)
+      if self._example_selector.max_tokens is not None and example_tokens:
+        reserved_examples = min(
+            reserved_examples,
+            max(self._example_selector.max_tokens, example_tokens[0]),
+        )
+      reserved = (
+          self._token_counter(
+              self._prompt_generator.render(
+                  "", additional_context, example_indices=()
+              )
+          )
+          + self._token_counter(self._prompt_generator.examples_heading)
+          + reserved_examples
+      )
+
+    budget = self._max_prompt_tokens - reserved
+    if budget < 1:
+      raise ValueError(
+          f"max_prompt_tokens ({self._max_prompt_tokens}) leaves no room for"
+          f" the chunk; the rest of the prompt.txt takes {reserved} tokens."
+      )
+    self._chunk_token_budgets[additional_context] = budget
+    return budget
+
+  def _chunk_documents(
+      self, documents: Iterable[data.Document], max_char_buffer: int
+  ) -> Iterator[chunking.TextChunk]:
+    """Chunks documents within max_char_buffer and max_prompt_tokens."""
+    return _document_chunk_iterator(
+        documents,
+        max_char_buffer,
+        segmenter=self._segmenter,
+        max_tokens=self._chunk_token_budget,
+        token_counter=self._token_counter,
+    )
+
+  def _render_prompt(self, text_chunk: chunking.TextChunk) -> str:
+    """Renders the prompt.txt for a chunk.
+
+    The prompt.txt prefix shared by the chunks is registered with the language
+    model, so that backends with provider-side prompt caching can mark it.
+    """
+    example_indices = self._select_examples(text_chunk)
+    self._language_model.register_prompt_prefix(
+        self._prompt_generator.prefix(
+            text_chunk.additional_context, example_indices
+        )
+    )
+    return self._prompt_generator.render(
+        question=text_chunk.chunk_text,
+        additional_context=text_chunk.additional_context,
+        example_indices=example_indices,
+    )
+
   def annotate_documents(
       self,
       documents: Iterable[data.Document],
@@ -201,6 +574,11 @@ class Annotator:
       batch_length: int = 1,
       debug: bool = True,
       extraction_passes: int = 1,
+      pipeline_depth: int = 0,
+      interleave_passes: bool = False,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
       **kwargs,
   ) -> Iterator[data.AnnotatedDocument]:
     """Annotates a sequence of documents with NLP extractions.
@@ -223,30 +601,156 @@ class Annotator:
         standard single extraction.
         Values > 1 reprocess tokens multiple times, potentially increasing
         costs with the potential for a more thorough extraction.
+      pipeline_depth: Number of batches whose inference may run ahead of
+        resolution and alignment on a background thread, so the network and
+        the CPU are busy at the same time. 0 (the default) processes each
+        batch to completion before starting the next. Per-stage timings are
+        recorded in `stage_timings` either way.
+      interleave_passes: With extraction_passes > 1, whether to run all passes
+        in one sweep over the documents instead of one sweep per pass. Each
+        batch then holds every pass of batch_length chunks, so the model sees
+        extraction_passes times the concurrency, and each document is merged
+        and yielded as soon as all of its passes are resolved. The merged
+        result is the same as with sequential passes.
+      checkpoint: Optional store in which each resolved chunk and each
+        completed document is recorded. Rerunning with the same store yields
+        completed documents without annotating them again and only sends
+        chunks that were not finished to the model, so an interrupted run can
+        be resumed. Documents need stable IDs to be resumed.
+      retry_policy: Optional policy for retrying chunks whose inference fails
+        with a transient error or whose output cannot be parsed. Only the
+        failed prompts are sent again, so the rest of the batch and document
+        are not re-billed. None (the default) fails on the first error.
+      allow_partial_documents: Whether a chunk that still fails after its
+        retries is left out of its document rather than failing the run. The
+        document's `failed_chunks` then records the chunk's character range,
+        pass and error, and it is not recorded as complete in `checkpoint`.
       **kwargs: Additional arguments passed to LanguageModel.infer and Resolver.
 
     Yields:
       Resolved annotations from input documents.
 
     Raises:
-      ValueError: If there are no scored outputs during inference.
+      ValueError: If there are no scored outputs during inference, or if
+        pipeline_depth is negative.
     """
-
-    if extraction_passes == 1:
-      yield from self._annotate_documents_single_pass(
-          documents, resolver, max_char_buffer, batch_length, debug, **kwargs
-      )
-    else:
-      yield from self._annotate_documents_sequential_passes(
-          documents,
+    if pipeline_depth < 0:
+      raise ValueError("pipeline_depth must be non-negative.")
+    self.stage_timings = StageTimings()
+
+    def annotate(
+        pending_documents: Iterable[data.Document],
+    ) -> Iterator[data.AnnotatedDocument]:
+      if extraction_passes == 1 or interleave_passes:
+        return self._annotate_documents_single_pass(
+            pending_documents,
+            resolver,
+            max_char_buffer,
+            batch_length,
+            debug,
+            pipeline_depth,
+            extraction_passes=extraction_passes,
+            checkpoint=checkpoint,
+            retry_policy=retry_policy,
+            allow_partial_documents=allow_partial_documents,
+            **kwargs,
+        )
+      return self._annotate_documents_sequential_passes(
+          pending_documents,
           resolver,
           max_char_buffer,
           batch_length,
           debug,
           extraction_passes,
+          pipeline_depth,
+          checkpoint=checkpoint,
+          retry_policy=retry_policy,
+          allow_partial_documents=allow_partial_documents,
           **kwargs,
       )
 
+    if checkpoint is None:
+      yield from annotate(documents)
+    else:
+      yield from self._resume_documents(
+          documents,
+          annotate,
+          checkpoint,
+          self._checkpoint_settings(max_char_buffer, extraction_passes),
+      )
+
+  def _checkpoint_settings(
+      self, max_char_buffer: int, extraction_passes: int
+  ) -> str:
+    """Returns a hash of the settings that determine a document's result."""
+    settings = dict(
+        model=self._language_model.cache_key_fields(),
+        prompt=self._prompt_generator.render(question=""),
+        max_char_buffer=max_char_buffer,
+        extraction_passes=extraction_passes,
+    )
+    # Only set when used, so earlier checkpoints remain valid.
+    if self._max_prompt_tokens is not None:
+      settings["max_prompt_tokens"] = self._max_prompt_tokens
+    return caching.make_cache_key(**settings)
+
+  def _resume_documents(
+      self,
+      documents: Iterable[data.Document],
+      annotate: Callable[
+          [Iterable[data.Document]], Iterator[data.AnnotatedDocument]
+      ],
+      checkpoint: checkpoint_lib.CheckpointStore,
+      settings: str,
+  ) -> Iterator[data.AnnotatedDocument]:
+    """Restores completed documents from `checkpoint` and annotates the rest.
+
+    Args:
+      documents: Documents to annotate.
+      annotate: Annotates the documents that are not complete.
+      checkpoint: Where completed documents are looked up and recorded.
+      settings: Hash of the annotation settings, from `_checkpoint_settings`.
+
+    Yields:
+      Annotated documents in input order.
+    """
+    # Documents read but not yet yielded, with the fingerprint they are
+    # recorded under and their restored annotation, if complete.
+    pending: collections.deque[
+        tuple[data.Document, str, data.AnnotatedDocument | None]
+    ] = collections.deque()
+
+    def unfinished_documents() -> Iterator[data.Document]:
+      for document in documents:
+        fingerprint = caching.make_cache_key(
+            settings=settings,
+            text=document.text,
+            additional_context=document.additional_context,
+        )
+        restored = checkpoint.get_document(document.document_id, fingerprint)
+        pending.append((document, fingerprint, restored))
+        if restored is None:
+          yield document
+        else:
+          logging.info(
+              "Restored document ID %s from checkpoint.", document.document_id
+          )
+
+    for annotated_doc in annotate(unfinished_documents()):
+      while True:
+        document, fingerprint, restored = pending.popleft()
+        if restored is not None:
+          yield restored
+        elif document.document_id == annotated_doc.document_id:
+          break
+      if annotated_doc.failed_chunks is None:
+        checkpoint.put_document(annotated_doc, fingerprint)
+      yield annotated_doc
+
+    for _, _, restored in pending:
+      if restored is not None:
+        yield restored
+
   def _annotate_documents_single_pass(
       self,
       documents: Iterable[data.Document],
@@ -254,21 +758,46 @@ class Annotator:
       max_char_buffer: int,
       batch_length: int,
       debug: bool,
+      pipeline_depth: int = 0,
+      extraction_passes: int = 1,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      first_pass: int = 0,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
       **kwargs,
   ) -> Iterator[data.AnnotatedDocument]:
-    """Single-pass annotation logic (original implementation)."""
+    """Single-sweep annotation logic, optionally pipelined.
 
-    logging.info("Starting document annotation.")
-    doc_iter, doc_iter_for_chunks = itertools.tee(documents, 2)
-    curr_document = next(doc_iter, None)
-    if curr_document is None:
-      logging.warning("No documents to process.")
-      return
+    With extraction_passes > 1, each chunk is sent once per pass within the
+    same batch and a document's passes are merged when it completes. Chunks
+    are checkpointed and reported as failed under pass numbers starting at
+    first_pass.
+    """
 
-    annotated_extractions: list[data.Extraction] = []
-    chunk_iter = _document_chunk_iterator(doc_iter_for_chunks, max_char_buffer)
+    logging.info("Starting document annotation.")
+    timings = self.stage_timings
+    # Documents in the order the chunker reads them. With pipelining the
+    # chunker runs on another thread, so documents are handed over here
+    # rather than by re-iterating `documents`.
+    chunked_documents: collections.deque[data.Document] = collections.deque()
+
+    def record_documents() -> Iterator[data.Document]:
+      for document in documents:
+        chunked_documents.append(document)
+        yield document
+
+    chunk_iter = self._chunk_documents(record_documents(), max_char_buffer)
+    if extraction_passes > 1:
+      # Consecutive copies of a chunk are its passes, in pass order.
+      chunk_iter = (
+          text_chunk
+          for text_chunk in chunk_iter
+          for _ in range(extraction_passes)
+      )
 
-    batches = chunking.make_batches_of_textchunk(chunk_iter, batch_length)
+    batches = chunking.make_batches_of_textchunk(
+        chunk_iter, batch_length * extraction_passes
+    )
 
     model_info = progress.get_model_info(self._language_model)
 
@@ -276,119 +805,386 @@ class Annotator:
         batches, model_info=model_info, disable=not debug
     )
 
-    chars_processed = 0
-
-    for index, batch in enumerate(progress_bar):
-      logging.info("Processing batch %d with length %d", index, len(batch))
-
-      batch_prompts: list[str] = []
-      for text_chunk in batch:
-        batch_prompts.append(
-            self._prompt_generator.render(
-                question=text_chunk.chunk_text,
-                additional_context=text_chunk.additional_context,
-            )
-        )
-
-      # Show what we're currently processing
-      if debug and progress_bar:
-        batch_size = sum(len(chunk.chunk_text) for chunk in batch)
-        desc = progress.format_extraction_progress(
-            model_info,
-            current_chars=batch_size,
-            processed_chars=chars_processed,
-        )
-        progress_bar.set_description(desc)
+    batch_results = self._infer_batches(
+        progress_bar,
+        model_info,
+        debug,
+        extraction_passes,
+        checkpoint=checkpoint,
+        first_pass=first_pass,
+        retry_policy=retry_policy,
+        isolate_failures=retry_policy is not None or allow_partial_documents,
+        **kwargs,
+    )
+    if pipeline_depth > 0:
+      batch_results = _run_ahead(batch_results, pipeline_depth)
 
-      batch_scored_outputs = self._language_model.infer(
-          batch_prompts=batch_prompts,
-          **kwargs,
+    curr_document = None
+    pass_extractions: list[list[data.Extraction]] = [
+        [] for _ in range(extraction_passes)
+    ]
+    failed_chunks: list[data.ChunkFailure] = []
+    chunks_resolved = 0
+
+    def annotated_document(document: data.Document) -> data.AnnotatedDocument:
+      return data.AnnotatedDocument(
+          document_id=document.document_id,
+          extractions=_merge_non_overlapping_extractions(pass_extractions),
+          text=document.text,
+          failed_chunks=failed_chunks or None,
       )
 
-      # Update total processed
-      if debug:
-        for chunk in batch:
-          if chunk.document_text:
-            char_interval = chunk.char_interval
-            chars_processed += char_interval.end_pos - char_interval.start_pos
+    while True:
+      wait_start = time.perf_counter()
+      batch = next(batch_results, None)
+      timings.inference_wait_seconds += time.perf_counter() - wait_start
+      if batch is None:
+        break
+      timings.batches += 1
 
-        # Update progress bar with final processed count
-        if progress_bar:
-          batch_size = sum(len(chunk.chunk_text) for chunk in batch)
-          desc = progress.format_extraction_progress(
-              model_info,
-              current_chars=batch_size,
-              processed_chars=chars_processed,
-          )
-          progress_bar.set_description(desc)
-
-      for text_chunk, scored_outputs in zip(batch, batch_scored_outputs):
+      for chunk in batch:
+        text_chunk = chunk.text_chunk
         logging.debug("Processing chunk: %s", text_chunk)
-        if not scored_outputs:
+        if (
+            chunk.restored is None
+            and not chunk.scored_outputs
+            and not allow_partial_documents
+        ):
           logging.error(
               "No scored outputs for chunk with ID %s.", text_chunk.document_id
           )
           raise inference.InferenceOutputError(
               "No scored outputs from language model."
           )
+        if curr_document is None:
+          curr_document = chunked_documents.popleft()
         while curr_document.document_id != text_chunk.document_id:
           logging.info(
               "Completing annotation for document ID %s.",
               curr_document.document_id,
           )
-          annotated_doc = data.AnnotatedDocument(
-              document_id=curr_document.document_id,
-              extractions=annotated_extractions,
-              text=curr_document.text,
-          )
-          yield annotated_doc
-          annotated_extractions.clear()
+          yield annotated_document(curr_document)
+          pass_extractions = [[] for _ in range(extraction_passes)]
+          failed_chunks = []
 
-          curr_document = next(doc_iter, None)
+          curr_document = (
+              chunked_documents.popleft() if chunked_documents else None
+          )
           assert curr_document is not None, (
               f"Document should be defined for {text_chunk} per"
               " _document_chunk_iterator(...) specifications."
           )
 
-        top_inference_result = scored_outputs[0].output
-        logging.debug("Top inference result: %s", top_inference_result)
+        pass_index = chunks_resolved % extraction_passes
+        chunks_resolved += 1
+        if chunk.restored is not None:
+          pass_extractions[pass_index].extend(chunk.restored)
+          continue
 
-        annotated_chunk_extractions = resolver.resolve(
-            top_inference_result, debug=debug, **kwargs
-        )
-        chunk_text = text_chunk.chunk_text
-        token_offset = text_chunk.token_interval.start_index
-        char_offset = text_chunk.char_interval.start_pos
-
-        aligned_extractions = resolver.align(
-            annotated_chunk_extractions,
-            chunk_text,
-            token_offset,
-            char_offset,
-            **kwargs,
-        )
-
-        annotated_extractions.extend(aligned_extractions)
+        try:
+          aligned_extractions = self._resolve_chunk(
+              chunk, resolver, debug, retry_policy, **kwargs
+          )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+          if not allow_partial_documents:
+            raise
+          logging.error(
+              "Leaving out chunk %s of document ID %s after %d attempts: %s",
+              text_chunk.char_interval,
+              text_chunk.document_id,
+              chunk.attempts,
+              e,
+          )
+          failed_chunks.append(
+              data.ChunkFailure(
+                  char_interval=text_chunk.char_interval,
+                  extraction_pass=first_pass + pass_index,
+                  attempts=chunk.attempts,
+                  error=str(e),
+              )
+          )
+          continue
+
+        if chunk.checkpoint is not None:
+          checkpoint.put_chunk(
+              chunk.checkpoint.key,
+              chunk.checkpoint.prompt_key,
+              chunk.scored_outputs[0].output,
+              aligned_extractions,
+          )
+        pass_extractions[pass_index].extend(aligned_extractions)
 
     progress_bar.close()
 
     if debug:
       progress.print_extraction_complete()
+    logging.info("Annotation stage timings: %s", timings)
 
-    if curr_document is not None:
-      logging.info(
-          "Finalizing annotation for document ID %s.", curr_document.document_id
-      )
-      annotated_doc = data.AnnotatedDocument(
-          document_id=curr_document.document_id,
-          extractions=annotated_extractions,
-          text=curr_document.text,
-      )
+    if curr_document is None:
+      # No document produced a chunk.
+      curr_document = chunked_documents.popleft() if chunked_documents else None
+      if curr_document is None:
+        logging.warning("No documents to process.")
+        return
 
-      yield annotated_doc
+    logging.info(
+        "Finalizing annotation for document ID %s.", curr_document.document_id
+    )
+    yield annotated_document(curr_document)
 
     logging.info("Document annotation completed.")
 
+  def _resolve_chunk(
+      self,
+      chunk: _ChunkInference,
+      resolver: resolver_lib.AbstractResolver,
+      debug: bool,
+      retry_policy: retry_lib.RetryPolicy | None,
+      **kwargs,
+  ) -> list[data.Extraction]:
+    """Resolves and aligns a chunk's extractions.
+
+    If inference failed or the output cannot be parsed, the chunk's prompt is
+    sent again while `retry_policy` allows, and `chunk` is updated with the
+    output that was resolved.
+
+    Args:
+      chunk: The chunk with its inference result.
+      resolver: Resolver to use for extracting information from text.
+      debug: Whether to populate debug fields.
+      retry_policy: Optional policy for retrying the chunk.
+      **kwargs: Additional arguments passed to LanguageModel.infer and
+        Resolver.
+
+    Returns:
+      The chunk's aligned extractions.
+
+    Raises:
+      InferenceOutputError: If the model returned no outputs.
+      Exception: The last error, once it is not retried.
+    """
+    timings = self.stage_timings
+    text_chunk = chunk.text_chunk
+    while True:
+      error = chunk.scored_outputs
+      if not isinstance(error, Exception):
+        if not chunk.scored_outputs:
+          raise inference.InferenceOutputError(
+              "No scored outputs from language model."
+          )
+        top_inference_result = chunk.scored_outputs[0].output
+        logging.debug("Top inference result: %s", top_inference_result)
+        try:
+          stage_start = time.perf_counter()
+          annotated_chunk_extractions = resolver.resolve(
+              top_inference_result, debug=debug, **kwargs
+          )
+          timings.resolve_seconds += time.perf_counter() - stage_start
+        except resolver_lib.ResolverParsingError as e:
+          error = e
+        else:
+          stage_start = time.perf_counter()
+          aligned_extractions = list(
+              resolver.align(
+                  annotated_chunk_extractions,
+                  text_chunk.chunk_text,
+                  text_chunk.token_interval.start_index,
+                  text_chunk.char_interval.start_pos,
+                  tokenized_text=text_chunk.document_text,
+                  token_interval=text_chunk.token_interval,
+                  **kwargs,
+              )
+          )
+          timings.align_seconds += time.perf_counter() - stage_start
+          return aligned_extractions
+
+      if retry_policy is None or not retry_policy.should_retry(
+          error, chunk.attempts
+      ):
+        raise error
+      kind = retry_lib.classify_error(error)
+      delay = retry_policy.backoff_seconds(chunk.attempts, kind)
+      logging.warning(
+          "Retrying chunk of document ID %s in %.1fs after attempt %d failed"
+          " (%s): %s",
+          text_chunk.document_id,
+          delay,
+          chunk.attempts,
+          kind.value,
+          error,
+      )
+      time.sleep(delay)
+      if kind is retry_lib.FailureKind.PARSE_ERROR:
+        self._language_model.invalidate([chunk.prompt], **kwargs)
+      stage_start = time.perf_counter()
+      chunk.scored_outputs = self._language_model.infer_isolated(
+          [chunk.prompt], **kwargs
+      )[0]
+      chunk.attempts += 1
+      timings.inference_seconds += time.perf_counter() - stage_start
+
+  def _infer_chunks(
+      self,
+      chunks: Sequence[_ChunkInference],
+      retry_policy: retry_lib.RetryPolicy | None,
+      isolate_failures: bool,
+      **kwargs,
+  ) -> None:
+    """Runs inference on the chunks, retrying failed prompts per policy.
+
+    Each chunk's `scored_outputs` is set to its outputs or, with
+    isolate_failures, to the error its last attempt failed with. Only failed
+    prompts are retried, all together after the longest of their backoffs.
+
+    Args:
+      chunks: Chunks to run inference on.
+      retry_policy: Optional policy for retrying failed prompts.
+      isolate_failures: Whether a failed prompt is recorded on its chunk
+        instead of failing the batch.
+      **kwargs: Additional arguments passed to LanguageModel.infer.
+    """
+    pending = list(chunks)
+    while pending:
+      prompts = [chunk.prompt for chunk in pending]
+      if isolate_failures:
+        outputs = self._language_model.infer_isolated(prompts, **kwargs)
+      else:
+        outputs = self._language_model.infer(batch_prompts=prompts, **kwargs)
+
+      retries = []
+      delay = 0.0
+      for chunk, scored_outputs in zip(pending, outputs):
+        chunk.scored_outputs = scored_outputs
+        chunk.attempts += 1
+        if isinstance(scored_outputs, Exception) and (
+            retry_policy is not None
+            and retry_policy.should_retry(scored_outputs, chunk.attempts)
+        ):
+          retries.append(chunk)
+          delay = max(
+              delay,
+              retry_policy.backoff_seconds(
+                  chunk.attempts, retry_lib.classify_error(scored_outputs)
+              ),
+          )
+      if retries:
+        logging.warning(
+            "Retrying %d of %d prompts in %.1fs; first error: %s",
+            len(retries),
+            len(pending),
+            delay,
+            retries[0].scored_outputs,
+        )
+        time.sleep(delay)
+      pending = retries
+
+  def _infer_batches(
+      self,
+      progress_bar: tqdm.tqdm,
+      model_info: str | None,
+      debug: bool,
+      extraction_passes: int = 1,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      first_pass: int = 0,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      isolate_failures: bool = False,
+      **kwargs,
+  ) -> Iterator[list[_ChunkInference]]:
+    """Renders prompts for each batch and runs inference on them.
+
+    Args:
+      progress_bar: Batches of chunks, wrapped in a progress bar.
+      model_info: Model description shown in the progress bar.
+      debug: Whether to update the progress bar.
+      extraction_passes: Number of copies of each chunk in the batches, so
+        that progress counts each chunk's characters once.
+      checkpoint: Optional store of finished chunks. Chunks found in it are
+        not sent to the model.
+      first_pass: Pass number of the first copy of each chunk in checkpoints.
+      retry_policy: Optional policy for retrying failed prompts.
+      isolate_failures: Whether a failed prompt is recorded on its chunk
+        instead of failing the batch.
+      **kwargs: Additional arguments passed to LanguageModel.infer.
+
+    Yields:
+      Each batch, with each chunk's prompt, inference result and checkpoint.
+    """
+    timings = self.stage_timings
+    chars_processed = 0
+    model_fields = (
+        None if checkpoint is None else self._language_model.cache_key_fields()
+    )
+    # Position of the next chunk in its document, counting each pass.
+    document_id = None
+    document_chunks = 0
+
+    for index, batch in enumerate(progress_bar):
+      logging.info("Processing batch %d with length %d", index, len(batch))
+
+      stage_start = time.perf_counter()
+      chunks = [
+          _ChunkInference(
+              text_chunk=text_chunk,
+              prompt=self._render_prompt(text_chunk),
+          )
+          for text_chunk in batch
+      ]
+      timings.prompt_seconds += time.perf_counter() - stage_start
+
+      if checkpoint is not None:
+        for chunk in chunks:
+          if chunk.text_chunk.document_id != document_id:
+            document_id = chunk.text_chunk.document_id
+            document_chunks = 0
+          key = checkpoint_lib.ChunkKey(
+              document_id=document_id,
+              pass_index=first_pass + document_chunks % extraction_passes,
+              chunk_index=document_chunks // extraction_passes,
+          )
+          document_chunks += 1
+          prompt_key = caching.make_cache_key(
+              model=model_fields, prompt=chunk.prompt
+          )
+          chunk.checkpoint = _ChunkCheckpoint(
+              key=key,
+              prompt_key=prompt_key,
+              restored=checkpoint.get_chunk(key, prompt_key),
+          )
+
+      # Show what we're currently processing
+      if debug:
+        batch_size = sum(len(chunk.chunk_text) for chunk in batch)
+        desc = progress.format_extraction_progress(
+            model_info,
+            current_chars=batch_size // extraction_passes,
+            processed_chars=chars_processed // extraction_passes,
+        )
+        progress_bar.set_description(desc)
+
+      stage_start = time.perf_counter()
+      pending = [chunk for chunk in chunks if chunk.restored is None]
+      if pending:
+        self._infer_chunks(pending, retry_policy, isolate_failures, **kwargs)
+      timings.inference_seconds += time.perf_counter() - stage_start
+
+      # Update total processed
+      if debug:
+        for chunk in batch:
+          if chunk.document_text:
+            char_interval = chunk.char_interval
+            chars_processed += char_interval.end_pos - char_interval.start_pos
+
+        # Update progress bar with final processed count
+        batch_size = sum(len(chunk.chunk_text) for chunk in batch)
+        desc = progress.format_extraction_progress(
+            model_info,
+            current_chars=batch_size // extraction_passes,
+            processed_chars=chars_processed // extraction_passes,
+        )
+        progress_bar.set_description(desc)
+
+      yield chunks
+
   def _annotate_documents_sequential_passes(
       self,
       documents: Iterable[data.Document],
@@ -397,6 +1193,10 @@ class Annotator:
       batch_length: int,
       debug: bool,
       extraction_passes: int,
+      pipeline_depth: int = 0,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
       **kwargs,
   ) -> Iterator[data.AnnotatedDocument]:
     """Sequential extraction passes logic for improved recall."""
@@ -411,6 +1211,7 @@ class Annotator:
 
     document_extractions_by_pass: dict[str, list[list[data.Extraction]]] = {}
     document_texts: dict[str, str] = {}
+    document_failed_chunks: dict[str, list[data.ChunkFailure]] = {}
 
     for pass_num in range(extraction_passes):
       logging.info(
@@ -423,6 +1224,11 @@ class Annotator:
           max_char_buffer,
           batch_length,
           debug=(debug and pass_num == 0),
+          pipeline_depth=pipeline_depth,
+          checkpoint=checkpoint,
+          first_pass=pass_num,
+          retry_policy=retry_policy,
+          allow_partial_documents=allow_partial_documents,
           **kwargs,  # Only show progress on first pass
       ):
         doc_id = annotated_doc.document_id
@@ -434,6 +1240,10 @@ class Annotator:
         document_extractions_by_pass[doc_id].append(
             annotated_doc.extractions or []
         )
+        if annotated_doc.failed_chunks:
+          document_failed_chunks.setdefault(doc_id, []).extend(
+              annotated_doc.failed_chunks
+          )
 
     for doc_id, all_pass_extractions in document_extractions_by_pass.items():
       merged_extractions = _merge_non_overlapping_extractions(
@@ -457,6 +1267,7 @@ class Annotator:
           document_id=doc_id,
           extractions=merged_extractions,
           text=document_texts[doc_id],
+          failed_chunks=document_failed_chunks.get(doc_id),
       )
 
     logging.info("Sequential extraction passes completed.")
@@ -472,6 +1283,11 @@ class Annotator:
       additional_context: str | None = None,
       debug: bool = True,
       extraction_passes: int = 1,
+      pipeline_depth: int = 0,
+      interleave_passes: bool = False,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
       **kwargs,
   ) -> data.AnnotatedDocument:
     """Annotates text with NLP extractions for text input.
@@ -488,6 +1304,17 @@ class Annotator:
         recall by finding additional entities. Defaults to 1, which performs
         standard single extraction. Values > 1 reprocess tokens multiple times,
         potentially increasing costs.
+      pipeline_depth: Number of batches whose inference may run ahead of
+        resolution. See `annotate_documents`.
+      interleave_passes: Whether to run all extraction passes in one sweep.
+        See `annotate_documents`.
+      checkpoint: Optional store of finished chunks, so that annotating the
+        same text again resumes where an earlier call stopped. The document
+        ID is then derived from the text. See `annotate_documents`.
+      retry_policy: Optional policy for retrying failed chunks. See
+        `annotate_documents`.
+      allow_partial_documents: Whether chunks that still fail are left out
+        and recorded in `failed_chunks`. See `annotate_documents`.
       **kwargs: Additional arguments for inference and resolver.
 
     Returns:
@@ -498,7 +1325,9 @@ class Annotator:
     documents = [
         data.Document(
             text=text,
-            document_id=None,
+            document_id=_text_document_id(text, additional_context)
+            if checkpoint is not None
+            else None,
             additional_context=additional_context,
         )
     ]
@@ -511,6 +1340,11 @@ class Annotator:
             batch_length,
             debug,
             extraction_passes,
+            pipeline_depth,
+            interleave_passes,
+            checkpoint,
+            retry_policy,
+            allow_partial_documents,
             **kwargs,
         )
     )
@@ -540,4 +1374,583 @@ class Annotator:
         document_id=annotations[0].document_id,
         extractions=annotations[0].extractions,
         text=annotations[0].text,
+        failed_chunks=annotations[0].failed_chunks,
     )
+
+  def annotate_text_stream(
+      self,
+      text: str,
+      resolver: resolver_lib.AbstractResolver = resolver_lib.Resolver(
+          format_type=data.FormatType.YAML,
+      ),
+      max_char_buffer: int = 200,
+      additional_context: str | None = None,
+      max_concurrency: int = 1,
+      **kwargs,
+  ) -> Iterator[data.Extraction]:
+    """Yields extractions from text while the model is still generating them.
+
+    Each chunk's output is streamed with `BaseLanguageModel.infer_stream` and
+    each element of its extractions is resolved and aligned as soon as it is
+    complete, so a long output is processed while it is generated. The time
+    until the first extraction is recorded in `stage_timings`.
+
+    Unlike `annotate_text`, extractions are yielded in the order they are
+    aligned rather than merged and sorted, and chunks are not retried. Each
+    group is aligned after the previous group of its chunk, so repeated
+    mentions align to successive occurrences as in `annotate_text`.
+
+    Args:
+      text: Source text to annotate.
+      resolver: Resolver to use for extracting information from text. Only
+        resolvers that override `resolve_stream` resolve partial output.
+      max_char_buffer: Max number of characters that we can run inference on.
+        The text will be broken into chunks up to this length.
+      additional_context: Additional context to supplement prompt instructions.
+      max_concurrency: Number of chunks streamed at the same time.
+      **kwargs: Additional arguments for inference and resolver.
+
+    Yields:
+      Aligned extractions, with intervals relative to `text`.
+
+    Raises:
+      ValueError: If max_concurrency is less than 1.
+      Exception: The first error from inference, resolution or alignment.
+    """
+    if max_concurrency < 1:
+      raise ValueError("max_concurrency must be at least 1.")
+    self.stage_timings = timings = StageTimings()
+    start_time = time.perf_counter()
+    document = data.Document(text=text, additional_context=additional_context)
+    # Each chunk's aligned groups, then None once it is done, or its error.
+    # Bounded so that streams wait for a slow consumer.
+    results: queue.Queue[list[data.Extraction] | Exception | None] = (
+        queue.Queue(maxsize=2 * max_concurrency)
+    )
+    stopped = threading.Event()
+
+    def put(result: list[data.Extraction] | Exception | None) -> None:
+      while not stopped.is_set():
+        try:
+          results.put(result, timeout=_STREAM_POLL_SECONDS)
+          return
+        except queue.Full:
+          continue
+
+    def until_stopped(output_pieces: Iterator[str]) -> Iterator[str]:
+      try:
+        for piece in output_pieces:
+          if stopped.is_set():
+            return
+          yield piece
+      finally:
+        # Closes the HTTP response of a stream that was not read to the end.
+        close = getattr(output_pieces, "close", None)
+        if close is not None:
+          close()
+
+    def stream_chunk(text_chunk: chunking.TextChunk) -> None:
+      try:
+        prompt = self._render_prompt(text_chunk)
+        output_pieces = until_stopped(
+            iter(self._language_model.infer_stream(prompt, **kwargs))
+        )
+        resume_index = text_chunk.token_interval.start_index
+        for group in resolver.resolve_stream(output_pieces, **kwargs):
+          if stopped.is_set():
+            return
+          aligned, resume_index = self._align_stream_group(
+              resolver, group, text_chunk, resume_index, **kwargs
+          )
+          put(aligned)
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        put(e)
+      finally:
+        put(None)
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="annotate-stream"
+    )
+    try:
+      # Chunks are submitted as earlier ones finish, so no more than
+      # max_concurrency streams are open at a time.
+      text_chunks = self._chunk_documents([document], max_char_buffer)
+      pending = 0
+      for text_chunk in itertools.islice(text_chunks, max_concurrency):
+        executor.submit(stream_chunk, text_chunk)
+        pending += 1
+      while pending:
+        result = results.get()
+        if result is None:
+          pending -= 1
+          text_chunk = next(text_chunks, None)
+          if text_chunk is not None:
+            executor.submit(stream_chunk, text_chunk)
+            pending += 1
+        elif isinstance(result, Exception):
+          raise result
+        else:
+          if result and timings.first_extraction_seconds is None:
+            timings.first_extraction_seconds = (
+                time.perf_counter() - start_time
+            )
+          yield from result
+    finally:
+      # Streams still running stop and close their response at their next
+      # piece of output.
+      stopped.set()
+      executor.shutdown(wait=False, cancel_futures=True)
+
+  def _align_stream_group(
+      self,
+      resolver: resolver_lib.AbstractResolver,
+      group: Sequence[data.Extraction],
+      text_chunk: chunking.TextChunk,
+      resume_index: int,
+      **kwargs,
+  ) -> tuple[list[data.Extraction], int]:
+    """Aligns a streamed group from where the previous group of its chunk ended.
+
+    Extractions that do not align after `resume_index` are aligned against the
+    whole chunk, like an out of order extraction in `annotate_text`.
+
+    Args:
+      resolver: Resolver used to align the group.
+      group: Extractions of the group, in the order they were generated.
+      text_chunk: Chunk the group was extracted from.
+      resume_index: Document token after the last exact match of the previous
+        groups of the chunk.
+      **kwargs: Additional arguments for the resolver.
+
+    Returns:
+      The aligned extractions and the token to align the next group from.
+    """
+    chunk_interval = text_chunk.token_interval
+
+    def align(
+        extractions: Sequence[data.Extraction], start_index: int
+    ) -> list[data.Extraction]:
+      tokenized_text = text_chunk.document_text
+      char_start = (
+          text_chunk.char_interval.start_pos
+          + tokenized_text.starts[start_index]
+          - tokenized_text.starts[chunk_interval.start_index]
+      )
+      return list(
+          resolver.align(
+              extractions,
+              tokenized_text.text[
+                  char_start : text_chunk.char_interval.end_pos
+              ],
+              start_index,
+              char_start,
+              tokenized_text=tokenized_text,
+              token_interval=tokenizer.TokenInterval(
+                  start_index=start_index, end_index=chunk_interval.end_index
+              ),
+              **kwargs,
+          )
+      )
+
+    if resume_index >= chunk_interval.end_index:
+      resume_index = chunk_interval.start_index
+    aligned = align(group, resume_index)
+    next_index = resume_index
+    for extraction in aligned:
+      if extraction.alignment_status in (
+          data.AlignmentStatus.MATCH_EXACT,
+          data.AlignmentStatus.MATCH_LESSER,
+      ):
+        next_index = max(next_index, extraction.token_interval.end_index)
+    if resume_index > chunk_interval.start_index:
+      unaligned = [e for e in aligned if e.char_interval is None]
+      if unaligned:
+        realigned = align(unaligned, chunk_interval.start_index)
+        realigned = dict(zip(map(id, unaligned), realigned))
+        aligned = [realigned.get(id(e), e) for e in aligned]
+    return aligned, next_index
+
+  async def annotate_documents_async(
+      self,
+      documents: Iterable[data.Document],
+      resolver: resolver_lib.AbstractResolver = resolver_lib.Resolver(
+          format_type=data.FormatType.YAML,
+      ),
+      max_char_buffer: int = 200,
+      max_concurrency: int = 10,
+      debug: bool = True,
+      extraction_passes: int = 1,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
+      **kwargs,
+  ) -> AsyncIterator[data.AnnotatedDocument]:
+    """Annotates documents without blocking the event loop.
+
+    The asyncio counterpart of `annotate_documents`. Instead of fixed batches,
+    up to `max_concurrency` chunk requests are kept in flight at all times,
+    across chunks, documents and extraction passes. Documents are yielded in
+    input order, each as soon as all of its chunks are resolved.
+
+    Args:
+      documents: Documents to annotate. Each document is expected to have a
+        unique document_id.
+      resolver: Resolver to use for extracting information from text.
+      max_char_buffer: Max number of characters that we can run inference on.
+        The text will be broken into chunks up to this length.
+      max_concurrency: Maximum number of inference requests in flight.
+      debug: Whether to populate debug fields.
+      extraction_passes: Number of extraction passes, merged as in
+        `annotate_documents`. Passes run concurrently rather than in sequence.
+      checkpoint: Optional store of finished chunks and documents, used as in
+        `annotate_documents` to resume an interrupted run.
+      retry_policy: Optional policy for retrying failed chunks, as in
+        `annotate_documents`. A chunk waiting to be retried does not hold one
+        of the `max_concurrency` slots.
+      allow_partial_documents: Whether chunks that still fail are left out
+        and recorded in `failed_chunks`, as in `annotate_documents`.
+      **kwargs: Additional arguments passed to LanguageModel.infer_async and
+        Resolver.
+
+    Yields:
+      Resolved annotations from input documents.
+
+    Raises:
+      ValueError: If max_concurrency or extraction_passes is less than 1.
+      DocumentRepeatError: If the same document ID is seen more than once.
+      InferenceOutputError: If there are no scored outputs during inference.
+    """
+    if max_concurrency < 1:
+      raise ValueError("max_concurrency must be at least 1.")
+    if extraction_passes < 1:
+      raise ValueError("extraction_passes must be at least 1.")
+
+    logging.info("Starting asynchronous document annotation.")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Bounds the chunk tasks that exist but have not finished, so that a few
+    # requests are always queued behind the in-flight ones without reading
+    # the whole corpus ahead.
+    read_ahead = asyncio.Semaphore(2 * max_concurrency)
+    # Documents with their chunk tasks (one list per pass) in input order; a
+    # final None marks the end, an exception a failed producer.
+    ready: asyncio.Queue = asyncio.Queue()
+    chunk_tasks: set[asyncio.Task] = set()
+    settings = (
+        None
+        if checkpoint is None
+        else self._checkpoint_settings(max_char_buffer, extraction_passes)
+    )
+    # Chunking, prompt rendering, resolution, alignment and checkpoint I/O run
+    # here so that only inference is awaited on the event loop. A single
+    # thread, as the GIL serializes the work anyway and more threads would
+    # contend with the event loop for it.
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="annotate-async"
+    )
+
+    def prepare_document(
+        document: data.Document,
+    ) -> tuple[
+        str | None, data.AnnotatedDocument | None, list[chunking.TextChunk]
+    ]:
+      """Restores a document from the checkpoint or chunks it."""
+      fingerprint = None
+      if checkpoint is not None:
+        fingerprint = caching.make_cache_key(
+            settings=settings,
+            text=document.text,
+            additional_context=document.additional_context,
+        )
+        restored = checkpoint.get_document(document.document_id, fingerprint)
+        if restored is not None:
+          return fingerprint, restored, []
+      return (
+          fingerprint,
+          None,
+          list(self._chunk_documents([document], max_char_buffer)),
+      )
+
+    async def produce() -> None:
+      try:
+        visited_ids = set()
+        for document in documents:
+          if document.document_id in visited_ids:
+            raise DocumentRepeatError(
+                f"Document id {document.document_id} is already visited."
+            )
+          visited_ids.add(document.document_id)
+          fingerprint, restored, text_chunks = await _run_in_executor(
+              executor, prepare_document, document
+          )
+          if restored is not None:
+            ready.put_nowait((document, fingerprint, restored))
+            continue
+          pass_tasks = []
+          for pass_index in range(extraction_passes):
+            tasks = []
+            for chunk_index, text_chunk in enumerate(text_chunks):
+              await read_ahead.acquire()
+              key = checkpoint_lib.ChunkKey(
+                  document_id=document.document_id,
+                  pass_index=pass_index,
+                  chunk_index=chunk_index,
+              )
+              task = asyncio.create_task(
+                  self._annotate_chunk_async(
+                      text_chunk,
+                      resolver,
+                      semaphore,
+                      executor,
+                      debug,
+                      key,
+                      checkpoint=checkpoint,
+                      retry_policy=retry_policy,
+                      allow_partial_documents=allow_partial_documents,
+                      **kwargs,
+                  )
+              )
+              task.add_done_callback(lambda _: read_ahead.release())
+              chunk_tasks.add(task)
+              tasks.append(task)
+            pass_tasks.append(tasks)
+          ready.put_nowait((document, fingerprint, pass_tasks))
+        ready.put_nowait(None)
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        ready.put_nowait(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+      while (item := await ready.get()) is not None:
+        if isinstance(item, Exception):
+          raise item
+        document, fingerprint, pass_tasks = item
+        if isinstance(pass_tasks, data.AnnotatedDocument):
+          logging.info(
+              "Restored document ID %s from checkpoint.", document.document_id
+          )
+          yield pass_tasks
+          continue
+        pass_extractions = []
+        failed_chunks = []
+        for tasks in pass_tasks:
+          chunk_results = await asyncio.gather(*tasks)
+          failed_chunks.extend(
+              result
+              for result in chunk_results
+              if isinstance(result, data.ChunkFailure)
+          )
+          pass_extractions.append(
+              list(
+                  itertools.chain.from_iterable(
+                      result
+                      for result in chunk_results
+                      if not isinstance(result, data.ChunkFailure)
+                  )
+              )
+          )
+          chunk_tasks.difference_update(tasks)
+        logging.info(
+            "Completing annotation for document ID %s.", document.document_id
+        )
+        yield await _run_in_executor(
+            executor,
+            self._finish_document,
+            document,
+            pass_extractions,
+            failed_chunks,
+            checkpoint,
+            fingerprint,
+        )
+    finally:
+      producer.cancel()
+      for task in chunk_tasks:
+        task.cancel()
+      executor.shutdown(wait=False, cancel_futures=True)
+
+    logging.info("Asynchronous document annotation completed.")
+
+  def _finish_document(
+      self,
+      document: data.Document,
+      pass_extractions: Sequence[Sequence[data.Extraction]],
+      failed_chunks: list[data.ChunkFailure],
+      checkpoint: checkpoint_lib.CheckpointStore | None,
+      fingerprint: str | None,
+  ) -> data.AnnotatedDocument:
+    """Merges the passes of a document and records it in the checkpoint."""
+    annotated_doc = data.AnnotatedDocument(
+        document_id=document.document_id,
+        extractions=_merge_non_overlapping_extractions(pass_extractions),
+        text=document.text,
+        failed_chunks=failed_chunks or None,
+    )
+    if checkpoint is not None and not failed_chunks:
+      checkpoint.put_document(annotated_doc, fingerprint)
+    return annotated_doc
+
+  async def _annotate_chunk_async(
+      self,
+      text_chunk: chunking.TextChunk,
+      resolver: resolver_lib.AbstractResolver,
+      semaphore: asyncio.Semaphore,
+      executor: concurrent.futures.Executor,
+      debug: bool,
+      key: checkpoint_lib.ChunkKey,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
+      **kwargs,
+  ) -> Sequence[data.Extraction] | data.ChunkFailure:
+    """Runs inference on one chunk and aligns its extractions.
+
+    With a checkpoint store, a chunk recorded under `key` is restored from it
+    instead, and a newly resolved chunk is recorded. Failed attempts are
+    retried as `retry_policy` allows; with allow_partial_documents, a chunk
+    that still fails is returned as a `ChunkFailure`.
+
+    Only inference is awaited on the event loop; rendering the prompt,
+    resolution, alignment and checkpoint I/O run in `executor`.
+    """
+
+    def restore_chunk() -> tuple[str, str | None, list[data.Extraction] | None]:
+      prompt = self._render_prompt(text_chunk)
+      if checkpoint is None:
+        return prompt, None, None
+      prompt_key = caching.make_cache_key(
+          model=self._language_model.cache_key_fields(), prompt=prompt
+      )
+      return prompt, prompt_key, checkpoint.get_chunk(key, prompt_key)
+
+    prompt, prompt_key, restored = await _run_in_executor(
+        executor, restore_chunk
+    )
+    if restored is not None:
+      return restored
+
+    attempts = 0
+    while True:
+      attempts += 1
+      try:
+        async with semaphore:
+          scored_outputs = (
+              await self._language_model.infer_async([prompt], **kwargs)
+          )[0]
+        if not scored_outputs:
+          logging.error(
+              "No scored outputs for chunk with ID %s.", text_chunk.document_id
+          )
+          raise inference.InferenceOutputError(
+              "No scored outputs from language model."
+          )
+        annotated_chunk_extractions = await _run_in_executor(
+            executor,
+            resolver.resolve,
+            scored_outputs[0].output,
+            debug=debug,
+            **kwargs,
+        )
+        break
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        if retry_policy is None or not retry_policy.should_retry(e, attempts):
+          if not allow_partial_documents:
+            raise
+          logging.error(
+              "Leaving out chunk %s of document ID %s after %d attempts: %s",
+              text_chunk.char_interval,
+              text_chunk.document_id,
+              attempts,
+              e,
+          )
+          return data.ChunkFailure(
+              char_interval=text_chunk.char_interval,
+              extraction_pass=key.pass_index,
+              attempts=attempts,
+              error=str(e),
+          )
+        kind = retry_lib.classify_error(e)
+        delay = retry_policy.backoff_seconds(attempts, kind)
+        logging.warning(
+            "Retrying chunk of document ID %s in %.1fs after attempt %d"
+            " failed (%s): %s",
+            text_chunk.document_id,
+            delay,
+            attempts,
+            kind.value,
+            e,
+        )
+        await asyncio.sleep(delay)
+        if kind is retry_lib.FailureKind.PARSE_ERROR:
+          await _run_in_executor(
+              executor, self._language_model.invalidate, [prompt], **kwargs
+          )
+
+    def align_chunk() -> list[data.Extraction]:
+      aligned_extractions = list(
+          resolver.align(
+              annotated_chunk_extractions,
+              text_chunk.chunk_text,
+              text_chunk.token_interval.start_index,
+              text_chunk.char_interval.start_pos,
+              tokenized_text=text_chunk.document_text,
+              token_interval=text_chunk.token_interval,
+              **kwargs,
+          )
+      )
+      if checkpoint is not None:
+        checkpoint.put_chunk(
+            key, prompt_key, scored_outputs[0].output, aligned_extractions
+        )
+      return aligned_extractions
+
+    return await _run_in_executor(executor, align_chunk)
+
+  async def annotate_text_async(
+      self,
+      text: str,
+      resolver: resolver_lib.AbstractResolver = resolver_lib.Resolver(
+          format_type=data.FormatType.YAML,
+      ),
+      max_char_buffer: int = 200,
+      max_concurrency: int = 10,
+      additional_context: str | None = None,
+      debug: bool = True,
+      extraction_passes: int = 1,
+      checkpoint: checkpoint_lib.CheckpointStore | None = None,
+      retry_policy: retry_lib.RetryPolicy | None = None,
+      allow_partial_documents: bool = False,
+      **kwargs,
+  ) -> data.AnnotatedDocument:
+    """Annotates text without blocking the event loop.
+
+    The asyncio counterpart of `annotate_text`. See
+    `annotate_documents_async` for the arguments.
+
+    Returns:
+      Resolved annotations from text for document.
+    """
+    document = data.Document(
+        text=text,
+        document_id=_text_document_id(text, additional_context)
+        if checkpoint is not None
+        else None,
+        additional_context=additional_context,
+    )
+    annotations = [
+        annotated_document
+        async for annotated_document in self.annotate_documents_async(
+            [document],
+            resolver,
+            max_char_buffer,
+            max_concurrency,
+            debug,
+            extraction_passes,
+            checkpoint,
+            retry_policy,
+            allow_partial_documents,
+            **kwargs,
+        )
+    ]
+    assert (
+        len(annotations) == 1
+    ), f"Expected 1 annotation but got {len(annotations)} annotations."
+    return annotations[0]
@@ -0,0 +1,409 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed caching of language model responses.
+
+`CachedLanguageModel` wraps any `inference.BaseLanguageModel` and answers
+prompts it has seen before from a `ResponseCache` instead of the network.
+Entries are keyed on a hash of the model's settings and the rendered prompt,
+so changing the model, temperature, output format or schema never returns a
+stale response. The cache has an in-memory LRU tier and an optional SQLite
+tier that persists across runs.
+
+Example usage:
+  cache = caching.ResponseCache(path='~/.cache/langextract/responses.db')
+  result = lx.extract(..., response_cache=cache)
+  print(cache.stats)
+"""
+
+from __future__ import annotations
+
+import collections
+from collections.abc import Iterator, Sequence
+import dataclasses
+import enum
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from langextract import inference
+
+
+@dataclasses.dataclass
+class CacheStats:
+  """Counters for a `ResponseCache`.
+
+  Attributes:
+    hits: Lookups answered from either tier.
+    misses: Lookups that found no live entry.
+    memory_hits: Lookups answered from the in-memory tier.
+    disk_hits: Lookups answered from the on-disk tier.
+    evictions: Entries dropped for size or age.
+  """
+
+  hits: int = 0
+  misses: int = 0
+  memory_hits: int = 0
+  disk_hits: int = 0
+  evictions: int = 0
+
+  @property
+  def hit_rate(self) -> float:
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+
+def _json_default(value: Any) -> Any:
+  """Makes model settings such as enums and schemas JSON serializable."""
+  if isinstance(value, enum.Enum):
+    return value.value
+  if hasattr(value, "schema_dict"):
+    return value.schema_dict
+  if dataclasses.is_dataclass(value) and not isinstance(value, type):
+    return dataclasses.asdict(value)
+  return repr(value)
+
+
+def make_cache_key(**fields: Any) -> str:
+  """Returns a stable hex digest of the given fields.
+
+  Args:
+    **fields: Values that together determine a response. Must be JSON
+      serializable, or enums, schemas or dataclasses.
+
+  Returns:
+    A SHA-256 hex digest that is independent of argument order.
+  """
+  canonical = json.dumps(
+      fields, sort_keys=True, ensure_ascii=False, default=_json_default
+  )
+  return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+  """A two-tier LRU cache of JSON-serializable values.
+
+  Safe to share between threads and between models; keys produced by
+  `make_cache_key` include the model settings.
+  """
+
+  def __init__(
+      self,
+      path: str | os.PathLike[str] | None = None,
+      max_memory_entries: int = 1024,
+      max_disk_entries: int | None = None,
+      ttl_seconds: float | None = None,
+  ):
+    """Initializes the cache.
+
+    Args:
+      path: SQLite database file for the on-disk tier. Parent directories are
+        created as needed. If None, only the in-memory tier is used.
+      max_memory_entries: Number of entries kept in memory. Least recently used
+        entries are evicted first.
+      max_disk_entries: Number of entries kept on disk, or None for no limit.
+        Least recently used entries are evicted first.
+      ttl_seconds: Age after which entries are treated as misses and dropped,
+        or None to keep entries until evicted for size.
+
+    Raises:
+      ValueError: If a size limit is negative or the TTL is not positive.
+    """
+    if max_memory_entries < 0:
+      raise ValueError("max_memory_entries must be non-negative.")
+    if max_disk_entries is not None and max_disk_entries < 0:
+      raise ValueError("max_disk_entries must be non-negative.")
+    if ttl_seconds is not None and ttl_seconds <= 0:
+      raise ValueError("ttl_seconds must be positive.")
+
+    self.max_memory_entries = max_memory_entries
+    self.max_disk_entries = max_disk_entries
+    self.ttl_seconds = ttl_seconds
+    self.stats = CacheStats()
+    self._lock = threading.Lock()
+    # Maps key to (creation time, value), most recently used last.
+    self._memory: collections.OrderedDict[str, tuple[float, Any]] = (
+        collections.OrderedDict()
+    )
+    self._db: sqlite3.Connection | None = None
+    if path is not None:
+      db_path = pathlib.Path(path).expanduser()
+      db_path.parent.mkdir(parents=True, exist_ok=True)
+      self._db = sqlite3.connect(db_path, check_same_thread=False)
+      self._db.execute(
+          "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY,"
+          " value TEXT NOT NULL, created REAL NOT NULL,"
+          " accessed REAL NOT NULL)"
+      )
+      self._db.execute(
+          "CREATE INDEX IF NOT EXISTS responses_accessed ON"
+          " responses (accessed)"
+      )
+      self._db.commit()
+
+  def _expired(self, created: float, now: float) -> bool:
+    return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+  def _remember(self, key: str, created: float, value: Any) -> None:
+    """Adds an entry to the in-memory tier. Caller holds the lock."""
+    if self.max_memory_entries == 0:
+      return
+    self._memory[key] = (created, value)
+    self._memory.move_to_end(key)
+    while len(self._memory) > self.max_memory_entries:
+      self._memory.popitem(last=False)
+      self.stats.evictions += 1
+
+  def get(self, key: str) -> Any | None:
+    """Returns the cached value for `key`, or None on a miss."""
+    now = time.time()
+    with self._lock:
+      entry = self._memory.get(key)
+      if entry is not None:
+        created, value = entry
+        if not self._expired(created, now):
+          self._memory.move_to_end(key)
+          self.stats.hits += 1
+          self.stats.memory_hits += 1
+          return value
+        del self._memory[key]
+        self.stats.evictions += 1
+
+      if self._db is not None:
+        row = self._db.execute(
+            "SELECT value, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+          serialized, created = row
+          if not self._expired(created, now):
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            value = json.loads(serialized)
+            self._remember(key, created, value)
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+            return value
+          self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+          self._db.commit()
+          self.stats.evictions += 1
+
+      self.stats.misses += 1
+      return None
+
+  def put(self, key: str, value: Any) -> None:
+    """Stores a JSON-serializable value under `key`."""
+    now = time.time()
+    with self._lock:
+      self._remember(key, now, value)
+      if self._db is None:
+        return
+      self._db.execute(
+          "INSERT OR REPLACE INTO responses (key, value, created, accessed)"
+          " VALUES (?, ?, ?, ?)",
+          (key, json.dumps(value, ensure_ascii=False), now, now),
+      )
+      if self.max_disk_entries is not None:
+        cursor = self._db.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses"
+            " ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        self.stats.evictions += max(cursor.rowcount, 0)
+      self._db.commit()
+
+  def delete(self, key: str) -> None:
+    """Removes the entry for `key` from both tiers, if present."""
+    with self._lock:
+      self._memory.pop(key, None)
+      if self._db is not None:
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._db.commit()
+
+  def clear(self) -> None:
+    """Removes all entries from both tiers. Counters are kept."""
+    with self._lock:
+      self._memory.clear()
+      if self._db is not None:
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+
+  def __len__(self) -> int:
+    with self._lock:
+      if self._db is None:
+        return len(self._memory)
+      return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+  def close(self) -> None:
+    """Closes the on-disk tier. The in-memory tier remains usable."""
+    with self._lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
+
+  def __enter__(self) -> ResponseCache:
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    self.close()
+
+
+class CachedLanguageModel(inference.BaseLanguageModel):
+  """Serves repeated prompts from a `ResponseCache`.
+
+  Distinct prompts that miss the cache are forwarded to the wrapped model in a
+  single `infer` (or `infer_async`) call, so its batching and parallelism are
+  preserved. Outputs are yielded in prompt order and are identical to the
+  wrapped model's, so they flow through the resolver unchanged.
+  """
+
+  def __init__(
+      self,
+      model: inference.BaseLanguageModel,
+      cache: ResponseCache,
+  ):
+    """Initializes the wrapper.
+
+    Args:
+      model: The language model to call on cache misses.
+      cache: Where responses are stored.
+    """
+    self.model = model
+    self.cache = cache
+    super().__init__(constraint=model._constraint)  # pylint: disable=protected-access
+
+  @property
+  def model_id(self) -> str | None:
+    return getattr(self.model, "model_id", None)
+
+  def cache_key_fields(self) -> dict[str, Any]:
+    # Responses are the wrapped model's, with or without the cache.
+    return self.model.cache_key_fields()
+
+  def cache_key(self, prompt: str, **kwargs) -> str:
+    """Returns the cache key for `prompt` sent with inference `kwargs`."""
+    return make_cache_key(
+        model=self.model.cache_key_fields(), prompt=prompt, infer_kwargs=kwargs
+    )
+
+  def _lookup(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> tuple[list[str], dict[str, Any], dict[str, str]]:
+    """Looks up each distinct prompt of a batch once.
+
+    Returns:
+      The key of each prompt, the cached value of each distinct key (None on a
+      miss) and the prompt of each missed key, in first-seen order.
+    """
+    keys = [self.cache_key(prompt, **kwargs) for prompt in batch_prompts]
+    cached = {}
+    missing = {}
+    for key, prompt in zip(keys, batch_prompts):
+      if key not in cached:
+        cached[key] = self.cache.get(key)
+        if cached[key] is None:
+          missing[key] = prompt
+    return keys, cached, missing
+
+  def _store(
+      self, key: str, outputs: Sequence[inference.ScoredOutput]
+  ) -> list[inference.ScoredOutput]:
+    outputs = list(outputs)
+    self.cache.put(key, [dataclasses.asdict(output) for output in outputs])
+    return outputs
+
+  def infer(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> Iterator[Sequence[inference.ScoredOutput]]:
+    """Runs inference, sending each distinct uncached prompt once."""
+    keys, cached, missing = self._lookup(batch_prompts, **kwargs)
+    fresh_outputs = zip(
+        missing,
+        self.model.infer(list(missing.values()), **kwargs) if missing else (),
+    )
+
+    fetched = {}
+    for key in keys:
+      if cached[key] is not None:
+        yield [inference.ScoredOutput(**output) for output in cached[key]]
+        continue
+      if key not in fetched:
+        # Missed keys are fetched in first-seen order, so this is `key`.
+        fresh_key, outputs = next(fresh_outputs)
+        fetched[fresh_key] = self._store(fresh_key, outputs)
+      yield fetched[key]
+
+  async def infer_async(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[inference.ScoredOutput]]:
+    """Runs inference on the event loop; see `infer`."""
+    keys, cached, missing = self._lookup(batch_prompts, **kwargs)
+    fetched = {}
+    if missing:
+      fresh_outputs = await self.model.infer_async(
+          list(missing.values()), **kwargs
+      )
+      for key, outputs in zip(missing, fresh_outputs):
+        fetched[key] = self._store(key, outputs)
+
+    return [
+        fetched[key]
+        if cached[key] is None
+        else [inference.ScoredOutput(**output) for output in cached[key]]
+        for key in keys
+    ]
+
+  def infer_isolated(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[inference.ScoredOutput] | Exception]:
+    """Runs inference as in `infer`; failed prompts are not cached."""
+    keys, cached, missing = self._lookup(batch_prompts, **kwargs)
+    fetched = {}
+    if missing:
+      fresh_outputs = self.model.infer_isolated(
+          list(missing.values()), **kwargs
+      )
+      for key, outputs in zip(missing, fresh_outputs):
+        fetched[key] = (
+            outputs
+            if isinstance(outputs, Exception)
+            else self._store(key, outputs)
+        )
+
+    return [
+        fetched[key]
+        if cached[key] is None
+        else [inference.ScoredOutput(**output) for output in cached[key]]
+        for key in keys
+    ]
+
+  def register_prompt_prefix(self, prefix: str) -> None:
+    self.model.register_prompt_prefix(prefix)
+
+  def invalidate(self, batch_prompts: Sequence[str], **kwargs) -> None:
+    for prompt in batch_prompts:
+      self.cache.delete(self.cache_key(prompt, **kwargs))
+    self.model.invalidate(batch_prompts, **kwargs)
+
+  def close(self) -> None:
+    self.model.close()
+
+  async def aclose(self) -> None:
+    await self.model.aclose()
@@ -0,0 +1,364 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Durable checkpoints for long annotation runs.
+
+A `CheckpointStore` records the raw model output and aligned extractions of
+each chunk as soon as it is resolved, and each annotated document once all of
+its chunks and passes are done. Passing the same store to a rerun of
+`Annotator.annotate_documents` (or `lx.extract`) after a crash, rate limit or
+retry restores finished documents and chunks from disk, so only the missing
+chunks are sent to the model.
+
+Chunks are keyed on document ID, extraction pass and chunk index, and are only
+restored if the rendered prompt and model settings are unchanged. Documents
+are keyed on document ID and are only restored if their text and the
+annotation settings are unchanged. Documents without an explicit ID get a
+random one, so they are never restored.
+
+Example usage:
+  with checkpoint.CheckpointStore('run.ckpt.db') as store:
+    results = lx.extract(documents, ..., checkpoint=store)
+    lx.io.save_annotated_documents(results, output_name='run.jsonl')
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+import dataclasses
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from absl import logging
+
+from langextract import data
+from langextract import data_lib
+from langextract import io
+
+
+@dataclasses.dataclass(frozen=True)
+class ChunkKey:
+  """Identifies one chunk of one extraction pass over a document.
+
+  Attributes:
+    document_id: ID of the document the chunk belongs to.
+    pass_index: Zero-based extraction pass.
+    chunk_index: Zero-based position of the chunk in the document.
+  """
+
+  document_id: str
+  pass_index: int
+  chunk_index: int
+
+
+@dataclasses.dataclass
+class CheckpointStats:
+  """Counters for a `CheckpointStore`.
+
+  Attributes:
+    restored_documents: Documents served from the store.
+    restored_chunks: Chunks served from the store.
+    saved_documents: Documents recorded as complete.
+    saved_chunks: Chunks recorded.
+  """
+
+  restored_documents: int = 0
+  restored_chunks: int = 0
+  saved_documents: int = 0
+  saved_chunks: int = 0
+
+
+def _extraction_to_dict(extraction: data.Extraction) -> dict[str, Any]:
+  """Converts an extraction to a dict, keeping its token interval."""
+  result = dataclasses.asdict(
+      extraction, dict_factory=data_lib.enum_asdict_factory
+  )
+  token_interval = extraction.token_interval
+  result["token_interval"] = (
+      dataclasses.asdict(token_interval) if token_interval else None
+  )
+  return result
+
+
+def _dumps_extractions(extractions: Iterable[data.Extraction]) -> str:
+  return json.dumps(
+      [_extraction_to_dict(extraction) for extraction in extractions],
+      ensure_ascii=False,
+  )
+
+
+def _loads_extractions(serialized: str) -> list[data.Extraction]:
+  return data_lib.dict_to_annotated_document(
+      {"extractions": json.loads(serialized)}
+  ).extractions
+
+
+class CheckpointStore:
+  """An SQLite-backed record of finished chunks and documents.
+
+  Every write is committed immediately, so a run that dies loses at most the
+  chunks that were in flight. Safe to share between threads.
+  """
+
+  def __init__(self, path: str | os.PathLike[str]):
+    """Initializes the store.
+
+    Args:
+      path: SQLite database file. Parent directories are created as needed.
+        An existing file is reopened, which is how a run is resumed.
+    """
+    self.path = pathlib.Path(path).expanduser()
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self.stats = CheckpointStats()
+    self._lock = threading.Lock()
+    self._db: sqlite3.Connection | None = sqlite3.connect(
+        self.path, check_same_thread=False
+    )
+    # Write-ahead logging makes the per-chunk commits cheap.
+    self._db.execute("PRAGMA journal_mode=WAL")
+    self._db.execute(
+        "CREATE TABLE IF NOT EXISTS chunks (document_id TEXT NOT NULL,"
+        " pass_index INTEGER NOT NULL, chunk_index INTEGER NOT NULL,"
+        " prompt_key TEXT NOT NULL, output TEXT NOT NULL,"
+        " extractions TEXT NOT NULL, created REAL NOT NULL,"
+        " PRIMARY KEY (document_id, pass_index, chunk_index))"
+    )
+    self._db.execute(
+        "CREATE TABLE IF NOT EXISTS documents (document_id TEXT PRIMARY KEY,"
+        " fingerprint TEXT, text TEXT, extractions TEXT NOT NULL,"
+        " created REAL NOT NULL)"
+    )
+    self._db.commit()
+
+  def _connection(self) -> sqlite3.Connection:
+    if self._db is None:
+      raise ValueError(f"CheckpointStore {self.path} is closed.")
+    return self._db
+
+  def get_chunk(
+      self, key: ChunkKey, prompt_key: str
+  ) -> list[data.Extraction] | None:
+    """Returns the aligned extractions of a finished chunk.
+
+    Args:
+      key: The chunk to look up.
+      prompt_key: Hash of the chunk's prompt and model settings, as passed to
+        `put_chunk`.
+
+    Returns:
+      The chunk's extractions, or None if the chunk has not been recorded or
+      was recorded for a different prompt.
+    """
+    with self._lock:
+      row = (
+          self._connection()
+          .execute(
+              "SELECT extractions FROM chunks WHERE document_id = ? AND"
+              " pass_index = ? AND chunk_index = ? AND prompt_key = ?",
+              (key.document_id, key.pass_index, key.chunk_index, prompt_key),
+          )
+          .fetchone()
+      )
+      if row is None:
+        return None
+      self.stats.restored_chunks += 1
+    return _loads_extractions(row[0])
+
+  def get_chunk_output(self, key: ChunkKey) -> str | None:
+    """Returns the raw model output recorded for a chunk, if any."""
+    with self._lock:
+      row = (
+          self._connection()
+          .execute(
+              "SELECT output FROM chunks WHERE document_id = ? AND"
+              " pass_index = ? AND chunk_index = ?",
+              (key.document_id, key.pass_index, key.chunk_index),
+          )
+          .fetchone()
+      )
+    return None if row is None else row[0]
+
+  def put_chunk(
+      self,
+      key: ChunkKey,
+      prompt_key: str,
+      output: str,
+      extractions: Sequence[data.Extraction],
+  ) -> None:
+    """Records a finished chunk.
+
+    Args:
+      key: The chunk.
+      prompt_key: Hash of the chunk's prompt and model settings.
+      output: The raw model output the extractions were resolved from.
+      extractions: The chunk's aligned extractions.
+    """
+    serialized = _dumps_extractions(extractions)
+    with self._lock:
+      db = self._connection()
+      db.execute(
+          "INSERT OR REPLACE INTO chunks (document_id, pass_index,"
+          " chunk_index, prompt_key, output, extractions, created) VALUES"
+          " (?, ?, ?, ?, ?, ?, ?)",
+          (
+              key.document_id,
+              key.pass_index,
+              key.chunk_index,
+              prompt_key,
+              output,
+              serialized,
+              time.time(),
+          ),
+      )
+      db.commit()
+      self.stats.saved_chunks += 1
+
+  def get_document(
+      self, document_id: str, fingerprint: str
+  ) -> data.AnnotatedDocument | None:
+    """Returns a completed document.
+
+    Args:
+      document_id: ID of the document.
+      fingerprint: Hash of the document's text and the annotation settings,
+        as passed to `put_document`. Documents imported with `import_jsonl`
+        match any fingerprint.
+
+    Returns:
+      The annotated document, or None if it has not been completed with the
+      same fingerprint.
+    """
+    with self._lock:
+      row = (
+          self._connection()
+          .execute(
+              "SELECT text, extractions FROM documents WHERE document_id = ?"
+              " AND (fingerprint = ? OR fingerprint IS NULL)",
+              (document_id, fingerprint),
+          )
+          .fetchone()
+      )
+      if row is None:
+        return None
+      self.stats.restored_documents += 1
+    text, serialized = row
+    return data.AnnotatedDocument(
+        document_id=document_id,
+        extractions=_loads_extractions(serialized),
+        text=text,
+    )
+
+  def put_document(
+      self,
+      annotated_document: data.AnnotatedDocument,
+      fingerprint: str | None,
+  ) -> None:
+    """Records a completed document and drops its chunk records.
+
+    Args:
+      annotated_document: The document with its merged extractions.
+      fingerprint: Hash of the document's text and the annotation settings,
+        or None to match any settings.
+
+    Raises:
+      ValueError: If the document is partial, i.e. has failed chunks. It
+        would otherwise be restored as complete and never re-run.
+    """
+    if annotated_document.failed_chunks:
+      raise ValueError(
+          f"Document {annotated_document.document_id} has failed chunks and"
+          " cannot be recorded as complete."
+      )
+    document_id = annotated_document.document_id
+    serialized = _dumps_extractions(annotated_document.extractions or [])
+    with self._lock:
+      db = self._connection()
+      db.execute(
+          "INSERT OR REPLACE INTO documents (document_id, fingerprint, text,"
+          " extractions, created) VALUES (?, ?, ?, ?, ?)",
+          (
+              document_id,
+              fingerprint,
+              annotated_document.text,
+              serialized,
+              time.time(),
+          ),
+      )
+      db.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+      db.commit()
+      self.stats.saved_documents += 1
+
+  def import_jsonl(
+      self, jsonl_path: str | os.PathLike[str], show_progress: bool = False
+  ) -> int:
+    """Marks the documents of an earlier JSONL output as complete.
+
+    Use this to resume from the output of `io.save_annotated_documents` when
+    the run was not checkpointed. Imported documents are matched on ID alone,
+    whatever the annotation settings. Partial documents, which have
+    `failed_chunks`, are skipped so that a resumed run annotates them again.
+
+    Args:
+      jsonl_path: File written by `io.save_annotated_documents`.
+      show_progress: Whether to show a progress bar while loading.
+
+    Returns:
+      The number of documents imported.
+    """
+    count = 0
+    for annotated_document in io.load_annotated_documents_jsonl(
+        pathlib.Path(jsonl_path), show_progress=show_progress
+    ):
+      if annotated_document.failed_chunks:
+        logging.info(
+            "Skipping partial document %s with %d failed chunks.",
+            annotated_document.document_id,
+            len(annotated_document.failed_chunks),
+        )
+        continue
+      self.put_document(annotated_document, fingerprint=None)
+      count += 1
+    return count
+
+  def completed_document_ids(self) -> set[str]:
+    """Returns the IDs of all completed documents."""
+    with self._lock:
+      rows = self._connection().execute("SELECT document_id FROM documents")
+      return {row[0] for row in rows}
+
+  def clear(self) -> None:
+    """Removes all records. Counters are kept."""
+    with self._lock:
+      db = self._connection()
+      db.execute("DELETE FROM chunks")
+      db.execute("DELETE FROM documents")
+      db.commit()
+
+  def close(self) -> None:
+    """Closes the database. Further reads and writes raise ValueError."""
+    with self._lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
+
+  def __enter__(self) -> CheckpointStore:
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    self.close()
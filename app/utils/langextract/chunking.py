@@ -20,8 +20,10 @@ document into chunks of a required maximum length that we can perform
 inference on.
 """
 
-from collections.abc import Iterable, Iterator, Sequence
+import bisect
+from collections.abc import Callable, Iterable, Iterator, Sequence
 import dataclasses
+import itertools
 import re
 
 from absl import logging
@@ -31,6 +33,9 @@ from langextract import data
 from langextract import exceptions
 from langextract import tokenizer
 
+# Counts the model tokens of a text, e.g. with the model's own tokenizer.
+TokenCounter = Callable[[str], int]
+
 
 class TokenUtilError(exceptions.LangExtractError):
   """Error raised when token_util returns unexpected values."""
@@ -232,12 +237,10 @@ def get_char_interval(
         f"Start index {token_interval.start_index} must be < end index "
         f"{token_interval.end_index}."
     )
-  start_token = tokenized_text.tokens[token_interval.start_index]
-  # Penultimate token prior to interval.end_index
-  final_token = tokenized_text.tokens[token_interval.end_index - 1]
   return data.CharInterval(
-      start_pos=start_token.char_interval.start_pos,
-      end_pos=final_token.char_interval.end_pos,
+      start_pos=tokenized_text.starts[token_interval.start_index],
+      # End of the last token of the interval.
+      end_pos=tokenized_text.ends[token_interval.end_index - 1],
   )
 
 
@@ -295,7 +298,7 @@ class SentenceIterator:
       IndexError: if curr_token_pos is not within the document.
     """
     self.tokenized_text = tokenized_text
-    self.token_len = len(tokenized_text.tokens)
+    self.token_len = len(tokenized_text.starts)
     if curr_token_pos < 0:
       raise IndexError(
           f"Current token position {curr_token_pos} can not be negative."
@@ -322,17 +325,11 @@ class SentenceIterator:
     assert self.curr_token_pos <= self.token_len
     if self.curr_token_pos == self.token_len:
       raise StopIteration
-    # This locates the sentence which contains the current token position.
-    sentence_range = tokenizer.find_sentence_range(
-        self.tokenized_text.text,
-        self.tokenized_text.tokens,
-        self.curr_token_pos,
-    )
-    assert sentence_range
     # Start the sentence from the current token position.
     # If we are in the middle of a sentence, we should start from there.
     sentence_range = create_token_interval(
-        self.curr_token_pos, sentence_range.end_index
+        self.curr_token_pos,
+        self.tokenized_text.sentence_end(self.curr_token_pos),
     )
     self.curr_token_pos = sentence_range.end_index
     return sentence_range
@@ -378,6 +375,13 @@ class ChunkIterator:
   With max_char_buffer=60, the chunks are:
   * "Roses are red. Violets are blue. Flowers are nice." len=50
   * "And so are you." len=15
+
+  D)
+  With max_tokens, a chunk must also fit within that many model tokens, as
+  counted by token_counter, and the rules above apply to whichever limit is
+  reached first. Model limits and billing are in tokens, and a character
+  limit chosen for Chinese text under-fills the context with English text, or
+  the other way round.
   """
 
   def __init__(
@@ -385,21 +389,46 @@ class ChunkIterator:
       text: str | tokenizer.TokenizedText,
       max_char_buffer: int,
       document: data.Document | None = None,
+      max_tokens: int | None = None,
+      token_counter: TokenCounter | None = None,
   ):
     """Constructor.
 
+    Token offsets are read from the columns of the tokenized text, so chunk
+    boundaries can be found by binary search instead of by growing the chunk
+    one token at a time.
+
     Args:
       text: Document to chunk. Can be either a string or a tokenized text.
       max_char_buffer: Size of buffer that we can run inference on.
       document: Optional source document.
+      max_tokens: Optional maximum number of model tokens per chunk.
+      token_counter: Counts the model tokens of a text for max_tokens.
+        Defaults to `tokenizer.estimate_tokens`, which approximates CJK and
+        Latin text.
+
+    Raises:
+      ValueError: If max_tokens is not positive.
     """
+    if max_tokens is not None and max_tokens < 1:
+      raise ValueError("max_tokens must be at least 1.")
     if isinstance(text, str):
       text = tokenizer.TokenizedText(text=text)
     self.tokenized_text = text
     self.max_char_buffer = max_char_buffer
-    self.sentence_iter = SentenceIterator(self.tokenized_text)
+    self.max_tokens = max_tokens
+    self.token_counter = token_counter or tokenizer.estimate_tokens
     self.broken_sentence = False
 
+    self._token_starts = self.tokenized_text.starts
+    self._token_ends = self.tokenized_text.ends
+    self._newline_token_indices = list(
+        itertools.compress(
+            range(len(self._token_starts)), self.tokenized_text.after_newline
+        )
+    )
+    self._curr_token_pos = 0
+
     # TODO: Refactor redundancy between document and text.
     if document is None:
       self.document = data.Document(text=text.text)
@@ -409,85 +438,129 @@ class ChunkIterator:
   def __iter__(self) -> Iterator[TextChunk]:
     return self
 
-  def _tokens_exceed_buffer(
-      self, token_interval: tokenizer.TokenInterval
-  ) -> bool:
-    """Check if the token interval exceeds the maximum buffer size.
+  def _find_sentence_end(self, token_pos: int) -> int:
+    """Returns the end index of the sentence containing `token_pos`.
+
+    Sentence boundaries are indexed once per tokenized text, so each lookup
+    is a binary search rather than a scan of the sentence's tokens.
 
     Args:
-      token_interval: Token interval to check.
+      token_pos: Token position within the document.
 
     Returns:
-      True if the token interval exceeds the maximum buffer size.
+      Index one past the last token of the sentence.
     """
-    char_interval = get_char_interval(self.tokenized_text, token_interval)
-    return (
-        char_interval.end_pos - char_interval.start_pos
-    ) > self.max_char_buffer
+    return self.tokenized_text.sentence_end(token_pos)
+
+  def _last_newline_token(self, token_index: int) -> int:
+    """Returns the last token at or before `token_index` that follows a newline.
+
+    Args:
+      token_index: Token index to search back from.
+
+    Returns:
+      The token index, or -1 if there is none.
+    """
+    i = bisect.bisect_right(self._newline_token_indices, token_index)
+    return self._newline_token_indices[i - 1] if i else -1
+
+  def _span_exceeds_buffer(self, start_index: int, end_index: int) -> bool:
+    """Check if the token span [start_index, end_index) exceeds the buffer.
+
+    Args:
+      start_index: First token of the span.
+      end_index: One past the last token of the span.
+
+    Returns:
+      True if the span exceeds the maximum buffer size or max_tokens.
+    """
+    if (
+        self._token_ends[end_index - 1] - self._token_starts[start_index]
+    ) > self.max_char_buffer:
+      return True
+    if self.max_tokens is None:
+      return False
+    span_text = self.tokenized_text.text[
+        self._token_starts[start_index] : self._token_ends[end_index - 1]
+    ]
+    return self.token_counter(span_text) > self.max_tokens
+
+  def _token_overflow_index(self, start_index: int, end_index: int) -> int:
+    """Returns the first token of [start_index, end_index) over max_tokens.
+
+    The span [start_index, start_index + 1) must fit. Token counts grow with
+    the span, so this is a binary search for the longest span that fits.
+
+    Args:
+      start_index: First token of the span.
+      end_index: One past the last token of the span.
+
+    Returns:
+      The index of the first token that does not fit, or end_index if the
+      whole span fits.
+    """
+    if self.max_tokens is None or not self._span_exceeds_buffer(
+        start_index, end_index
+    ):
+      return end_index
+    low, high = start_index + 1, end_index - 1
+    while low < high:
+      middle = (low + high + 1) // 2
+      if self._span_exceeds_buffer(start_index, middle):
+        high = middle - 1
+      else:
+        low = middle
+    return low
+
+  def _make_chunk(self, start_index: int, end_index: int) -> TextChunk:
+    """Advances past [start_index, end_index) and returns it as a chunk."""
+    self._curr_token_pos = end_index
+    return TextChunk(
+        token_interval=create_token_interval(start_index, end_index),
+        document=self.document,
+    )
 
   def __next__(self) -> TextChunk:
-    sentence = next(self.sentence_iter)
+    chunk_start = self._curr_token_pos
+    if chunk_start >= len(self._token_starts):
+      raise StopIteration
+    sentence_end = self._find_sentence_end(chunk_start)
+
     # If the next token is greater than the max_char_buffer, let it be the
     # entire chunk.
-    curr_chunk = create_token_interval(
-        sentence.start_index, sentence.start_index + 1
+    if self._span_exceeds_buffer(chunk_start, chunk_start + 1):
+      self.broken_sentence = chunk_start + 1 < sentence_end
+      return self._make_chunk(chunk_start, chunk_start + 1)
+
+    # Find the first token of the sentence that no longer fits. Token ends are
+    # non-decreasing, so this is a binary search over the sentence.
+    overflow_index = bisect.bisect_right(
+        self._token_ends,
+        self._token_starts[chunk_start] + self.max_char_buffer,
+        chunk_start,
+        sentence_end,
     )
-    if self._tokens_exceed_buffer(curr_chunk):
-      self.sentence_iter = SentenceIterator(
-          self.tokenized_text, curr_token_pos=sentence.start_index + 1
-      )
-      self.broken_sentence = curr_chunk.end_index < sentence.end_index
-      return TextChunk(
-          token_interval=curr_chunk,
-          document=self.document,
-      )
-
-    # Append tokens to the chunk up to the max_char_buffer.
-    start_of_new_line = -1
-    for token_index in range(curr_chunk.start_index, sentence.end_index):
-      if self.tokenized_text.tokens[token_index].first_token_after_newline:
-        start_of_new_line = token_index
-      test_chunk = create_token_interval(
-          curr_chunk.start_index, token_index + 1
-      )
-      if self._tokens_exceed_buffer(test_chunk):
-        # Only break at newline if: 1) newline exists (> 0) and
-        # 2) it's after chunk start (prevents empty intervals)
-        if start_of_new_line > 0 and start_of_new_line > curr_chunk.start_index:
-          # Terminate the curr_chunk at the start of the most recent newline.
-          curr_chunk = create_token_interval(
-              curr_chunk.start_index, start_of_new_line
-          )
-        self.sentence_iter = SentenceIterator(
-            self.tokenized_text, curr_token_pos=curr_chunk.end_index
-        )
-        self.broken_sentence = True
-        return TextChunk(
-            token_interval=curr_chunk,
-            document=self.document,
-        )
-      else:
-        curr_chunk = test_chunk
-
+    overflow_index = self._token_overflow_index(chunk_start, overflow_index)
+    if overflow_index < sentence_end:
+      chunk_end = overflow_index
+      # Only break at newline if: 1) newline exists (> 0) and
+      # 2) it's after chunk start (prevents empty intervals)
+      start_of_new_line = self._last_newline_token(overflow_index)
+      if start_of_new_line > 0 and start_of_new_line > chunk_start:
+        # Terminate the chunk at the start of the most recent newline.
+        chunk_end = start_of_new_line
+      self.broken_sentence = True
+      return self._make_chunk(chunk_start, chunk_end)
+
+    chunk_end = sentence_end
     if self.broken_sentence:
       self.broken_sentence = False
     else:
-      for sentence in self.sentence_iter:
-        test_chunk = create_token_interval(
-            curr_chunk.start_index, sentence.end_index
-        )
-        if self._tokens_exceed_buffer(test_chunk):
-          self.sentence_iter = SentenceIterator(
-              self.tokenized_text, curr_token_pos=curr_chunk.end_index
-          )
-          return TextChunk(
-              token_interval=curr_chunk,
-              document=self.document,
-          )
-        else:
-          curr_chunk = test_chunk
-
-    return TextChunk(
-        token_interval=curr_chunk,
-        document=self.document,
-    )
+      # Append whole sentences while they fit.
+      while chunk_end < len(self._token_starts):
+        next_sentence_end = self._find_sentence_end(chunk_end)
+        if self._span_exceeds_buffer(chunk_start, next_sentence_end):
+          break
+        chunk_end = next_sentence_end
+
+    return self._make_chunk(chunk_start, chunk_end)
@@ -153,7 +153,7 @@ class Document:
   @property
   def tokenized_text(self) -> tokenizer.TokenizedText:
     if self._tokenized_text is None:
-      self._tokenized_text = tokenizer.tokenize(self.text)
+      self._tokenized_text = tokenizer.tokenize_cached(self.text)
     return self._tokenized_text
 
   @tokenized_text.setter
@@ -161,6 +161,23 @@ class Document:
     self._tokenized_text = value
 
 
+@dataclasses.dataclass
+class ChunkFailure:
+  """A chunk whose extractions are missing from a partial document.
+
+  Attributes:
+    char_interval: The characters of the document covered by the chunk.
+    extraction_pass: The zero-based extraction pass that failed.
+    attempts: The number of attempts made.
+    error: The last error raised for the chunk.
+  """
+
+  char_interval: CharInterval
+  extraction_pass: int = 0
+  attempts: int = 1
+  error: str = ""
+
+
 @dataclasses.dataclass
 class AnnotatedDocument:
   """Class for representing annotated documents.
@@ -170,11 +187,14 @@ class AnnotatedDocument:
       set.
     extractions: List of extractions in the document.
     text: Raw text representation of the document.
+    failed_chunks: Chunks that could not be annotated, if the document was
+      allowed to be partial. None for a complete document.
     tokenized_text: Tokenized text of the document, computed from `text`.
   """
 
   extractions: list[Extraction] | None = None
   text: str | None = None
+  failed_chunks: list[ChunkFailure] | None = None
   _document_id: str | None = dataclasses.field(
       default=None, init=False, repr=False, compare=False
   )
@@ -188,9 +208,11 @@ class AnnotatedDocument:
       document_id: str | None = None,
       extractions: list[Extraction] | None = None,
       text: str | None = None,
+      failed_chunks: list[ChunkFailure] | None = None,
   ):
     self.extractions = extractions
     self.text = text
+    self.failed_chunks = failed_chunks
     self._document_id = document_id
 
   @property
@@ -208,7 +230,7 @@ class AnnotatedDocument:
   @property
   def tokenized_text(self) -> tokenizer.TokenizedText | None:
     if self._tokenized_text is None and self.text is not None:
-      self._tokenized_text = tokenizer.tokenize(self.text)
+      self._tokenized_text = tokenizer.tokenize_cached(self.text)
     return self._tokenized_text
 
   @tokenized_text.setter
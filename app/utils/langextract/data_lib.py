@@ -75,6 +75,9 @@ def annotated_document_to_dict(
     return {}
 
   result = dataclasses.asdict(adoc, dict_factory=enum_asdict_factory)
+  if adoc.failed_chunks is None:
+    # Complete documents keep the original JSON layout.
+    del result["failed_chunks"]
 
   result["document_id"] = adoc.document_id
 
@@ -114,10 +117,23 @@ def dict_to_annotated_document(
     else:
       extractions["alignment_status"] = None
 
+  failed_chunks = adoc_dic.get("failed_chunks")
+  if failed_chunks is not None:
+    failed_chunks = [
+        data.ChunkFailure(
+            **{
+                **failure,
+                "char_interval": data.CharInterval(**failure["char_interval"]),
+            }
+        )
+        for failure in failed_chunks
+    ]
+
   return data.AnnotatedDocument(
       document_id=adoc_dic.get("document_id"),
       text=adoc_dic.get("text"),
       extractions=[
           data.Extraction(**ent) for ent in adoc_dic.get("extractions", [])
       ],
+      failed_chunks=failed_chunks,
   )
@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Dynamic selection of few-shot examples.
+
+Every prompt normally carries all few-shot examples, so with long examples
+most input tokens are spent on examples rather than on the chunk. An
+`ExampleSelector` indexes the example pool once by character n-gram TF-IDF
+and puts only the examples most similar to each chunk into its prompt, up to
+a number of examples and a token budget. Character n-grams need no word
+segmentation, so they work for Chinese text as well.
+
+Example usage:
+  example_selector = example_selection.ExampleSelector(
+      max_examples=2, max_tokens=1500
+  )
+  result = lx.extract(..., example_selector=example_selector)
+  print(example_selector.stats)
+"""
+
+from __future__ import annotations
+
+import collections
+from collections.abc import Sequence
+import dataclasses
+import math
+import threading
+
+from langextract import data
+
+
+@dataclasses.dataclass
+class SelectionStats:
+  """Counters for an `ExampleSelector`.
+
+  Attributes:
+    prompts: Prompts examples were selected for.
+    examples_selected: Examples put into those prompts.
+    example_tokens_selected: Estimated tokens of the selected examples.
+    example_tokens_available: Estimated tokens of all examples, summed over
+      the prompts; the difference to example_tokens_selected was saved.
+  """
+
+  prompts: int = 0
+  examples_selected: int = 0
+  example_tokens_selected: int = 0
+  example_tokens_available: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class _ExampleIndex:
+  """TF-IDF index of an example pool.
+
+  Attributes:
+    examples: The indexed examples, to recognize the pool.
+    idf: Inverse document frequency of every n-gram in the pool.
+    postings: The examples containing each n-gram, with the n-gram's weight in
+      the example's normalized vector.
+  """
+
+  examples: tuple[data.ExampleData, ...]
+  idf: dict[str, float]
+  postings: dict[str, list[tuple[int, float]]]
+
+
+class ExampleSelector:
+  """Picks the few-shot examples most similar to each chunk.
+
+  Examples are ranked by the cosine similarity of their text to the chunk
+  text, as character n-gram TF-IDF vectors, and taken in that order while
+  they fit within max_examples and max_tokens. The most similar example is
+  always taken, so that the model sees the output format. The selected
+  examples keep their order in the pool, so chunks that select the same
+  examples get the same prompt prefix, which providers can cache.
+
+  The index is built on first use and rebuilt when a different pool is
+  passed. Safe to share between threads.
+  """
+
+  def __init__(
+      self,
+      max_examples: int | None = 3,
+      max_tokens: int | None = None,
+      ngram_sizes: Sequence[int] = (2, 3),
+  ):
+    """Initializes the selector.
+
+    Args:
+      max_examples: Maximum number of examples per prompt, or None for no
+        limit besides max_tokens.
+      max_tokens: Maximum estimated tokens of the examples in a prompt, or
+        None for no limit besides max_examples.
+      ngram_sizes: Lengths of the character n-grams compared.
+    """
+    if max_examples is not None and max_examples < 1:
+      raise ValueError("max_examples must be at least 1.")
+    if max_tokens is not None and max_tokens < 0:
+      raise ValueError("max_tokens must be non-negative.")
+    if not ngram_sizes or min(ngram_sizes) < 1:
+      raise ValueError("ngram_sizes must be positive lengths.")
+    self.max_examples = max_examples
+    self.max_tokens = max_tokens
+    self.ngram_sizes = tuple(ngram_sizes)
+    self.stats = SelectionStats()
+    self._lock = threading.Lock()
+    self._index: _ExampleIndex | None = None
+
+  def _ngram_counts(self, text: str) -> collections.Counter[str]:
+    """Counts the character n-grams of `text`, ignoring case and spacing."""
+    text = " ".join(text.lower().split())
+    counts: collections.Counter[str] = collections.Counter()
+    for n in self.ngram_sizes:
+      counts.update(text[i : i + n] for i in range(len(text) - n + 1))
+    return counts
+
+  def _get_index(self, examples: Sequence[data.ExampleData]) -> _ExampleIndex:
+    """Returns the index of `examples`, building it if needed."""
+
+    def indexes(index: _ExampleIndex | None) -> bool:
+      return (
+          index is not None
+          and len(index.examples) == len(examples)
+          and all(a is b for a, b in zip(index.examples, examples))
+      )
+
+    if indexes(self._index):
+      return self._index
+    with self._lock:
+      if indexes(self._index):
+        return self._index
+      examples = tuple(examples)
+      counts = [self._ngram_counts(example.text) for example in examples]
+      document_frequency: collections.Counter[str] = collections.Counter()
+      for example_counts in counts:
+        document_frequency.update(example_counts.keys())
+      idf = {
+          ngram: math.log((1 + len(examples)) / (1 + df)) + 1
+          for ngram, df in document_frequency.items()
+      }
+      postings: dict[str, list[tuple[int, float]]] = collections.defaultdict(
+          list
+      )
+      for example_index, example_counts in enumerate(counts):
+        weights = {
+            ngram: (1 + math.log(count)) * idf[ngram]
+            for ngram, count in example_counts.items()
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for ngram, weight in weights.items():
+          postings[ngram].append((example_index, weight / norm))
+      self._index = _ExampleIndex(
+          examples=examples, idf=idf, postings=dict(postings)
+      )
+      return self._index
+
+  def similarities(
+      self, examples: Sequence[data.ExampleData], text: str
+  ) -> list[float]:
+    """Returns how similar each example is to `text`, in pool order.
+
+    The scores rank the examples by cosine similarity; they are not
+    normalized by the length of `text`.
+    """
+    index = self._get_index(examples)
+    scores = [0.0] * len(index.examples)
+    for ngram, count in self._ngram_counts(text).items():
+      postings = index.postings.get(ngram)
+      if postings is None:
+        continue
+      weight = (1 + math.log(count)) * index.idf[ngram]
+      for example_index, example_weight in postings:
+        scores[example_index] += weight * example_weight
+    return scores
+
+  def select(
+      self,
+      examples: Sequence[data.ExampleData],
+      text: str,
+      example_tokens: Sequence[int] | None = None,
+  ) -> list[int]:
+    """Selects the examples to prompt with for `text`.
+
+    Args:
+      examples: The example pool.
+      text: The chunk text the prompt asks about.
+      example_tokens: Estimated tokens of each example as it appears in the
+        prompt. Required for max_tokens to apply.
+
+    Returns:
+      Indices into `examples` of the selected examples, in pool order.
+    """
+    if not examples:
+      return []
+    scores = self.similarities(examples, text)
+    # Stable, so that ties keep pool order.
+    ranked = sorted(range(len(scores)), key=lambda i: -scores[i])
+    selected: list[int] = []
+    tokens = 0
+    for example_index in ranked:
+      if self.max_examples is not None and len(selected) >= self.max_examples:
+        break
+      cost = example_tokens[example_index] if example_tokens else 0
+      if (
+          selected
+          and self.max_tokens is not None
+          and tokens + cost > self.max_tokens
+      ):
+        continue
+      selected.append(example_index)
+      tokens += cost
+    with self._lock:
+      self.stats.prompts += 1
+      self.stats.examples_selected += len(selected)
+      self.stats.example_tokens_selected += tokens
+      self.stats.example_tokens_available += sum(example_tokens or ())
+    return sorted(selected)
@@ -0,0 +1,255 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Hedged requests against tail latency.
+
+A batch of prompts completes only when its slowest request does, so a single
+straggler holds up the whole batch. A `HedgingPolicy` sends a duplicate of a
+request that is slower than a percentile (by default p95) of the latencies
+observed so far, and returns whichever copy finishes first. Duplicates are
+capped at a fraction of all requests.
+
+Example usage:
+  hedging_policy = hedging.HedgingPolicy(max_extra_fraction=0.05)
+  model = inference.CustomAPIModel(..., hedging_policy=hedging_policy)
+  ...
+  print(hedging_policy.stats)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import collections
+from collections.abc import Awaitable, Callable
+import concurrent.futures
+import dataclasses
+import threading
+import time
+from typing import TypeVar
+
+_T = TypeVar("_T")
+
+
+@dataclasses.dataclass
+class HedgeStats:
+  """Counters for a `HedgingPolicy`.
+
+  Attributes:
+    requests: Requests sent through the policy, not counting duplicates.
+    hedges_fired: Duplicates sent.
+    hedges_won: Duplicates that returned before the original.
+    hedges_skipped: Slow requests not duplicated because the budget was spent.
+  """
+
+  requests: int = 0
+  hedges_fired: int = 0
+  hedges_won: int = 0
+  hedges_skipped: int = 0
+
+
+class HedgingPolicy:
+  """Decides when to duplicate a slow request, and runs both copies.
+
+  Safe to share between threads, models and event loops. Synchronous calls
+  run on the policy's own threads while the caller waits. A losing copy is
+  cancelled if it has not started; otherwise its result is discarded when it
+  finishes, since a blocking HTTP request cannot be interrupted. On the event
+  loop the losing task is cancelled.
+  """
+
+  def __init__(
+      self,
+      percentile: float = 0.95,
+      max_extra_fraction: float = 0.05,
+      min_samples: int = 20,
+      min_delay_seconds: float = 0.0,
+      window: int = 1000,
+      max_threads: int = 256,
+  ):
+    """Initializes the policy.
+
+    Args:
+      percentile: Latency percentile, between 0 and 1, after which a request
+        is duplicated.
+      max_extra_fraction: Maximum duplicates as a fraction of requests.
+      min_samples: Latencies to observe before any request is duplicated.
+      min_delay_seconds: Lower bound on the wait before duplicating.
+      window: Number of recent latencies the percentile is computed over.
+      max_threads: Threads for running synchronous requests and duplicates.
+    """
+    if not 0 < percentile < 1:
+      raise ValueError("percentile must be between 0 and 1.")
+    if max_extra_fraction < 0:
+      raise ValueError("max_extra_fraction must be non-negative.")
+    if window < 1 or min_samples < 1:
+      raise ValueError("window and min_samples must be at least 1.")
+    self.percentile = percentile
+    self.max_extra_fraction = max_extra_fraction
+    self.min_samples = min_samples
+    self.min_delay_seconds = min_delay_seconds
+    self.window = window
+    self.max_threads = max_threads
+    self.stats = HedgeStats()
+    self._lock = threading.Lock()
+    self._recent: collections.deque[float] = collections.deque()
+    self._sorted: list[float] = []
+    self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+  def record_latency(self, seconds: float) -> None:
+    """Adds a completed request's latency to the window."""
+    with self._lock:
+      self._recent.append(seconds)
+      bisect.insort(self._sorted, seconds)
+      if len(self._recent) > self.window:
+        del self._sorted[bisect.bisect_left(self._sorted, self._recent[0])]
+        self._recent.popleft()
+
+  def hedge_delay(self) -> float | None:
+    """Returns how long to wait before duplicating, or None to never do so."""
+    with self._lock:
+      if len(self._sorted) < self.min_samples:
+        return None
+      index = min(
+          len(self._sorted) - 1, int(self.percentile * len(self._sorted))
+      )
+      return max(self.min_delay_seconds, self._sorted[index])
+
+  def _start_request(self) -> float | None:
+    with self._lock:
+      self.stats.requests += 1
+    return self.hedge_delay()
+
+  def _take_hedge_budget(self) -> bool:
+    with self._lock:
+      # One duplicate is allowed up front so that small runs can hedge.
+      if self.stats.hedges_fired + 1 > 1 + (
+          self.max_extra_fraction * self.stats.requests
+      ):
+        self.stats.hedges_skipped += 1
+        return False
+      self.stats.hedges_fired += 1
+      return True
+
+  def _timed(self, call: Callable[[], _T]) -> Callable[[], _T]:
+    def timed_call() -> _T:
+      start = time.monotonic()
+      result = call()
+      self.record_latency(time.monotonic() - start)
+      return result
+
+    return timed_call
+
+  def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+    with self._lock:
+      if self._executor is None:
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_threads, thread_name_prefix="hedging"
+        )
+      return self._executor
+
+  def call(
+      self,
+      request: Callable[[], _T],
+      hedge: Callable[[], _T] | None = None,
+  ) -> _T:
+    """Runs `request`, duplicating it with `hedge` if it is slow.
+
+    Args:
+      request: Sends the request and returns its result.
+      hedge: Sends the duplicate, e.g. to another endpoint. Defaults to
+        `request`.
+
+    Returns:
+      The result of whichever copy succeeds first.
+
+    Raises:
+      Exception: The error of the original request, if no copy succeeded.
+    """
+    delay = self._start_request()
+    if delay is None:
+      return self._timed(request)()
+
+    executor = self._get_executor()
+    primary = executor.submit(self._timed(request))
+    done, _ = concurrent.futures.wait({primary}, timeout=delay)
+    if done or not self._take_hedge_budget():
+      return primary.result()
+
+    duplicate = executor.submit(self._timed(hedge or request))
+    pending = {primary, duplicate}
+    while pending:
+      done, pending = concurrent.futures.wait(
+          pending, return_when=concurrent.futures.FIRST_COMPLETED
+      )
+      for future in done:
+        if future.exception() is None:
+          for other in pending:
+            other.cancel()
+          if future is duplicate:
+            with self._lock:
+              self.stats.hedges_won += 1
+          return future.result()
+    return primary.result()
+
+  async def call_async(
+      self,
+      request: Callable[[], Awaitable[_T]],
+      hedge: Callable[[], Awaitable[_T]] | None = None,
+  ) -> _T:
+    """Like `call`, for coroutines; the losing copy is cancelled."""
+
+    async def timed(make_request: Callable[[], Awaitable[_T]]) -> _T:
+      start = time.monotonic()
+      result = await make_request()
+      self.record_latency(time.monotonic() - start)
+      return result
+
+    delay = self._start_request()
+    if delay is None:
+      return await timed(request)
+
+    primary = asyncio.ensure_future(timed(request))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or not self._take_hedge_budget():
+      return await primary
+
+    duplicate = asyncio.ensure_future(timed(hedge or request))
+    pending = {primary, duplicate}
+    try:
+      while pending:
+        done, pending = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+          if task.exception() is None:
+            if task is duplicate:
+              with self._lock:
+                self.stats.hedges_won += 1
+            return task.result()
+      return primary.result()
+    finally:
+      for task in pending:
+        task.cancel()
+      # Retrieve the duplicate's error, if any, so it is not logged as
+      # unhandled.
+      if duplicate.done() and not duplicate.cancelled():
+        duplicate.exception()
+
+  def close(self) -> None:
+    """Shuts down the policy's threads once running requests finish."""
+    with self._lock:
+      executor, self._executor = self._executor, None
+    if executor is not None:
+      executor.shutdown(wait=False)
@@ -0,0 +1,333 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pooled, keep-alive HTTP connections for REST-based language models.
+
+Each model owns one `HttpPool` so that the TCP and TLS handshakes to its
+endpoint are paid once per connection rather than once per request. The pool
+is backed by a `requests.Session`. When HTTP/2 is requested and the optional
+`httpx` and `h2` packages are installed, an HTTP/2 `httpx.Client` is used
+instead; responses and errors are then adapted to the `requests` interface so
+callers handle both backends the same way.
+
+`AsyncHttpPool` is the asyncio counterpart, backed by an `httpx.AsyncClient`.
+"""
+
+from collections.abc import Iterator
+import contextlib
+import importlib.util
+from typing import Any
+
+from absl import logging
+import requests
+from requests import adapters
+
+try:
+  import httpx
+except ImportError:
+  httpx = None
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_READ_TIMEOUT_SECONDS = 120.0
+
+
+def http2_available() -> bool:
+  """Returns True if the optional HTTP/2 dependencies are installed."""
+  return httpx is not None and importlib.util.find_spec("h2") is not None
+
+
+class _HttpxResponse:
+  """Adapts an `httpx.Response` to the `requests.Response` methods used here."""
+
+  def __init__(self, response: "httpx.Response"):
+    self._response = response
+
+  @property
+  def status_code(self) -> int:
+    return self._response.status_code
+
+  @property
+  def headers(self) -> Any:
+    return self._response.headers
+
+  @property
+  def encoding(self) -> str | None:
+    return self._response.encoding
+
+  @encoding.setter
+  def encoding(self, value: str) -> None:
+    self._response.encoding = value
+
+  @property
+  def content(self) -> bytes:
+    return self._response.content
+
+  @property
+  def text(self) -> str:
+    return self._response.text
+
+  def json(self) -> Any:
+    return self._response.json()
+
+  def iter_content(self, chunk_size: int = 1) -> Iterator[bytes]:
+    content = self._response.content
+    for start in range(0, len(content), chunk_size):
+      yield content[start : start + chunk_size]
+
+  def iter_lines(self) -> Iterator[bytes]:
+    return iter(self._response.content.splitlines())
+
+  def close(self) -> None:
+    self._response.close()
+
+  def raise_for_status(self) -> None:
+    if self._response.is_error:
+      raise requests.exceptions.HTTPError(
+          f"{self.status_code} Error for url: {self._response.url}",
+          response=self,
+      )
+
+
+@contextlib.contextmanager
+def _as_requests_errors() -> Iterator[None]:
+  """Re-raises `httpx` errors as the matching `requests` exceptions."""
+  try:
+    yield
+  except httpx.ConnectTimeout as e:
+    raise requests.exceptions.ConnectTimeout(str(e)) from e
+  except httpx.ReadTimeout as e:
+    raise requests.exceptions.ReadTimeout(str(e)) from e
+  except httpx.TimeoutException as e:
+    raise requests.exceptions.Timeout(str(e)) from e
+  except httpx.HTTPError as e:
+    raise requests.exceptions.RequestException(str(e)) from e
+
+
+class HttpPool:
+  """A keep-alive HTTP connection pool with configurable timeouts.
+
+  Usable as a context manager; the pool is closed on exit.
+
+  Attributes:
+    pool_size: Maximum number of connections kept open per host. Should match
+      the number of threads issuing requests concurrently.
+    connect_timeout: Seconds to wait for a connection to be established.
+    read_timeout: Default seconds to wait for the server to respond.
+  """
+
+  def __init__(
+      self,
+      pool_size: int = 10,
+      connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+      read_timeout: float = DEFAULT_READ_TIMEOUT_SECONDS,
+      http2: bool = False,
+  ):
+    """Initializes the pool.
+
+    Args:
+      pool_size: Maximum number of connections kept open per host.
+      connect_timeout: Seconds to wait for a connection to be established.
+      read_timeout: Default seconds to wait for the server to respond.
+      http2: Whether to use HTTP/2. Falls back to HTTP/1.1 with a warning if
+        `httpx` and `h2` are not installed.
+    """
+    self.pool_size = max(1, pool_size)
+    self.connect_timeout = connect_timeout
+    self.read_timeout = read_timeout
+    self._session: requests.Session | None = None
+    self._client: "httpx.Client | None" = None
+
+    if http2 and http2_available():
+      self._client = httpx.Client(
+          http2=True,
+          limits=httpx.Limits(
+              max_connections=self.pool_size,
+              max_keepalive_connections=self.pool_size,
+          ),
+          timeout=httpx.Timeout(
+              read_timeout, connect=connect_timeout, pool=None
+          ),
+      )
+    else:
+      if http2:
+        logging.warning(
+            "HTTP/2 requested but httpx and h2 are not installed; using"
+            " HTTP/1.1."
+        )
+      self._session = requests.Session()
+      adapter = adapters.HTTPAdapter(
+          pool_connections=self.pool_size, pool_maxsize=self.pool_size
+      )
+      self._session.mount("http://", adapter)
+      self._session.mount("https://", adapter)
+
+  @property
+  def http2(self) -> bool:
+    """Whether requests are sent over HTTP/2."""
+    return self._client is not None
+
+  def request(
+      self,
+      method: str,
+      url: str,
+      timeout: float | None = None,
+      **kwargs,
+  ) -> Any:
+    """Sends a request over a pooled connection.
+
+    Args:
+      method: HTTP method, e.g. "POST".
+      url: Request URL.
+      timeout: Read timeout in seconds overriding `read_timeout`.
+      **kwargs: Passed to `requests.Session.request` (e.g. `headers`, `json`,
+        `stream`). `stream` is ignored on HTTP/2, where the body is read
+        eagerly.
+
+    Returns:
+      A `requests.Response`, or an object with the same interface on HTTP/2.
+
+    Raises:
+      requests.exceptions.RequestException: If the request fails. Timeouts
+        raise the `ConnectTimeout` or `ReadTimeout` subclasses.
+    """
+    read_timeout = self.read_timeout if timeout is None else timeout
+
+    if self._client is None:
+      if self._session is None:
+        raise requests.exceptions.RequestException("HttpPool is closed.")
+      return self._session.request(
+          method, url, timeout=(self.connect_timeout, read_timeout), **kwargs
+      )
+
+    kwargs.pop("stream", None)
+    with _as_requests_errors():
+      response = self._client.request(
+          method,
+          url,
+          timeout=httpx.Timeout(
+              read_timeout, connect=self.connect_timeout, pool=None
+          ),
+          **kwargs,
+      )
+    return _HttpxResponse(response)
+
+  def post(self, url: str, **kwargs) -> Any:
+    """Sends a POST request. See `request`."""
+    return self.request("POST", url, **kwargs)
+
+  def get(self, url: str, **kwargs) -> Any:
+    """Sends a GET request. See `request`."""
+    return self.request("GET", url, **kwargs)
+
+  def close(self) -> None:
+    """Closes all pooled connections. Further requests raise an error."""
+    if self._session is not None:
+      self._session.close()
+      self._session = None
+    if self._client is not None:
+      self._client.close()
+      self._client = None
+
+  def __enter__(self) -> "HttpPool":
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    self.close()
+
+
+class AsyncHttpPool:
+  """An asyncio keep-alive HTTP connection pool with configurable timeouts.
+
+  The asyncio counterpart of `HttpPool`, with the same arguments, responses
+  and exceptions. Requires `httpx`. A pool is bound to the event loop it is
+  first used on. Usable as an async context manager; the pool is closed on
+  exit.
+  """
+
+  def __init__(
+      self,
+      pool_size: int = 10,
+      connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+      read_timeout: float = DEFAULT_READ_TIMEOUT_SECONDS,
+      http2: bool = False,
+  ):
+    """Initializes the pool. See `HttpPool` for the arguments.
+
+    Raises:
+      ImportError: If `httpx` is not installed.
+    """
+    if httpx is None:
+      raise ImportError("AsyncHttpPool requires the httpx package.")
+    self.pool_size = max(1, pool_size)
+    self.connect_timeout = connect_timeout
+    self.read_timeout = read_timeout
+    if http2 and not http2_available():
+      logging.warning(
+          "HTTP/2 requested but h2 is not installed; using HTTP/1.1."
+      )
+      http2 = False
+    self.http2 = http2
+    self._client: "httpx.AsyncClient | None" = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+        ),
+        timeout=httpx.Timeout(
+            read_timeout, connect=connect_timeout, pool=None
+        ),
+    )
+
+  async def request(
+      self,
+      method: str,
+      url: str,
+      timeout: float | None = None,
+      **kwargs,
+  ) -> _HttpxResponse:
+    """Sends a request over a pooled connection. See `HttpPool.request`."""
+    if self._client is None:
+      raise requests.exceptions.RequestException("AsyncHttpPool is closed.")
+    read_timeout = self.read_timeout if timeout is None else timeout
+    kwargs.pop("stream", None)
+    with _as_requests_errors():
+      response = await self._client.request(
+          method,
+          url,
+          timeout=httpx.Timeout(
+              read_timeout, connect=self.connect_timeout, pool=None
+          ),
+          **kwargs,
+      )
+    return _HttpxResponse(response)
+
+  async def post(self, url: str, **kwargs) -> _HttpxResponse:
+    """Sends a POST request. See `request`."""
+    return await self.request("POST", url, **kwargs)
+
+  async def get(self, url: str, **kwargs) -> _HttpxResponse:
+    """Sends a GET request. See `request`."""
+    return await self.request("GET", url, **kwargs)
+
+  async def close(self) -> None:
+    """Closes all pooled connections. Further requests raise an error."""
+    if self._client is not None:
+      await self._client.aclose()
+      self._client = None
+
+  async def __aenter__(self) -> "AsyncHttpPool":
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+    await self.close()
@@ -15,14 +15,17 @@
 """Simple library for performing language model inference."""
 
 import abc
+import asyncio
 import os
-from collections.abc import Iterator, Mapping, Sequence
+from collections.abc import Awaitable, Callable, Iterator, Mapping, Sequence
 import concurrent.futures
+import contextlib
 import dataclasses
 import enum
+import hashlib
 import json
 import textwrap
-from typing import Any
+from typing import Any, TypeVar
 
 from google import genai
 import openai
@@ -35,9 +38,16 @@ import yaml
 
 from langextract import data
 from langextract import exceptions
+from langextract import hedging
+from langextract import http_pool
+from langextract import rate_limit
 from langextract import schema
 
 _OLLAMA_DEFAULT_MODEL_URL = 'http://localhost:11434'
+# Prompt prefixes a model keeps for provider-side prompt caching.
+_MAX_PROMPT_PREFIXES = 32
+
+_T = TypeVar('_T')
 
 
 @dataclasses.dataclass(frozen=True)
@@ -67,8 +77,18 @@ class BaseLanguageModel(abc.ABC):
 
   Attributes:
     _constraint: A `Constraint` object specifying constraints for model output.
+    _rate_limiter: Optional `rate_limit.RateLimiter` that every request to the
+      endpoint goes through.
+    _hedging_policy: Optional `hedging.HedgingPolicy` for duplicating slow
+      requests.
+    _prompt_prefixes: Prompt prefixes shared by many requests, which backends
+      with provider-side prompt caching mark as cacheable.
   """
 
+  _rate_limiter: rate_limit.RateLimiter | None = None
+  _hedging_policy: hedging.HedgingPolicy | None = None
+  _prompt_prefixes: tuple[str, ...] = ()
+
   def __init__(self, constraint: schema.Constraint = schema.Constraint()):
     """Initializes the BaseLanguageModel with an optional constraint.
 
@@ -95,6 +115,228 @@ class BaseLanguageModel(abc.ABC):
       score.
     """
 
+  async def infer_async(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[ScoredOutput]]:
+    """Implements language model inference without blocking the event loop.
+
+    The default runs `infer` in a worker thread. Subclasses with an asyncio
+    client override this to send requests natively.
+
+    Args:
+      batch_prompts: Batch of inputs for inference.
+      **kwargs: Additional arguments for inference, as for `infer`.
+
+    Returns:
+      One sequence of scored outputs per prompt, in prompt order.
+    """
+    return await asyncio.to_thread(
+        lambda: list(self.infer(batch_prompts, **kwargs))
+    )
+
+  def register_prompt_prefix(self, prefix: str) -> None:
+    """Registers a prefix that many of the following prompts start with.
+
+    The annotator registers the description and few-shot examples it puts in
+    front of every chunk. Backends whose providers cache prompts look up the
+    prefix of each request with `_prompt_prefix` and mark it as cacheable;
+    the others ignore it. Only the most recently registered prefixes are
+    kept.
+
+    Args:
+      prefix: The shared start of the following prompts.
+    """
+    if not prefix or prefix in self._prompt_prefixes:
+      return
+    # Replaced rather than modified, so threads reading it need no lock.
+    self._prompt_prefixes = (
+        self._prompt_prefixes[-(_MAX_PROMPT_PREFIXES - 1) :] + (prefix,)
+    )
+
+  def _prompt_prefix(self, prompt: str) -> str | None:
+    """Returns the longest registered prefix `prompt` starts with, if any."""
+    matches = [p for p in self._prompt_prefixes if prompt.startswith(p)]
+    return max(matches, key=len) if matches else None
+
+  def infer_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+    """Streams the output for a single prompt while it is generated.
+
+    The default yields the complete output of `infer` at once. Subclasses
+    whose endpoints can stream override this to yield each piece of text as
+    it arrives. Streamed requests go through the rate limiter but are not
+    hedged, since a partly consumed stream cannot be replaced.
+
+    Args:
+      prompt: Input for inference.
+      **kwargs: Additional arguments for inference, as for `infer`.
+
+    Yields:
+      Successive pieces of the top output; joined, they are the output.
+    """
+    for outputs in self.infer([prompt], **kwargs):
+      if outputs and outputs[0].output:
+        yield outputs[0].output
+
+  def infer_isolated(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[ScoredOutput] | Exception]:
+    """Runs inference, returning each prompt's error instead of raising it.
+
+    A failing prompt then does not lose the outputs of the others, so it can
+    be retried on its own. The default sends the batch with `infer` and keeps
+    the outputs yielded before an error, which is attributed to the next
+    prompt; the prompts after it are sent one at a time. If nothing was
+    yielded, every prompt is sent again on its own. Subclasses that process
+    prompts independently override this to avoid the second round.
+
+    Args:
+      batch_prompts: Batch of inputs for inference.
+      **kwargs: Additional arguments for inference, as for `infer`.
+
+    Returns:
+      One sequence of scored outputs, or the exception raised for it, per
+      prompt, in prompt order.
+    """
+    results: list[Sequence[ScoredOutput] | Exception] = []
+    try:
+      for outputs in self.infer(batch_prompts, **kwargs):
+        results.append(outputs)
+      return results
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      if results or len(batch_prompts) == 1:
+        results.append(e)
+
+    for prompt in batch_prompts[len(results) :]:
+      try:
+        results.extend(self.infer([prompt], **kwargs))
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        results.append(e)
+    return results
+
+  def _rate_limited(self, prompt: str) -> contextlib.AbstractContextManager:
+    """Returns a context for sending `prompt` under the model's rate limiter."""
+    if self._rate_limiter is None:
+      return contextlib.nullcontext()
+    return self._rate_limiter.slot(prompt)
+
+  def _rate_limited_stream(
+      self, prompt: str, pieces: Iterator[str]
+  ) -> Iterator[str]:
+    """Yields the `pieces` of a streamed response to `prompt`, rate limited.
+
+    Only sending the request and waiting for its first piece hold a slot of
+    the rate limiter, so the limiter sees the time to the first piece as the
+    request's latency. The rest of the stream, including the consumer's work
+    between pieces, neither holds its concurrency nor counts as latency.
+
+    Args:
+      prompt: Prompt the stream was requested for.
+      pieces: Lazy iterator that sends the request when first advanced, e.g.
+        a generator.
+    """
+    try:
+      with self._rate_limited(prompt):
+        first = next(pieces, None)
+      if first is None:
+        return
+      yield first
+      yield from pieces
+    finally:
+      # Closes the response of a stream that was not read to the end.
+      close = getattr(pieces, 'close', None)
+      if close is not None:
+        close()
+
+  def _rate_limited_async(
+      self, prompt: str
+  ) -> contextlib.AbstractAsyncContextManager:
+    """Like `_rate_limited`, for requests sent on the event loop."""
+    if self._rate_limiter is None:
+      return contextlib.nullcontext()
+    return self._rate_limiter.slot_async(prompt)
+
+  def _hedged(self, request: Callable[[], _T]) -> _T:
+    """Runs `request` under the model's hedging policy, if any."""
+    if self._hedging_policy is None:
+      return request()
+    return self._hedging_policy.call(request)
+
+  async def _hedged_async(self, request: Callable[[], Awaitable[_T]]) -> _T:
+    """Like `_hedged`, for requests sent on the event loop."""
+    if self._hedging_policy is None:
+      return await request()
+    return await self._hedging_policy.call_async(request)
+
+  def invalidate(self, batch_prompts: Sequence[str], **kwargs) -> None:
+    """Forgets any stored responses to `batch_prompts`.
+
+    Called before a prompt is retried because its output could not be used,
+    so that the retry reaches the model. A no-op unless responses are cached.
+    """
+
+  def cache_key_fields(self) -> dict[str, Any]:
+    """Returns the settings that, with a prompt, determine the model output.
+
+    Used to key cached responses, so subclasses must include every setting
+    that changes what the model returns (model ID, temperature, output format,
+    schema) and nothing that does not, such as API keys or worker counts.
+    """
+    return {'class': type(self).__name__, 'constraint': self._constraint}
+
+  def close(self) -> None:
+    """Releases network resources held by the model.
+
+    Subclasses that own clients or connection pools override this. The model
+    can also be used as a context manager, which calls `close` on exit.
+    """
+
+  def __enter__(self) -> 'BaseLanguageModel':
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    self.close()
+
+  async def aclose(self) -> None:
+    """Releases resources used by `infer_async` and then calls `close`."""
+    self.close()
+
+  async def __aenter__(self) -> 'BaseLanguageModel':
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+    await self.aclose()
+
+
+def _process_prompts_isolated(
+    process_prompt: Callable[[str], ScoredOutput],
+    batch_prompts: Sequence[str],
+    max_workers: int,
+) -> list[Sequence[ScoredOutput] | Exception]:
+  """Processes prompts on up to `max_workers` threads, capturing errors.
+
+  Args:
+    process_prompt: Returns the output for one prompt.
+    batch_prompts: Prompts to process.
+    max_workers: Maximum number of threads.
+
+  Returns:
+    One output list, or the exception raised for it, per prompt, in prompt
+    order.
+  """
+
+  def process(prompt: str) -> Sequence[ScoredOutput] | Exception:
+    try:
+      return [process_prompt(prompt)]
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      return e
+
+  if len(batch_prompts) > 1 and max_workers > 1:
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(batch_prompts))
+    ) as executor:
+      return list(executor.map(process, batch_prompts))
+  return [process(prompt) for prompt in batch_prompts]
+
 
 class InferenceType(enum.Enum):
   ITERATIVE = 'iterative'
@@ -114,6 +356,9 @@ class OllamaLanguageModel(BaseLanguageModel):
   _extra_kwargs: dict[str, Any] = dataclasses.field(
       default_factory=dict, repr=False, compare=False
   )
+  _http_pool: http_pool.HttpPool | None = dataclasses.field(
+      default=None, repr=False, compare=False
+  )
 
   def __init__(
       self,
@@ -121,28 +366,91 @@ class OllamaLanguageModel(BaseLanguageModel):
       model_url: str = _OLLAMA_DEFAULT_MODEL_URL,
       structured_output_format: str = 'json',
       constraint: schema.Constraint = schema.Constraint(),
+      connect_timeout: float = http_pool.DEFAULT_CONNECT_TIMEOUT_SECONDS,
+      http2: bool = False,
+      rate_limiter: rate_limit.RateLimiter | None = None,
       **kwargs,
   ) -> None:
+    """Initialize the Ollama language model.
+
+    Args:
+      model_id: The Ollama model to use, e.g. "gemma2:latest".
+      model_url: The base URL of the Ollama server.
+      structured_output_format: Output format requested from the server.
+      constraint: Constraints for model output.
+      connect_timeout: Seconds to wait for a connection to the server.
+      http2: Whether to use HTTP/2 when the optional dependencies are
+        installed.
+      rate_limiter: Optional limiter shared by all models of the server.
+      **kwargs: Ignored extra parameters so callers can pass a superset of
+        arguments shared across back-ends without raising ``TypeError``.
+    """
     self._model = model_id
     self._model_url = model_url
     self._structured_output_format = structured_output_format
     self._constraint = constraint
     self._extra_kwargs = kwargs or {}
+    self._rate_limiter = rate_limiter
+    # Prompts are sent one at a time, so a single kept-alive connection
+    # suffices.
+    self._http_pool = http_pool.HttpPool(
+        pool_size=1, connect_timeout=connect_timeout, http2=http2
+    )
     super().__init__(constraint=constraint)
 
+  @override
+  def cache_key_fields(self) -> dict[str, Any]:
+    return {
+        'class': type(self).__name__,
+        'model_id': self._model,
+        'model_url': self._model_url,
+        'structured_output_format': self._structured_output_format,
+    }
+
+  @override
+  def close(self) -> None:
+    if self._http_pool is not None:
+      self._http_pool.close()
+
   @override
   def infer(
       self, batch_prompts: Sequence[str], **kwargs
   ) -> Iterator[Sequence[ScoredOutput]]:
     for prompt in batch_prompts:
+      with self._rate_limited(prompt):
+        response = self._ollama_query(
+            prompt=prompt,
+            model=self._model,
+            structured_output_format=self._structured_output_format,
+            model_url=self._model_url,
+        )
+      # No score for Ollama. Default to 1.0
+      yield [ScoredOutput(score=1.0, output=response['response'])]
+
+  @override
+  def infer_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+    def pieces() -> Iterator[str]:
       response = self._ollama_query(
           prompt=prompt,
           model=self._model,
           structured_output_format=self._structured_output_format,
           model_url=self._model_url,
+          stream=True,
       )
-      # No score for Ollama. Default to 1.0
-      yield [ScoredOutput(score=1.0, output=response['response'])]
+      try:
+        # Each line is a JSON object with the next piece of the response.
+        for line in response.iter_lines():
+          if not line:
+            continue
+          piece = json.loads(line)
+          if piece.get('response'):
+            yield piece['response']
+          if piece.get('done'):
+            break
+      finally:
+        response.close()
+
+    return self._rate_limited_stream(prompt, pieces())
 
   def _ollama_query(
       self,
@@ -160,7 +468,8 @@ class OllamaLanguageModel(BaseLanguageModel):
       keep_alive: int = 5 * 60,  # if loading, keep model up for 5 minutes.
       num_threads: int | None = None,
       num_ctx: int = 2048,
-  ) -> Mapping[str, Any]:
+      stream: bool = False,
+  ) -> Mapping[str, Any] | requests.Response:
     """Sends a prompt.txt to an Ollama model and returns the generated response.
 
     This function makes an HTTP POST request to the `/api/generate` endpoint of
@@ -183,18 +492,21 @@ class OllamaLanguageModel(BaseLanguageModel):
         entire raw prompt.txt.
       model_url: The base URL for the Ollama server, typically
         "http://localhost:11434".
-      timeout: Timeout (in seconds) for the HTTP request.
+      timeout: Read timeout (in seconds) for the HTTP request.
       keep_alive: How long (in seconds) the model remains loaded after
         generation completes.
       num_threads: Number of CPU threads to use. If None, Ollama uses a default
         heuristic.
       num_ctx: Number of context tokens allowed. If None, uses model’s default
         or config.
+      stream: Whether the server streams the response. The unread response is
+        then returned; each of its lines is a JSON object whose `"response"`
+        key holds the next piece of the generated text.
 
     Returns:
       A mapping (dictionary-like) containing the server’s JSON response. For
       non-streaming calls, the `"response"` key typically contains the entire
-      generated text.
+      generated text. For streaming calls, the open response.
 
     Raises:
       ValueError: If the server returns a 404 (model not found) or any non-OK
@@ -220,13 +532,13 @@ class OllamaLanguageModel(BaseLanguageModel):
         'model': model,
         'prompt.txt': prompt,
         'system': system,
-        'stream': False,
+        'stream': stream,
         'raw': raw,
         'format': structured_output_format,
         'options': options,
     }
     try:
-      response = requests.post(
+      response = self._http_pool.post(
           model_url,
           headers={
               'Content-Type': 'application/json',
@@ -234,6 +546,7 @@ class OllamaLanguageModel(BaseLanguageModel):
           },
           json=payload,
           timeout=timeout,
+          stream=stream,
       )
     except requests.exceptions.RequestException as e:
       if isinstance(e, requests.exceptions.ReadTimeout):
@@ -246,7 +559,7 @@ class OllamaLanguageModel(BaseLanguageModel):
 
     response.encoding = 'utf-8'
     if response.status_code == 200:
-      return response.json()
+      return response if stream else response.json()
     if response.status_code == 404:
       raise ValueError(
           f"Can't find Ollama {model}. Try launching `ollama run {model}`"
@@ -280,6 +593,8 @@ class GeminiLanguageModel(BaseLanguageModel):
       format_type: data.FormatType = data.FormatType.JSON,
       temperature: float = 0.0,
       max_workers: int = 10,
+      rate_limiter: rate_limit.RateLimiter | None = None,
+      hedging_policy: hedging.HedgingPolicy | None = None,
       **kwargs,
   ) -> None:
     """Initialize the Gemini language model.
@@ -291,6 +606,10 @@ class GeminiLanguageModel(BaseLanguageModel):
       format_type: Output format (JSON or YAML).
       temperature: Sampling temperature.
       max_workers: Maximum number of parallel API calls.
+      rate_limiter: Optional limiter shared by all models of the endpoint.
+        Its adaptive concurrency limit may hold calls below max_workers.
+      hedging_policy: Optional policy for re-sending calls that are slower
+        than most, so that one straggler does not hold up a batch.
       **kwargs: Ignored extra parameters so callers can pass a superset of
         arguments shared across back-ends without raising ``TypeError``.
     """
@@ -301,6 +620,8 @@ class GeminiLanguageModel(BaseLanguageModel):
     self.temperature = temperature
     self.max_workers = max_workers
     self._extra_kwargs = kwargs or {}
+    self._rate_limiter = rate_limiter
+    self._hedging_policy = hedging_policy
 
     if not self.api_key:
       raise ValueError('API key not provided.')
@@ -311,28 +632,87 @@ class GeminiLanguageModel(BaseLanguageModel):
         constraint=schema.Constraint(constraint_type=schema.ConstraintType.NONE)
     )
 
+  @override
+  def cache_key_fields(self) -> dict[str, Any]:
+    return {
+        'class': type(self).__name__,
+        'model_id': self.model_id,
+        'gemini_schema': self.gemini_schema,
+        'format_type': self.format_type,
+        'temperature': self.temperature,
+    }
+
+  def _add_schema(self, config: dict) -> None:
+    """Adds the structured output settings, if any, to `config`."""
+    if self.gemini_schema:
+      response_schema = self.gemini_schema.schema_dict
+      mime_type = (
+          'application/json'
+          if self.format_type == data.FormatType.JSON
+          else 'application/yaml'
+      )
+      config['response_mime_type'] = mime_type
+      config['response_schema'] = response_schema
+
   def _process_single_prompt(self, prompt: str, config: dict) -> ScoredOutput:
     """Process a single prompt.txt and return a ScoredOutput."""
     try:
-      if self.gemini_schema:
-        response_schema = self.gemini_schema.schema_dict
-        mime_type = (
-            'application/json'
-            if self.format_type == data.FormatType.JSON
-            else 'application/yaml'
-        )
-        config['response_mime_type'] = mime_type
-        config['response_schema'] = response_schema
+      self._add_schema(config)
 
-      response = self._client.models.generate_content(
-          model=self.model_id, contents=prompt, config=config
-      )
+      def request():
+        with self._rate_limited(prompt):
+          return self._client.models.generate_content(
+              model=self.model_id, contents=prompt, config=config
+          )
+
+      response = self._hedged(request)
 
       return ScoredOutput(score=1.0, output=response.text)
 
     except Exception as e:
       raise InferenceOutputError(f'Gemini API error: {str(e)}') from e
 
+  @override
+  def infer_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+    config = self._generation_config(**kwargs)
+    self._add_schema(config)
+
+    def pieces() -> Iterator[str]:
+      for response in self._client.models.generate_content_stream(
+          model=self.model_id, contents=prompt, config=config
+      ):
+        if response.text:
+          yield response.text
+
+    try:
+      yield from self._rate_limited_stream(prompt, pieces())
+    except Exception as e:
+      raise InferenceOutputError(f'Gemini API error: {str(e)}') from e
+
+  def _generation_config(self, **kwargs) -> dict[str, Any]:
+    """Returns the generation config for inference `kwargs`."""
+    config = {
+        'temperature': kwargs.get('temperature', self.temperature),
+    }
+    if 'max_output_tokens' in kwargs:
+      config['max_output_tokens'] = kwargs['max_output_tokens']
+    if 'top_p' in kwargs:
+      config['top_p'] = kwargs['top_p']
+    if 'top_k' in kwargs:
+      config['top_k'] = kwargs['top_k']
+    return config
+
+  @override
+  def infer_isolated(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[ScoredOutput] | Exception]:
+    config = self._generation_config(**kwargs)
+    return _process_prompts_isolated(
+        lambda prompt: self._process_single_prompt(prompt, config.copy()),
+        batch_prompts,
+        self.max_workers,
+    )
+
   def infer(
       self, batch_prompts: Sequence[str], **kwargs
   ) -> Iterator[Sequence[ScoredOutput]]:
@@ -345,15 +725,7 @@ class GeminiLanguageModel(BaseLanguageModel):
     Yields:
       Lists of ScoredOutputs.
     """
-    config = {
-        'temperature': kwargs.get('temperature', self.temperature),
-    }
-    if 'max_output_tokens' in kwargs:
-      config['max_output_tokens'] = kwargs['max_output_tokens']
-    if 'top_p' in kwargs:
-      config['top_p'] = kwargs['top_p']
-    if 'top_k' in kwargs:
-      config['top_k'] = kwargs['top_k']
+    config = self._generation_config(**kwargs)
 
     # Use parallel processing for batches larger than 1
     if len(batch_prompts) > 1 and self.max_workers > 1:
@@ -431,6 +803,8 @@ class OpenAILanguageModel(BaseLanguageModel):
       format_type: data.FormatType = data.FormatType.JSON,
       temperature: float = 0.0,
       max_workers: int = 10,
+      rate_limiter: rate_limit.RateLimiter | None = None,
+      hedging_policy: hedging.HedgingPolicy | None = None,
       **kwargs,
   ) -> None:
     """Initialize the OpenAI language model.
@@ -443,6 +817,10 @@ class OpenAILanguageModel(BaseLanguageModel):
       format_type: Output format (JSON or YAML).
       temperature: Sampling temperature.
       max_workers: Maximum number of parallel API calls.
+      rate_limiter: Optional limiter shared by all models of the endpoint.
+        Its adaptive concurrency limit may hold calls below max_workers.
+      hedging_policy: Optional policy for re-sending calls that are slower
+        than most, so that one straggler does not hold up a batch.
       **kwargs: Ignored extra parameters so callers can pass a superset of
         arguments shared across back-ends without raising ``TypeError``.
     """
@@ -454,6 +832,8 @@ class OpenAILanguageModel(BaseLanguageModel):
     self.temperature = temperature
     self.max_workers = max_workers
     self._extra_kwargs = kwargs or {}
+    self._rate_limiter = rate_limiter
+    self._hedging_policy = hedging_policy
 
     if not self.api_key:
       raise ValueError('API key not provided.')
@@ -469,32 +849,78 @@ class OpenAILanguageModel(BaseLanguageModel):
         constraint=schema.Constraint(constraint_type=schema.ConstraintType.NONE)
     )
 
+  @override
+  def cache_key_fields(self) -> dict[str, Any]:
+    return {
+        'class': type(self).__name__,
+        'model_id': self.model_id,
+        'base_url': self.base_url,
+        'format_type': self.format_type,
+        'temperature': self.temperature,
+    }
+
+  @override
+  def close(self) -> None:
+    if self._client is not None:
+      self._client.close()
+
+  def _create_completion(self, prompt: str, config: dict, **kwargs) -> Any:
+    """Sends a chat completion request for `prompt`.
+
+    Args:
+      prompt: The user message.
+      config: Generation config from `_generation_config`.
+      **kwargs: Additional arguments for the client, e.g. `stream`.
+
+    Returns:
+      The completion, or a stream of completion chunks.
+    """
+    # Prepare the system message for structured output
+    system_message = ''
+    if self.format_type == data.FormatType.JSON:
+      system_message = (
+          'You are a helpful assistant that responds in JSON format.'
+      )
+    elif self.format_type == data.FormatType.YAML:
+      system_message = (
+          'You are a helpful assistant that responds in YAML format.'
+      )
+
+    # Requests with the same prefix share a cache key, so they are routed to
+    # the servers that already hold that prefix in their prompt cache. It is
+    # sent in the body, as SDK versions before the parameter reject it as a
+    # keyword argument.
+    prefix = self._prompt_prefix(prompt)
+    if prefix is not None:
+      extra_body = dict(kwargs.pop('extra_body', None) or {})
+      extra_body.setdefault(
+          'prompt_cache_key',
+          hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:16],
+      )
+      kwargs['extra_body'] = extra_body
+
+    # Create the chat completion using the v1.x client API
+    return self._client.chat.completions.create(
+        model=self.model_id,
+        messages=[
+            {'role': 'system', 'content': system_message},
+            {'role': 'user', 'content': prompt},
+        ],
+        temperature=config.get('temperature', self.temperature),
+        max_tokens=config.get('max_output_tokens'),
+        top_p=config.get('top_p'),
+        n=1,
+        **kwargs,
+    )
+
   def _process_single_prompt(self, prompt: str, config: dict) -> ScoredOutput:
     """Process a single prompt.txt and return a ScoredOutput."""
     try:
-      # Prepare the system message for structured output
-      system_message = ''
-      if self.format_type == data.FormatType.JSON:
-        system_message = (
-            'You are a helpful assistant that responds in JSON format.'
-        )
-      elif self.format_type == data.FormatType.YAML:
-        system_message = (
-            'You are a helpful assistant that responds in YAML format.'
-        )
+      def request():
+        with self._rate_limited(prompt):
+          return self._create_completion(prompt, config)
 
-      # Create the chat completion using the v1.x client API
-      response = self._client.chat.completions.create(
-          model=self.model_id,
-          messages=[
-              {'role': 'system', 'content': system_message},
-              {'role': 'user', 'content': prompt},
-          ],
-          temperature=config.get('temperature', self.temperature),
-          max_tokens=config.get('max_output_tokens'),
-          top_p=config.get('top_p'),
-          n=1,
-      )
+      response = self._hedged(request)
 
       # Extract the response text using the v1.x response format
       output_text = response.choices[0].message.content
@@ -504,6 +930,43 @@ class OpenAILanguageModel(BaseLanguageModel):
     except Exception as e:
       raise InferenceOutputError(f'OpenAI API error: {str(e)}') from e
 
+  @override
+  def infer_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+    config = self._generation_config(**kwargs)
+
+    def pieces() -> Iterator[str]:
+      with self._create_completion(prompt, config, stream=True) as stream:
+        for chunk in stream:
+          if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+    try:
+      yield from self._rate_limited_stream(prompt, pieces())
+    except Exception as e:
+      raise InferenceOutputError(f'OpenAI API error: {str(e)}') from e
+
+  def _generation_config(self, **kwargs) -> dict[str, Any]:
+    """Returns the generation config for inference `kwargs`."""
+    config = {
+        'temperature': kwargs.get('temperature', self.temperature),
+    }
+    if 'max_output_tokens' in kwargs:
+      config['max_output_tokens'] = kwargs['max_output_tokens']
+    if 'top_p' in kwargs:
+      config['top_p'] = kwargs['top_p']
+    return config
+
+  @override
+  def infer_isolated(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[ScoredOutput] | Exception]:
+    config = self._generation_config(**kwargs)
+    return _process_prompts_isolated(
+        lambda prompt: self._process_single_prompt(prompt, config.copy()),
+        batch_prompts,
+        self.max_workers,
+    )
+
   def infer(
       self, batch_prompts: Sequence[str], **kwargs
   ) -> Iterator[Sequence[ScoredOutput]]:
@@ -516,13 +979,7 @@ class OpenAILanguageModel(BaseLanguageModel):
     Yields:
       Lists of ScoredOutputs.
     """
-    config = {
-        'temperature': kwargs.get('temperature', self.temperature),
-    }
-    if 'max_output_tokens' in kwargs:
-      config['max_output_tokens'] = kwargs['max_output_tokens']
-    if 'top_p' in kwargs:
-      config['top_p'] = kwargs['top_p']
+    config = self._generation_config(**kwargs)
 
     # Use parallel processing for batches larger than 1
     if len(batch_prompts) > 1 and self.max_workers > 1:
@@ -586,12 +1043,20 @@ class CustomAPIModel(BaseLanguageModel):
   api_url: str = ""
   format_type: data.FormatType = data.FormatType.JSON
   temperature: float = 0.0
+  max_workers: int = 10
+  explicit_prompt_cache: bool = False
   _extra_kwargs: dict[str, Any] = dataclasses.field(
     default_factory=dict, repr=False, compare=False
   )
   _platform_type: str = dataclasses.field(
     default="unknown", repr=False, compare=False
   )
+  _http_pool: http_pool.HttpPool | None = dataclasses.field(
+    default=None, repr=False, compare=False
+  )
+  _async_http_pool: http_pool.AsyncHttpPool | None = dataclasses.field(
+    default=None, repr=False, compare=False
+  )
 
   def __init__(
           self,
@@ -601,6 +1066,13 @@ class CustomAPIModel(BaseLanguageModel):
           format_type: data.FormatType = data.FormatType.JSON,
           temperature: float = 0.0,
           constraint: schema.Constraint = schema.Constraint(),
+          max_workers: int = 10,
+          connect_timeout: float = http_pool.DEFAULT_CONNECT_TIMEOUT_SECONDS,
+          read_timeout: float = http_pool.DEFAULT_READ_TIMEOUT_SECONDS,
+          http2: bool = False,
+          rate_limiter: rate_limit.RateLimiter | None = None,
+          hedging_policy: hedging.HedgingPolicy | None = None,
+          explicit_prompt_cache: bool = False,
           **kwargs,
   ) -> None:
     """Initialize the custom language model.
@@ -612,6 +1084,22 @@ class CustomAPIModel(BaseLanguageModel):
       format_type: The format for model output (JSON or YAML).
       temperature: Sampling temperature for generation.
       constraint: Constraints for model output.
+      max_workers: Maximum number of parallel API calls. Also sizes the
+        connection pool shared by those calls.
+      connect_timeout: Seconds to wait for a connection to the endpoint.
+      read_timeout: Seconds to wait for the endpoint to respond.
+      http2: Whether to use HTTP/2 when the optional dependencies are
+        installed.
+      rate_limiter: Optional limiter shared by all models of the endpoint,
+        e.g. `rate_limit.get_rate_limiter(api_url, ...)`. Its adaptive
+        concurrency limit may hold calls below max_workers.
+      hedging_policy: Optional policy for re-sending calls that are slower
+        than most, e.g. long-context requests stuck behind a busy replica, so
+        that one straggler does not hold up a batch.
+      explicit_prompt_cache: Whether to mark the registered prompt prefix of
+        each request with `cache_control`, for endpoints that only cache
+        prompts on request (e.g. Qwen models on Bailian). Endpoints that cache
+        automatically need no marker.
       **kwargs: Additional arguments.
     """
     self.model_id = model_id
@@ -619,7 +1107,11 @@ class CustomAPIModel(BaseLanguageModel):
     self.api_url = api_url
     self.format_type = format_type
     self.temperature = temperature
+    self.max_workers = max_workers
+    self.explicit_prompt_cache = explicit_prompt_cache
     self._extra_kwargs = kwargs or {}
+    self._rate_limiter = rate_limiter
+    self._hedging_policy = hedging_policy
 
     if not self.api_key:
       raise ValueError(
@@ -630,8 +1122,58 @@ class CustomAPIModel(BaseLanguageModel):
     # 自动识别平台类型
     self._platform_type = self._detect_platform()
 
+    # One pool for all calls so connections are kept alive and reused.
+    self._http_pool_options = {
+      "pool_size": self.max_workers,
+      "connect_timeout": connect_timeout,
+      "read_timeout": read_timeout,
+      "http2": http2,
+    }
+    self._http_pool = http_pool.HttpPool(**self._http_pool_options)
+    # Created on first use by infer_async, since it is bound to an event loop.
+    self._async_http_pool = None
+    self._async_http_pool_loop = None
+
     super().__init__(constraint=constraint)
 
+  def cache_key_fields(self) -> dict[str, Any]:
+    """Return the settings that determine the model output."""
+    return {
+      "class": type(self).__name__,
+      "model_id": self.model_id,
+      "api_url": self.api_url,
+      "format_type": self.format_type,
+      "temperature": self.temperature,
+      "extra_kwargs": self._extra_kwargs,
+    }
+
+  def close(self) -> None:
+    """Close the pooled connections to the API endpoint."""
+    if self._http_pool is not None:
+      self._http_pool.close()
+
+  async def aclose(self) -> None:
+    """Close the synchronous and asyncio connection pools."""
+    if (
+        self._async_http_pool is not None
+        and self._async_http_pool_loop is asyncio.get_running_loop()
+    ):
+      await self._async_http_pool.close()
+    self._async_http_pool = None
+    self._async_http_pool_loop = None
+    self.close()
+
+  def _get_async_http_pool(self) -> http_pool.AsyncHttpPool:
+    """Return the asyncio pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    if self._async_http_pool is None or self._async_http_pool_loop is not loop:
+      # A pool left over from a finished loop cannot be reused or closed.
+      self._async_http_pool = http_pool.AsyncHttpPool(
+          **self._http_pool_options
+      )
+      self._async_http_pool_loop = loop
+    return self._async_http_pool
+
   def _detect_platform(self) -> str:
     """Detect the platform type based on the API URL."""
     if "dashscope.aliyuncs.com" in self.api_url:
@@ -645,15 +1187,31 @@ class CustomAPIModel(BaseLanguageModel):
     else:
       return "unknown"
 
+  def _user_content(self, prompt: str) -> str | list[dict[str, Any]]:
+    """Build the user message content, marking a cacheable prefix if asked."""
+    prefix = self._prompt_prefix(prompt) if self.explicit_prompt_cache else None
+    if prefix is None:
+      return prompt
+    # 前缀（任务描述与示例）单独成段并标记为可缓存
+    return [
+      {
+        "type": "text",
+        "text": prefix,
+        "cache_control": {"type": "ephemeral"},
+      },
+      {"type": "text", "text": prompt[len(prefix):]},
+    ]
+
   def _prepare_payload(self, prompt: str, **kwargs) -> dict[str, Any]:
     """Prepare the payload for the API request."""
+    content = self._user_content(prompt)
     # 根据平台类型准备不同的请求体
     if self._platform_type == "dashscope":
       config = {
         "model": self.model_id,
         "input": {
           "messages": [
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": content}
           ]
         },
         "parameters": {
@@ -666,7 +1224,7 @@ class CustomAPIModel(BaseLanguageModel):
       config = {
         "model": self.model_id,
         "messages": [
-          {"role": "user", "content": prompt}
+          {"role": "user", "content": content}
         ],
         "temperature": kwargs.get("temperature", self.temperature),
       }
@@ -681,49 +1239,115 @@ class CustomAPIModel(BaseLanguageModel):
 
     return config
 
-  def _make_api_call(self, payload: dict[str, Any]) -> str:
-    """Make an API call to the custom model endpoint."""
+  def _request_headers(self) -> dict[str, str]:
+    """Build the request headers for the API endpoint."""
     # 根据平台类型设置不同的请求头
     if self._platform_type == "dashscope":
-      headers = {
+      return {
         "X-DashScope-API-Key": self.api_key,
         "Content-Type": "application/json",
         "Accept": "application/json",
       }
+    # 通用OpenAI兼容格式
+    return {
+      "Authorization": f"Bearer {self.api_key}",
+      "Content-Type": "application/json",
+    }
+
+  def _parse_api_result(self, result: Any) -> str:
+    """Extract the generated text from a decoded API response."""
+    # 根据平台类型解析响应
+    if self._platform_type == "dashscope":
+      # 阿里云百炼平台响应格式
+      if "output" in result and "choices" in result["output"]:
+        return result["output"]["choices"][0]["message"]["content"]
+      elif "output" in result and "text" in result["output"]:
+        return result["output"]["text"]
+      else:
+        raise ValueError("Unexpected response format from DashScope API")
     else:
       # 通用OpenAI兼容格式
-      headers = {
-        "Authorization": f"Bearer {self.api_key}",
-        "Content-Type": "application/json",
-      }
+      if "choices" in result:
+        return result["choices"][0]["message"]["content"]
+      else:
+        # Try to get result directly
+        return str(result)
 
+  def _make_api_call(self, payload: dict[str, Any]) -> str:
+    """Make an API call to the custom model endpoint."""
     try:
-      response = requests.post(
+      response = self._http_pool.post(
         self.api_url,
-        headers=headers,
+        headers=self._request_headers(),
         json=payload,
-        timeout=120,
       )
       response.raise_for_status()
-      result = response.json()
-
-      # 根据平台类型解析响应
-      if self._platform_type == "dashscope":
-        # 阿里云百炼平台响应格式
-        if "output" in result and "choices" in result["output"]:
-          return result["output"]["choices"][0]["message"]["content"]
-        elif "output" in result and "text" in result["output"]:
-          return result["output"]["text"]
-        else:
-          raise ValueError("Unexpected response format from DashScope API")
-      else:
-        # 通用OpenAI兼容格式
-        if "choices" in result:
-          return result["choices"][0]["message"]["content"]
-        else:
-          # Try to get result directly
-          return str(result)
+      return self._parse_api_result(response.json())
+    except requests.exceptions.RequestException as e:
+      raise ValueError(f"API call failed: {str(e)}") from e
+    except (KeyError, IndexError) as e:
+      raise ValueError(f"Failed to parse API response: {str(e)}") from e
 
+  def _parse_stream_event(self, event: Any) -> str:
+    """Extract the next piece of generated text from a decoded stream event."""
+    if self._platform_type == "dashscope":
+      # 开启 incremental_output 后每个事件只包含新增的文本
+      output = event["output"]
+      if "choices" in output:
+        return output["choices"][0]["message"]["content"] or ""
+      return output.get("text") or ""
+    # 通用OpenAI兼容格式，最后一个事件可能只包含 usage
+    if not event.get("choices"):
+      return ""
+    return event["choices"][0].get("delta", {}).get("content") or ""
+
+  def _stream_api_call(self, payload: dict[str, Any]) -> Iterator[str]:
+    """Stream the generated text from the custom model endpoint.
+
+    The endpoint is asked for server-sent events, each of which holds the
+    next piece of the output.
+    """
+    headers = self._request_headers()
+    if self._platform_type == "dashscope":
+      headers["X-DashScope-SSE"] = "enable"
+      payload = dict(
+        payload,
+        parameters=dict(payload["parameters"], incremental_output=True),
+      )
+    else:
+      payload = dict(payload, stream=True)
+    try:
+      response = self._http_pool.post(
+        self.api_url, headers=headers, json=payload, stream=True
+      )
+      try:
+        response.raise_for_status()
+        for line in response.iter_lines():
+          if not line.startswith(b"data:"):
+            continue
+          event = line[len(b"data:"):].strip()
+          if event == b"[DONE]":
+            break
+          piece = self._parse_stream_event(json.loads(event))
+          if piece:
+            yield piece
+      finally:
+        response.close()
+    except requests.exceptions.RequestException as e:
+      raise ValueError(f"API call failed: {str(e)}") from e
+    except (KeyError, IndexError) as e:
+      raise ValueError(f"Failed to parse API response: {str(e)}") from e
+
+  async def _make_api_call_async(self, payload: dict[str, Any]) -> str:
+    """Make an API call to the custom model endpoint on the event loop."""
+    try:
+      response = await self._get_async_http_pool().post(
+        self.api_url,
+        headers=self._request_headers(),
+        json=payload,
+      )
+      response.raise_for_status()
+      return self._parse_api_result(response.json())
     except requests.exceptions.RequestException as e:
       raise ValueError(f"API call failed: {str(e)}") from e
     except (KeyError, IndexError) as e:
@@ -734,6 +1358,9 @@ class CustomAPIModel(BaseLanguageModel):
   ) -> Iterator[Sequence[ScoredOutput]]:
     """Perform inference on a batch of prompts.
 
+    Prompts are sent concurrently on up to `max_workers` threads; outputs are
+    yielded in prompt order.
+
     Args:
       batch_prompts: A list of string prompts.
       **kwargs: Additional generation parameters.
@@ -741,15 +1368,111 @@ class CustomAPIModel(BaseLanguageModel):
     Yields:
       Lists of ScoredOutputs.
     """
-    for prompt in batch_prompts:
-      try:
-        payload = self._prepare_payload(prompt, **kwargs)
-        output = self._make_api_call(payload)
-        yield [ScoredOutput(score=1.0, output=output)]
-      except Exception as e:
-        raise InferenceOutputError(
-          f"Failed to get response for prompt '{prompt[:50]}...': {str(e)}"
-        ) from e
+    # Use parallel processing for batches larger than 1
+    if len(batch_prompts) > 1 and self.max_workers > 1:
+      with concurrent.futures.ThreadPoolExecutor(
+          max_workers=min(self.max_workers, len(batch_prompts))
+      ) as executor:
+        future_to_index = {
+            executor.submit(self._process_single_prompt, prompt, **kwargs): i
+            for i, prompt in enumerate(batch_prompts)
+        }
+
+        results: list[ScoredOutput | None] = [None] * len(batch_prompts)
+        for future in concurrent.futures.as_completed(future_to_index):
+          index = future_to_index[future]
+          try:
+            results[index] = future.result()
+          except Exception as e:
+            raise InferenceOutputError(
+                f"Parallel inference error: {str(e)}"
+            ) from e
+
+        for result in results:
+          if result is None:
+            raise InferenceOutputError("Failed to process one or more prompts")
+          yield [result]
+    else:
+      # Sequential processing for single prompt.txt or worker
+      for prompt in batch_prompts:
+        yield [self._process_single_prompt(prompt, **kwargs)]
+
+  @override
+  def infer_isolated(
+          self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[ScoredOutput] | Exception]:
+    return _process_prompts_isolated(
+        lambda prompt: self._process_single_prompt(prompt, **kwargs),
+        batch_prompts,
+        self.max_workers,
+    )
+
+  def _process_single_prompt(self, prompt: str, **kwargs) -> ScoredOutput:
+    """Process a single prompt.txt and return a ScoredOutput."""
+    try:
+      payload = self._prepare_payload(prompt, **kwargs)
+
+      def request() -> str:
+        with self._rate_limited(prompt):
+          return self._make_api_call(payload)
+
+      output = self._hedged(request)
+      return ScoredOutput(score=1.0, output=output)
+    except Exception as e:
+      raise InferenceOutputError(
+        f"Failed to get response for prompt '{prompt[:50]}...': {str(e)}"
+      ) from e
+
+  @override
+  def infer_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+    try:
+      payload = self._prepare_payload(prompt, **kwargs)
+      yield from self._rate_limited_stream(
+        prompt, self._stream_api_call(payload)
+      )
+    except Exception as e:
+      raise InferenceOutputError(
+        f"Failed to get response for prompt '{prompt[:50]}...': {str(e)}"
+      ) from e
+
+  async def infer_async(
+          self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[ScoredOutput]]:
+    """Perform inference on a batch of prompts on the event loop.
+
+    All prompts are sent at once over a pool of `max_workers` connections;
+    requests beyond that wait for a free connection.
+
+    Args:
+      batch_prompts: A list of string prompts.
+      **kwargs: Additional generation parameters.
+
+    Returns:
+      Lists of ScoredOutputs, in prompt order.
+    """
+    results = await asyncio.gather(*(
+        self._process_single_prompt_async(prompt, **kwargs)
+        for prompt in batch_prompts
+    ))
+    return [[result] for result in results]
+
+  async def _process_single_prompt_async(
+          self, prompt: str, **kwargs
+  ) -> ScoredOutput:
+    """Process a single prompt.txt on the event loop."""
+    try:
+      payload = self._prepare_payload(prompt, **kwargs)
+
+      async def request() -> str:
+        async with self._rate_limited_async(prompt):
+          return await self._make_api_call_async(payload)
+
+      output = await self._hedged_async(request)
+      return ScoredOutput(score=1.0, output=output)
+    except Exception as e:
+      raise InferenceOutputError(
+        f"Failed to get response for prompt '{prompt[:50]}...': {str(e)}"
+      ) from e
 
   def parse_output(self, output: str) -> Any:
     """Parse model output as JSON or YAML.
@@ -27,6 +27,7 @@ import requests
 from langextract import data
 from langextract import data_lib
 from langextract import exceptions
+from langextract import http_pool as http_pool_lib
 from langextract import progress
 
 DEFAULT_TIMEOUT_SECONDS = 30
@@ -234,6 +235,7 @@ def download_text_from_url(
     timeout: int = DEFAULT_TIMEOUT_SECONDS,
     show_progress: bool = True,
     chunk_size: int = 8192,
+    http_pool: http_pool_lib.HttpPool | None = None,
 ) -> str:
   """Download text content from a URL with optional progress bar.
 
@@ -242,6 +244,8 @@ def download_text_from_url(
     timeout: Request timeout in seconds.
     show_progress: Whether to show a progress bar during download.
     chunk_size: Size of chunks to download at a time.
+    http_pool: Pool to download through, so repeated downloads reuse open
+      connections. If None, a single-use pool is created and closed.
 
   Returns:
     The text content of the URL.
@@ -250,9 +254,12 @@ def download_text_from_url(
     requests.RequestException: If the download fails.
     ValueError: If the content is not text-based.
   """
+  pool = http_pool or http_pool_lib.HttpPool(
+      pool_size=1, connect_timeout=timeout, read_timeout=timeout
+  )
   try:
     # Make initial request to get headers
-    response = requests.get(url, stream=True, timeout=timeout)
+    response = pool.get(url, stream=True, timeout=timeout)
     response.raise_for_status()
 
     # Check content type
@@ -316,3 +323,6 @@ def download_text_from_url(
     raise requests.RequestException(
         f'Failed to download from {url}: {str(e)}'
     ) from e
+  finally:
+    if http_pool is None:
+      pool.close()
@@ -0,0 +1,512 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Spreads inference over several endpoints or API keys.
+
+A `LoadBalancedLanguageModel` is a language model backed by a pool of
+interchangeable models, e.g. one per API key or per OpenAI-compatible server.
+Each batch is split between the backends, which run their shares
+concurrently, so throughput grows with the number of backends instead of
+being capped by one quota. A prompt that fails on one backend is retried on
+another, and a backend that keeps failing is ejected from the pool for a
+while.
+
+Example usage:
+  model = load_balancing.LoadBalancedLanguageModel([
+      inference.CustomAPIModel(model_id='qwen-plus', api_key=key_1, ...),
+      inference.CustomAPIModel(model_id='qwen-plus', api_key=key_2, ...),
+      load_balancing.Backend(vllm_model, weight=2.0),
+  ])
+  result = lx.extract(..., language_model=model)
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator, Sequence
+import concurrent.futures
+import dataclasses
+import enum
+import threading
+import time
+from typing import Any
+
+from absl import logging
+
+from langextract import hedging
+from langextract import inference
+
+
+class Strategy(enum.Enum):
+  """How prompts are assigned to backends."""
+
+  # Smooth weighted round-robin: backends get prompts in proportion to their
+  # weights, interleaved rather than in runs.
+  WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+  # The backend with the fewest prompts in flight per unit of weight.
+  LEAST_OUTSTANDING = "least_outstanding"
+
+
+@dataclasses.dataclass
+class BackendStats:
+  """Counters for one backend of a `LoadBalancedLanguageModel`.
+
+  Attributes:
+    requests: Prompts sent to the backend.
+    failures: Prompts the backend failed.
+    failovers: Prompts retried on this backend after failing on another.
+    ejections: Times the backend was taken out of the pool.
+  """
+
+  requests: int = 0
+  failures: int = 0
+  failovers: int = 0
+  ejections: int = 0
+
+
+@dataclasses.dataclass(eq=False)
+class Backend:
+  """A model in the pool of a `LoadBalancedLanguageModel`.
+
+  Attributes:
+    model: The language model.
+    weight: Relative share of prompts, e.g. the endpoint's quota or capacity.
+    name: Name used in logs. Defaults to the model's ID and position in the
+      pool.
+    stats: Counters for the backend.
+    outstanding: Prompts sent to the backend that have not completed.
+    consecutive_failures: Failures since the backend last succeeded.
+    ejected_until: `time.monotonic()` time at which an ejected backend
+      returns to the pool.
+  """
+
+  model: inference.BaseLanguageModel
+  weight: float = 1.0
+  name: str | None = None
+  stats: BackendStats = dataclasses.field(default_factory=BackendStats)
+  outstanding: int = dataclasses.field(default=0, init=False)
+  consecutive_failures: int = dataclasses.field(default=0, init=False)
+  ejected_until: float = dataclasses.field(default=0.0, init=False)
+  # Running total of smooth weighted round-robin.
+  current_weight: float = dataclasses.field(
+      default=0.0, init=False, repr=False
+  )
+
+  def __post_init__(self):
+    if self.weight <= 0:
+      raise ValueError("Backend weight must be positive.")
+
+  def ejected(self, now: float | None = None) -> bool:
+    """Returns whether the backend is currently out of the pool."""
+    return (time.monotonic() if now is None else now) < self.ejected_until
+
+
+class LoadBalancedLanguageModel(inference.BaseLanguageModel):
+  """Fans prompts out across a pool of interchangeable language models.
+
+  The backends should be configured alike (model, temperature, output
+  format), since any of them may answer any prompt. Each batch is shared
+  between the backends, so batches should hold at least as many prompts as
+  the backends have workers in total.
+  """
+
+  def __init__(
+      self,
+      backends: Sequence[inference.BaseLanguageModel | Backend],
+      strategy: Strategy = Strategy.LEAST_OUTSTANDING,
+      max_failovers: int | None = None,
+      failure_threshold: int = 3,
+      ejection_seconds: float = 30.0,
+      hedging_policy: hedging.HedgingPolicy | None = None,
+  ):
+    """Initializes the pool.
+
+    Args:
+      backends: Models, or `Backend`s to set weights or names.
+      strategy: How prompts are assigned to backends.
+      max_failovers: How many other backends a failed prompt is retried on.
+        Defaults to all of them.
+      failure_threshold: Consecutive failures after which a backend is
+        ejected. An ejected backend that fails again on its return is ejected
+        again at once.
+      ejection_seconds: How long an ejected backend receives no prompts,
+        unless every backend is ejected.
+      hedging_policy: Optional policy for duplicating slow prompts. The
+        duplicate goes to another backend when there is one. Prompts are then
+        sent one per call rather than in shares.
+    """
+    if not backends:
+      raise ValueError("At least one backend is required.")
+    if failure_threshold < 1:
+      raise ValueError("failure_threshold must be at least 1.")
+    self.backends = [
+        backend if isinstance(backend, Backend) else Backend(backend)
+        for backend in backends
+    ]
+    for index, backend in enumerate(self.backends):
+      if backend.name is None:
+        model_id = getattr(backend.model, "model_id", None)
+        backend.name = f"{model_id or type(backend.model).__name__}#{index}"
+    self.strategy = strategy
+    self.max_failovers = (
+        len(self.backends) - 1 if max_failovers is None else max_failovers
+    )
+    self.failure_threshold = failure_threshold
+    self.ejection_seconds = ejection_seconds
+    self.hedging_policy = hedging_policy
+    self._lock = threading.Lock()
+    super().__init__(
+        constraint=self.backends[0].model._constraint  # pylint: disable=protected-access
+    )
+
+  @property
+  def model_id(self) -> str | None:
+    return getattr(self.backends[0].model, "model_id", None)
+
+  def cache_key_fields(self) -> dict[str, Any]:
+    return {
+        "class": type(self).__name__,
+        "backends": [
+            backend.model.cache_key_fields() for backend in self.backends
+        ],
+    }
+
+  def _acquire(self, tried: set[int]) -> int | None:
+    """Picks a backend not in `tried` and counts a prompt as outstanding on it.
+
+    Returns:
+      The backend's index, or None if every backend has been tried.
+    """
+    now = time.monotonic()
+    with self._lock:
+      untried = [i for i in range(len(self.backends)) if i not in tried]
+      if not untried:
+        return None
+      candidates = [i for i in untried if not self.backends[i].ejected(now)]
+      if not candidates:
+        # Rather than failing, use the backend that returns soonest.
+        candidates = [
+            min(untried, key=lambda i: self.backends[i].ejected_until)
+        ]
+      if self.strategy is Strategy.WEIGHTED_ROUND_ROBIN:
+        index = self._next_round_robin(candidates)
+      else:
+        index = min(
+            candidates,
+            key=lambda i: self.backends[i].outstanding / self.backends[i].weight,
+        )
+      backend = self.backends[index]
+      backend.outstanding += 1
+      backend.stats.requests += 1
+      if tried:
+        backend.stats.failovers += 1
+      return index
+
+  def _next_round_robin(self, candidates: Sequence[int]) -> int:
+    total_weight = 0.0
+    for i in candidates:
+      self.backends[i].current_weight += self.backends[i].weight
+      total_weight += self.backends[i].weight
+    index = max(candidates, key=lambda i: self.backends[i].current_weight)
+    self.backends[index].current_weight -= total_weight
+    return index
+
+  def _release(
+      self, index: int, error: Exception | None, cancelled: bool = False
+  ) -> None:
+    """Records the outcome of a prompt and ejects a failing backend."""
+    backend = self.backends[index]
+    with self._lock:
+      backend.outstanding -= 1
+      if cancelled:
+        return
+      if error is None:
+        backend.consecutive_failures = 0
+        return
+      backend.stats.failures += 1
+      backend.consecutive_failures += 1
+      if (
+          backend.consecutive_failures >= self.failure_threshold
+          and not backend.ejected()
+      ):
+        backend.ejected_until = time.monotonic() + self.ejection_seconds
+        backend.stats.ejections += 1
+        logging.warning(
+            "Ejecting backend %s for %.0fs after %d consecutive failures: %s",
+            backend.name,
+            self.ejection_seconds,
+            backend.consecutive_failures,
+            error,
+        )
+
+  def _can_fail_over(self, tried: set[int]) -> bool:
+    return len(tried) <= self.max_failovers and len(tried) < len(
+        self.backends
+    )
+
+  def _infer_on_backend(
+      self, index: int, prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[inference.ScoredOutput] | Exception]:
+    try:
+      outputs = self.backends[index].model.infer_isolated(prompts, **kwargs)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      outputs = [e] * len(prompts)
+    for output in outputs:
+      self._release(index, output if isinstance(output, Exception) else None)
+    return outputs
+
+  def infer_isolated(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[inference.ScoredOutput] | Exception]:
+    """Runs inference across the pool, failing prompts over to other backends.
+
+    Each backend receives its share of the batch in one call, and the shares
+    run concurrently.
+
+    Args:
+      batch_prompts: Batch of inputs for inference.
+      **kwargs: Additional arguments for inference, passed to every backend.
+
+    Returns:
+      One sequence of scored outputs, or the last backend's exception, per
+      prompt, in prompt order.
+    """
+    results: list[Sequence[inference.ScoredOutput] | Exception | None] = [
+        None
+    ] * len(batch_prompts)
+    tried: list[set[int]] = [set() for _ in batch_prompts]
+    pending = list(range(len(batch_prompts)))
+    while pending:
+      if self.hedging_policy is None:
+        attempts = self._infer_shares(batch_prompts, pending, tried, **kwargs)
+      else:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(pending)
+        ) as executor:
+          attempts = list(
+              executor.map(
+                  lambda i: (
+                      i,
+                      *self._infer_prompt_hedged(
+                          batch_prompts[i], tried[i], **kwargs
+                      ),
+                  ),
+                  pending,
+              )
+          )
+
+      pending = []
+      for i, index, outputs in attempts:
+        results[i] = outputs
+        if isinstance(outputs, Exception):
+          tried[i].add(index)
+          if self._can_fail_over(tried[i]):
+            pending.append(i)
+    return results
+
+  def _infer_shares(
+      self,
+      batch_prompts: Sequence[str],
+      pending: Sequence[int],
+      tried: Sequence[set[int]],
+      **kwargs,
+  ) -> list[tuple[int, int, Sequence[inference.ScoredOutput] | Exception]]:
+    """Sends each backend its share of the pending prompts in one call.
+
+    Returns:
+      The position of each pending prompt in the batch, the backend it was
+      sent to and its outputs or error.
+    """
+    shares: dict[int, list[int]] = {}
+    for i in pending:
+      shares.setdefault(self._acquire(tried[i]), []).append(i)
+
+    def run_share(index: int, share: list[int]):
+      return self._infer_on_backend(
+          index, [batch_prompts[i] for i in share], **kwargs
+      )
+
+    if len(shares) == 1:
+      ((index, share),) = shares.items()
+      share_outputs = {index: run_share(index, share)}
+    else:
+      with concurrent.futures.ThreadPoolExecutor(
+          max_workers=len(shares)
+      ) as executor:
+        futures = {
+            index: executor.submit(run_share, index, share)
+            for index, share in shares.items()
+        }
+        share_outputs = {
+            index: future.result() for index, future in futures.items()
+        }
+    return [
+        (i, index, outputs)
+        for index, share in shares.items()
+        for i, outputs in zip(share, share_outputs[index])
+    ]
+
+  def _infer_prompt(
+      self, index: int, prompt: str, **kwargs
+  ) -> Sequence[inference.ScoredOutput]:
+    """Sends one prompt to an acquired backend, raising its error."""
+    (outputs,) = self._infer_on_backend(index, [prompt], **kwargs)
+    if isinstance(outputs, Exception):
+      raise outputs
+    return outputs
+
+  def _hedge_backend(self, tried: set[int], index: int) -> int:
+    """Acquires a backend for a duplicate, preferring one other than `index`."""
+    hedge_index = self._acquire(tried | {index})
+    return self._acquire(tried) if hedge_index is None else hedge_index
+
+  def _infer_prompt_hedged(
+      self, prompt: str, tried: set[int], **kwargs
+  ) -> tuple[int, Sequence[inference.ScoredOutput] | Exception]:
+    """Sends one prompt, duplicating it to another backend if it is slow.
+
+    Returns:
+      The backend the prompt was first sent to and its outputs or error.
+    """
+    index = self._acquire(tried)
+    try:
+      return index, self.hedging_policy.call(
+          lambda: self._infer_prompt(index, prompt, **kwargs),
+          lambda: self._infer_prompt(
+              self._hedge_backend(tried, index), prompt, **kwargs
+          ),
+      )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      return index, e
+
+  def infer(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> Iterator[Sequence[inference.ScoredOutput]]:
+    """Runs inference across the pool; see `infer_isolated`.
+
+    Raises:
+      InferenceOutputError: If a prompt failed on every backend it was tried
+        on, raised from the last error.
+    """
+    for outputs in self.infer_isolated(batch_prompts, **kwargs):
+      if isinstance(outputs, Exception):
+        raise inference.InferenceOutputError(
+            f"All backends failed: {outputs}"
+        ) from outputs
+      yield outputs
+
+  def infer_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+    """Streams the output for one prompt from a backend of the pool.
+
+    A backend that fails before sending any output is failed over like in
+    `infer_isolated`; once output has been yielded its error is raised. The
+    stream is not hedged.
+
+    Raises:
+      InferenceOutputError: If the prompt failed on every backend it was
+        tried on before any output, raised from the last error.
+    """
+    tried: set[int] = set()
+    while True:
+      index = self._acquire(tried)
+      tried.add(index)
+      started = False
+      try:
+        for piece in self.backends[index].model.infer_stream(prompt, **kwargs):
+          started = True
+          yield piece
+      except GeneratorExit:
+        self._release(index, None, cancelled=True)
+        raise
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        self._release(index, e)
+        if started:
+          raise
+        if not self._can_fail_over(tried):
+          raise inference.InferenceOutputError(
+              f"All backends failed: {e}"
+          ) from e
+        continue
+      self._release(index, None)
+      return
+
+  async def _infer_prompt_async(
+      self, index: int, prompt: str, **kwargs
+  ) -> Sequence[inference.ScoredOutput]:
+    """Sends one prompt to an acquired backend on the event loop."""
+    try:
+      (outputs,) = await self.backends[index].model.infer_async(
+          [prompt], **kwargs
+      )
+    except asyncio.CancelledError:
+      # The other copy of a hedged prompt won.
+      self._release(index, None, cancelled=True)
+      raise
+    except Exception as e:
+      self._release(index, e)
+      raise
+    self._release(index, None)
+    return outputs
+
+  async def _infer_one_async(
+      self, prompt: str, **kwargs
+  ) -> Sequence[inference.ScoredOutput]:
+    tried: set[int] = set()
+    while True:
+      index = self._acquire(tried)
+
+      async def hedge(index: int = index) -> Sequence[inference.ScoredOutput]:
+        # Acquired when the duplicate starts, as it may be cancelled first.
+        return await self._infer_prompt_async(
+            self._hedge_backend(tried, index), prompt, **kwargs
+        )
+
+      try:
+        if self.hedging_policy is None:
+          return await self._infer_prompt_async(index, prompt, **kwargs)
+        return await self.hedging_policy.call_async(
+            lambda: self._infer_prompt_async(index, prompt, **kwargs), hedge
+        )
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        tried.add(index)
+        if not self._can_fail_over(tried):
+          raise inference.InferenceOutputError(
+              f"All backends failed: {e}"
+          ) from e
+
+  async def infer_async(
+      self, batch_prompts: Sequence[str], **kwargs
+  ) -> list[Sequence[inference.ScoredOutput]]:
+    """Runs inference on the event loop, one request per prompt."""
+    return list(
+        await asyncio.gather(
+            *(self._infer_one_async(prompt, **kwargs) for prompt in batch_prompts)
+        )
+    )
+
+  def register_prompt_prefix(self, prefix: str) -> None:
+    for backend in self.backends:
+      backend.model.register_prompt_prefix(prefix)
+
+  def invalidate(self, batch_prompts: Sequence[str], **kwargs) -> None:
+    for backend in self.backends:
+      backend.model.invalidate(batch_prompts, **kwargs)
+
+  def close(self) -> None:
+    for backend in self.backends:
+      backend.model.close()
+
+  async def aclose(self) -> None:
+    for backend in self.backends:
+      await backend.model.aclose()
@@ -14,6 +14,7 @@
 
 """Library for building prompts."""
 
+from collections.abc import Sequence
 import dataclasses
 import json
 import os
@@ -26,6 +27,9 @@ from langextract import data
 from langextract import exceptions
 from langextract import schema
 
+# Distinct additional contexts whose prompt prefixes are kept at a time.
+_MAX_CACHED_PREFIXES = 128
+
 
 class PromptBuilderError(exceptions.LangExtractError):
   """Failure to build prompt.txt."""
@@ -91,6 +95,19 @@ class QAPromptGenerator:
   question_prefix: str = "Q: "
   answer_prefix: str = "A: "
   fence_output: bool = True  # whether to wrap answers in ```json/```yaml fences
+  # Formatted examples and rendered prefixes (by additional context and
+  # example indices), and the settings they were rendered with.
+  _example_texts: list[str] | None = dataclasses.field(
+      default=None, init=False, repr=False, compare=False
+  )
+  _prefixes: dict[tuple[str | None, tuple[int, ...] | None], str] = (
+      dataclasses.field(
+          default_factory=dict, init=False, repr=False, compare=False
+      )
+  )
+  _prefix_settings: tuple | None = dataclasses.field(
+      default=None, init=False, repr=False, compare=False
+  )
 
   def __str__(self) -> str:
     """Returns a string representation of the prompt.txt with an empty question."""
@@ -140,27 +157,101 @@ class QAPromptGenerator:
         f"{self.answer_prefix}{answer}\n",
     ])
 
-  def render(self, question: str, additional_context: str | None = None) -> str:
-    """Generate a text representation of the prompt.txt.
+  def _check_settings(self) -> None:
+    """Drops the rendered text if the template or the settings changed."""
+    settings = (
+        self.template.description,
+        tuple(map(id, self.template.examples)),
+        self.format_type,
+        self.attribute_suffix,
+        self.examples_heading,
+        self.question_prefix,
+        self.answer_prefix,
+        self.fence_output,
+    )
+    if settings != self._prefix_settings:
+      self._example_texts = None
+      self._prefixes = {}
+      self._prefix_settings = settings
+
+  def formatted_examples(self) -> list[str]:
+    """Returns the template's examples as they appear in the prompt.txt."""
+    self._check_settings()
+    if self._example_texts is None:
+      self._example_texts = [
+          self.format_example_as_text(ex) for ex in self.template.examples
+      ]
+    return self._example_texts
+
+  def prefix(
+      self,
+      additional_context: str | None = None,
+      example_indices: Sequence[int] | None = None,
+  ) -> str:
+    """Returns the part of the prompt.txt that precedes the question.
+
+    The description, additional context and examples are the same for every
+    chunk, so they are rendered once per additional context and selection of
+    examples, and reused. They are rendered again when the template's
+    description or examples list or the generator's settings change, but not
+    when an example is modified in place.
 
     Args:
-      question: That will be presented to the model.
-      additional_context: Additional context to include in the prompt.txt. An empty
-        string is ignored.
+      additional_context: Additional context to include in the prompt.txt. An
+        empty string is ignored.
+      example_indices: Indices of the template's examples to include, e.g.
+        from an `example_selection.ExampleSelector`. Defaults to all examples.
 
     Returns:
-      Text prompt.txt with a question to be presented to a language model.
+      The static prefix of every prompt.txt rendered with the same arguments.
     """
+    self._check_settings()
+    key = (
+        additional_context or None,
+        None if example_indices is None else tuple(example_indices),
+    )
+    prefix = self._prefixes.get(key)
+    if prefix is not None:
+      return prefix
+
     prompt_lines: list[str] = [f"{self.template.description}\n"]
 
     if additional_context:
       prompt_lines.append(f"{additional_context}\n")
 
-    if self.template.examples:
+    example_texts = self.formatted_examples()
+    if example_indices is not None:
+      example_texts = [example_texts[i] for i in example_indices]
+    if example_texts:
       prompt_lines.append(self.examples_heading)
-      for ex in self.template.examples:
-        prompt_lines.append(self.format_example_as_text(ex))
+      prompt_lines.extend(example_texts)
+
+    prefix = "\n".join(prompt_lines) + "\n"
+    if len(self._prefixes) >= _MAX_CACHED_PREFIXES:
+      self._prefixes = {}
+    self._prefixes[key] = prefix
+    return prefix
+
+  def render(
+      self,
+      question: str,
+      additional_context: str | None = None,
+      example_indices: Sequence[int] | None = None,
+  ) -> str:
+    """Generate a text representation of the prompt.txt.
 
-    prompt_lines.append(f"{self.question_prefix}{question}")
-    prompt_lines.append(self.answer_prefix)
-    return "\n".join(prompt_lines)
+    Args:
+      question: That will be presented to the model.
+      additional_context: Additional context to include in the prompt.txt. An empty
+        string is ignored.
+      example_indices: Indices of the template's examples to include. Defaults
+        to all examples.
+
+    Returns:
+      Text prompt.txt with a question to be presented to a language model.
+    """
+    return (
+        f"{self.prefix(additional_context, example_indices)}"
+        f"{self.question_prefix}{question}\n"
+        f"{self.answer_prefix}"
+    )
@@ -0,0 +1,445 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Client-side rate limiting and adaptive concurrency for model endpoints.
+
+A `RateLimiter` keeps requests to one endpoint under a requests-per-minute
+and a tokens-per-minute budget (token buckets), and caps the number of
+requests in flight. The cap adapts AIMD-style: it is halved when the endpoint
+rate limits or times out a request, or when latency spikes, and grows by one
+request per round of successes. Threads beyond the cap wait, so the cap is the
+effective `max_workers` of every model sharing the limiter.
+
+All models of the same endpoint should share one limiter, which
+`get_rate_limiter` provides:
+
+  limiter = rate_limit.get_rate_limiter(
+      api_url, requests_per_minute=600, max_concurrency=16
+  )
+  model = inference.CustomAPIModel(..., rate_limiter=limiter)
+  ...
+  print(rate_limit.metrics())
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+from collections.abc import AsyncIterator, Callable, Iterator
+import contextlib
+import dataclasses
+import math
+import threading
+import time
+from typing import Any
+
+from absl import logging
+
+from langextract import retry as retry_lib
+from langextract import tokenizer
+
+# Weight of the newest sample in the moving average of request latency.
+_LATENCY_SMOOTHING = 0.1
+# Successful requests needed before latency spikes are detected.
+_LATENCY_WARMUP_REQUESTS = 10
+
+
+# Kept here for callers that budget tokens per minute.
+estimate_tokens = tokenizer.estimate_tokens
+
+
+class TokenBucket:
+  """A thread-safe token bucket refilled at a constant rate.
+
+  Callers reserve tokens and then wait the returned time. Reservations may
+  overdraw the bucket, so a request larger than the bucket still goes through
+  once the debt is repaid, and waiting callers are served in order.
+  """
+
+  def __init__(self, per_minute: float, capacity: float | None = None):
+    """Initializes a full bucket.
+
+    Args:
+      per_minute: Tokens added per minute.
+      capacity: Maximum tokens held, i.e. the largest burst. Defaults to ten
+        seconds' worth of tokens, and at least one.
+    """
+    if per_minute <= 0:
+      raise ValueError("per_minute must be positive.")
+    self.per_minute = per_minute
+    self.capacity = (
+        capacity if capacity is not None else max(1.0, per_minute / 6)
+    )
+    if self.capacity <= 0:
+      raise ValueError("capacity must be positive.")
+    self._rate = per_minute / 60
+    self._tokens = self.capacity
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def _refill(self, now: float) -> None:
+    self._tokens = min(
+        self.capacity, self._tokens + (now - self._updated) * self._rate
+    )
+    self._updated = now
+
+  def reserve(self, amount: float = 1.0) -> float:
+    """Takes `amount` tokens and returns the seconds to wait before using them."""
+    with self._lock:
+      self._refill(time.monotonic())
+      self._tokens -= amount
+      return max(0.0, -self._tokens / self._rate)
+
+  @property
+  def available(self) -> float:
+    """Tokens that can be taken without waiting; negative when overdrawn."""
+    with self._lock:
+      self._refill(time.monotonic())
+      return self._tokens
+
+
+class _AdaptiveSemaphore:
+  """A semaphore whose limit can change, usable from threads and coroutines."""
+
+  def __init__(self, limit: int):
+    self.limit = limit
+    self.in_flight = 0
+    self._condition = threading.Condition()
+    self._async_waiters: collections.deque[
+        tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]
+    ] = collections.deque()
+
+  def _try_acquire_locked(self) -> bool:
+    if self.in_flight < self.limit:
+      self.in_flight += 1
+      return True
+    return False
+
+  def acquire(self) -> None:
+    with self._condition:
+      while not self._try_acquire_locked():
+        self._condition.wait()
+
+  async def acquire_async(self) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+      with self._condition:
+        if self._try_acquire_locked():
+          return
+        waiter = loop.create_future()
+        self._async_waiters.append((loop, waiter))
+      try:
+        await waiter
+      except asyncio.CancelledError:
+        with self._condition:
+          if (loop, waiter) in self._async_waiters:
+            self._async_waiters.remove((loop, waiter))
+          else:
+            # Pass on the wake-up this waiter received.
+            self._wake_locked(1)
+        raise
+
+  def release(self) -> None:
+    with self._condition:
+      self.in_flight -= 1
+      self._wake_locked(1)
+
+  def set_limit(self, limit: int) -> None:
+    with self._condition:
+      grown = limit - self.limit
+      self.limit = limit
+      if grown > 0:
+        self._wake_locked(grown)
+
+  def _wake_locked(self, count: int) -> None:
+    # Woken waiters compete for the free slots; losers wait again.
+    self._condition.notify(count)
+    for _ in range(min(count, len(self._async_waiters))):
+      loop, waiter = self._async_waiters.popleft()
+      loop.call_soon_threadsafe(_resolve_future, waiter)
+
+
+def _resolve_future(future: asyncio.Future[None]) -> None:
+  if not future.done():
+    future.set_result(None)
+
+
+@dataclasses.dataclass
+class RateLimiterStats:
+  """Counters for a `RateLimiter`.
+
+  Attributes:
+    requests: Requests admitted.
+    rate_limited: Requests the endpoint rejected with a rate limit.
+    timeouts: Requests that timed out.
+    latency_spikes: Successful requests much slower than average.
+    decreases: Times the concurrency limit was cut.
+    waited_seconds: Total time requests waited for rate budget.
+  """
+
+  requests: int = 0
+  rate_limited: int = 0
+  timeouts: int = 0
+  latency_spikes: int = 0
+  decreases: int = 0
+  waited_seconds: float = 0.0
+
+
+class RateLimiter:
+  """Rate budgets and an adaptive concurrency limit for one endpoint.
+
+  Safe to share between threads, model instances and event loops.
+  """
+
+  def __init__(
+      self,
+      requests_per_minute: float | None = None,
+      tokens_per_minute: float | None = None,
+      max_concurrency: int | None = None,
+      min_concurrency: int = 1,
+      decrease_factor: float = 0.5,
+      latency_spike_factor: float = 3.0,
+      token_counter: Callable[[str], int] = estimate_tokens,
+  ):
+    """Initializes the limiter.
+
+    Args:
+      requests_per_minute: Requests allowed per minute, or None for no limit.
+      tokens_per_minute: Prompt tokens allowed per minute, or None for no
+        limit.
+      max_concurrency: Upper bound of the adaptive limit on requests in
+        flight, which starts there. None disables the concurrency limit.
+      min_concurrency: Lower bound of the adaptive limit.
+      decrease_factor: Factor applied to the limit on a rate limit, timeout or
+        latency spike.
+      latency_spike_factor: A successful request slower than this multiple of
+        the average latency counts as a latency spike.
+      token_counter: Returns the number of tokens in a prompt.
+    """
+    if max_concurrency is not None and max_concurrency < min_concurrency:
+      raise ValueError("max_concurrency must be at least min_concurrency.")
+    if min_concurrency < 1:
+      raise ValueError("min_concurrency must be at least 1.")
+    if not 0 < decrease_factor < 1:
+      raise ValueError("decrease_factor must be between 0 and 1.")
+    if latency_spike_factor <= 1:
+      raise ValueError("latency_spike_factor must be greater than 1.")
+    self.requests_per_minute = requests_per_minute
+    self.tokens_per_minute = tokens_per_minute
+    self.max_concurrency = max_concurrency
+    self.min_concurrency = min_concurrency
+    self.decrease_factor = decrease_factor
+    self.latency_spike_factor = latency_spike_factor
+    self.token_counter = token_counter
+    self.stats = RateLimiterStats()
+
+    self._request_bucket = (
+        TokenBucket(requests_per_minute) if requests_per_minute else None
+    )
+    self._token_bucket = (
+        TokenBucket(tokens_per_minute) if tokens_per_minute else None
+    )
+    self._semaphore = (
+        _AdaptiveSemaphore(max_concurrency) if max_concurrency else None
+    )
+    self._lock = threading.Lock()
+    self._limit = float(max_concurrency or 0)
+    self._average_latency: float | None = None
+    self._successes = 0
+    self._last_decrease = -math.inf
+    self._paused_until = -math.inf
+
+  @property
+  def concurrency_limit(self) -> int | None:
+    """Current limit on requests in flight, or None if unlimited."""
+    return self._semaphore.limit if self._semaphore else None
+
+  @property
+  def in_flight(self) -> int:
+    return self._semaphore.in_flight if self._semaphore else 0
+
+  def _reserve(self, prompt: str) -> float:
+    """Takes rate budget for a request and returns the seconds to wait."""
+    wait = 0.0
+    if self._request_bucket is not None:
+      wait = self._request_bucket.reserve()
+    if self._token_bucket is not None:
+      wait = max(
+          wait, self._token_bucket.reserve(self.token_counter(prompt))
+      )
+    with self._lock:
+      wait = max(wait, self._paused_until - time.monotonic())
+      self.stats.requests += 1
+      self.stats.waited_seconds += wait
+    return wait
+
+  @contextlib.contextmanager
+  def slot(self, prompt: str = "") -> Iterator[None]:
+    """Waits until a request for `prompt` may be sent, for a `with` block.
+
+    The block should contain only the request, so its duration and errors
+    are the endpoint's.
+    """
+    if self._semaphore is not None:
+      self._semaphore.acquire()
+    try:
+      wait = self._reserve(prompt)
+      if wait > 0:
+        time.sleep(wait)
+      start = time.monotonic()
+      try:
+        yield
+      except Exception as e:
+        self._record_failure(e, start)
+        raise
+      self._record_success(start)
+    finally:
+      if self._semaphore is not None:
+        self._semaphore.release()
+
+  @contextlib.asynccontextmanager
+  async def slot_async(self, prompt: str = "") -> AsyncIterator[None]:
+    """Like `slot`, but waits without blocking the event loop."""
+    if self._semaphore is not None:
+      await self._semaphore.acquire_async()
+    try:
+      wait = self._reserve(prompt)
+      if wait > 0:
+        await asyncio.sleep(wait)
+      start = time.monotonic()
+      try:
+        yield
+      except Exception as e:
+        self._record_failure(e, start)
+        raise
+      self._record_success(start)
+    finally:
+      if self._semaphore is not None:
+        self._semaphore.release()
+
+  def _record_success(self, start: float) -> None:
+    latency = time.monotonic() - start
+    with self._lock:
+      average = self._average_latency
+      self._successes += 1
+      self._average_latency = (
+          latency
+          if average is None
+          else average + _LATENCY_SMOOTHING * (latency - average)
+      )
+      if (
+          self._successes > _LATENCY_WARMUP_REQUESTS
+          and latency > self.latency_spike_factor * average
+      ):
+        self.stats.latency_spikes += 1
+        self._decrease_locked(start)
+      elif self._semaphore is not None and self.max_concurrency:
+        # Additive increase: one more slot per round of successes.
+        self._limit = min(
+            float(self.max_concurrency), self._limit + 1 / self._limit
+        )
+        self._apply_limit_locked()
+
+  def _record_failure(self, error: BaseException, start: float) -> None:
+    kind = retry_lib.classify_error(error)
+    with self._lock:
+      if kind is retry_lib.FailureKind.RATE_LIMIT:
+        self.stats.rate_limited += 1
+        retry_after = _retry_after_seconds(error)
+        if retry_after:
+          self._paused_until = max(
+              self._paused_until, time.monotonic() + retry_after
+          )
+        self._decrease_locked(start)
+      elif kind is retry_lib.FailureKind.TIMEOUT:
+        self.stats.timeouts += 1
+        self._decrease_locked(start)
+
+  def _decrease_locked(self, start: float) -> None:
+    # Requests sent before the last cut reflect the old limit, so a burst of
+    # failures from one overload cuts the limit only once.
+    if self._semaphore is None or start < self._last_decrease:
+      return
+    self._last_decrease = time.monotonic()
+    self.stats.decreases += 1
+    self._limit = max(
+        float(self.min_concurrency), self._limit * self.decrease_factor
+    )
+    self._apply_limit_locked()
+    logging.info(
+        "Concurrency limit lowered to %d requests.", self._semaphore.limit
+    )
+
+  def _apply_limit_locked(self) -> None:
+    self._semaphore.set_limit(int(self._limit))
+
+  def metrics(self) -> dict[str, float]:
+    """Returns the current limits and counters as flat, exportable gauges."""
+    with self._lock:
+      metrics: dict[str, float] = dataclasses.asdict(self.stats)
+      metrics["average_latency_seconds"] = self._average_latency or 0.0
+    metrics["concurrency_limit"] = self.concurrency_limit or 0
+    metrics["in_flight"] = self.in_flight
+    if self._request_bucket is not None:
+      metrics["requests_per_minute"] = self.requests_per_minute
+      metrics["request_tokens_available"] = self._request_bucket.available
+    if self._token_bucket is not None:
+      metrics["tokens_per_minute"] = self.tokens_per_minute
+      metrics["prompt_tokens_available"] = self._token_bucket.available
+    return metrics
+
+
+def _retry_after_seconds(error: BaseException) -> float | None:
+  """Returns the Retry-After delay of an HTTP error in seconds, if given."""
+  seen = set()
+  while error is not None and id(error) not in seen:
+    seen.add(id(error))
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+      try:
+        return float(headers.get("Retry-After"))
+      except (TypeError, ValueError):
+        return None
+    error = error.__cause__ or error.__context__
+  return None
+
+
+_registry: dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(endpoint: str, **kwargs: Any) -> RateLimiter:
+  """Returns the limiter shared by all models that call `endpoint`.
+
+  Args:
+    endpoint: Identifies the endpoint, e.g. its URL or a provider and model
+      ID.
+    **kwargs: `RateLimiter` arguments, used when the limiter is created. A
+      limiter that already exists keeps its settings.
+
+  Returns:
+    The endpoint's rate limiter.
+  """
+  with _registry_lock:
+    limiter = _registry.get(endpoint)
+    if limiter is None:
+      limiter = _registry[endpoint] = RateLimiter(**kwargs)
+    return limiter
+
+
+def metrics() -> dict[str, dict[str, float]]:
+  """Returns the metrics of every shared limiter, keyed by endpoint."""
+  with _registry_lock:
+    limiters = dict(_registry)
+  return {endpoint: limiter.metrics() for endpoint, limiter in limiters.items()}
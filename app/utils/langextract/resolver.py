@@ -20,22 +20,31 @@ transform the textual output of an LLM into structured data.
 
 import abc
 import collections
-from collections.abc import Iterator, Mapping, Sequence
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 import difflib
 import functools
 import itertools
 import json
 import operator
+import re
+from typing import Any
 
 from absl import logging
 import yaml
 
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
 from langextract import data
 from langextract import exceptions
 from langextract import schema
 from langextract import tokenizer
 
 _FUZZY_ALIGNMENT_MIN_THRESHOLD = 0.75
+# Default fuzzy alignment window cap, as a multiple of the extraction's tokens.
+_FUZZY_ALIGNMENT_WINDOW_FACTOR = 4
 
 
 class AbstractResolver(abc.ABC):
@@ -107,6 +116,29 @@ class AbstractResolver(abc.ABC):
         Annotated text in the form of Extractions.
     """
 
+  def resolve_stream(
+      self,
+      output_pieces: Iterable[str],
+      **kwargs,
+  ) -> Iterator[Sequence[data.Extraction]]:
+    """Resolves output while it is streamed, one group of extractions at a time.
+
+    The default waits for the complete output and yields all of its
+    extractions as a single group. Subclasses that can parse partial output
+    override this to yield each group as soon as it is complete.
+
+    Args:
+        output_pieces: Successive pieces of the output text, e.g. from
+          `BaseLanguageModel.infer_stream`.
+        **kwargs: Additional arguments, as for `resolve`.
+
+    Yields:
+        The extractions of each group, in the order they were generated.
+    """
+    extractions = self.resolve("".join(output_pieces), **kwargs)
+    if extractions:
+      yield extractions
+
   @abc.abstractmethod
   def align(
       self,
@@ -117,6 +149,9 @@ class AbstractResolver(abc.ABC):
       enable_fuzzy_alignment: bool = True,
       fuzzy_alignment_threshold: float = _FUZZY_ALIGNMENT_MIN_THRESHOLD,
       accept_match_lesser: bool = True,
+      fuzzy_alignment_max_window: int | None = None,
+      tokenized_text: tokenizer.TokenizedText | None = None,
+      token_interval: tokenizer.TokenInterval | None = None,
   ) -> Iterator[data.Extraction]:
     """Aligns extractions with source text, setting token/char intervals and alignment status.
 
@@ -143,6 +178,14 @@ class AbstractResolver(abc.ABC):
         (0-1).
       accept_match_lesser: Whether to accept partial exact matches (MATCH_LESSER
         status).
+      fuzzy_alignment_max_window: Maximum window size in tokens considered by
+        fuzzy alignment. Bounds the cost of aligning against long chunks. If
+        None, defaults to 4 times the extraction's token count; pass at least
+        the chunk's token count to let windows span the whole chunk.
+      tokenized_text: Optional tokenized parent document of the chunk. Given
+        together with `token_interval`, alignment reuses its tokens instead of
+        tokenizing `source_text` again.
+      token_interval: The chunk's token interval within `tokenized_text`.
 
     Yields:
       Aligned extractions with updated token intervals and alignment status.
@@ -150,12 +193,236 @@ class AbstractResolver(abc.ABC):
 
 
 ExtractionValueType = str | int | float | dict | list | None
+# The same types as a tuple, which isinstance checks faster than a union.
+_EXTRACTION_VALUE_TYPES = (str, int, float, dict, list, type(None))
+
+# Parses a JSON document into Python objects, raising json.JSONDecodeError.
+JsonLoads = Callable[[str], Any]
+
+# PyYAML's libyaml bindings parse many times faster than its pure Python
+# loader, and accept the same documents.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Maps ASCII digits to "0" and all other bytes to " ", to find digit runs.
+_DIGITS_TO_ZERO = bytes(
+    0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256)
+)
+# orjson parses integers beyond 64 bits as floats; those have 19+ digits.
+_LONG_DIGIT_RUN = b"0" * 19
+
+
+def _orjson_loads(content: str) -> Any:
+  """Parses JSON with orjson, deferring to `json.loads` where they differ.
+
+  orjson rejects NaN and unpaired surrogates, which `json.loads` accepts, and
+  turns integers beyond 64 bits into floats. Documents that fail in orjson or
+  contain a run of 19 digits are parsed by the standard library instead, so
+  results always match `json.loads`.
+  """
+  encoded = content.encode("utf-8", "surrogatepass")
+  if _LONG_DIGIT_RUN in encoded.translate(_DIGITS_TO_ZERO):
+    return json.loads(content)
+  try:
+    return orjson.loads(encoded)
+  except orjson.JSONDecodeError:
+    return json.loads(content)
+
+
+def default_json_loads() -> JsonLoads:
+  """Returns the fastest available JSON parser: orjson, else the stdlib."""
+  return json.loads if orjson is None else _orjson_loads
 
 
 class ResolverParsingError(exceptions.LangExtractError):
   """Error raised when content cannot be parsed as the given format."""
 
 
+def _not_a_mapping_error() -> ResolverParsingError:
+  logging.error("Each item in the sequence must be a mapping.")
+  return ResolverParsingError("Each item in the sequence must be a mapping.")
+
+
+def _invalid_entry_error() -> ResolverParsingError:
+  logging.error("Invalid key or value type detected in content.")
+  return ResolverParsingError(
+      "All keys must be strings and values must be either strings,"
+      " integers, floats, dicts, or None."
+  )
+
+
+def _check_extraction_item(item: Any) -> None:
+  """Raises ResolverParsingError if `item` is not a valid extraction group."""
+  if not isinstance(item, dict):
+    raise _not_a_mapping_error()
+
+  for key, value in item.items():
+    if not isinstance(key, str) or not isinstance(
+        value, _EXTRACTION_VALUE_TYPES
+    ):
+      raise _invalid_entry_error()
+
+
+# Characters that change the nesting of JSON text outside and inside strings.
+_JSON_STRUCTURE = re.compile(r'["{}\[\]]')
+_JSON_STRING_END = re.compile(r'["\\]')
+
+
+class IncrementalExtractionParser:
+  """Parses the extractions array of JSON output while it is generated.
+
+  Pieces of the output are fed in as they arrive, and each element of the
+  top-level object's `extractions` array is returned as soon as its closing
+  brace is received, without waiting for the rest of the output. Each piece is
+  scanned once. Text before and after the top-level object, such as code
+  fences, is ignored.
+
+  Example usage:
+    parser = IncrementalExtractionParser()
+    for piece in language_model.infer_stream(prompt):
+      for item in parser.feed(piece):
+        ...
+    parser.close()
+  """
+
+  def __init__(self, json_loads: JsonLoads | None = None):
+    """Initializes the parser.
+
+    Args:
+      json_loads: Parses each element. Defaults to `default_json_loads()`.
+    """
+    self._json_loads = json_loads or default_json_loads()
+    # Text not yet scanned, plus the element being received.
+    self._buffer = ""
+    self._pos = 0
+    # Brackets and braces that are open at `_pos`.
+    self._stack: list[str] = []
+    self._in_string = False
+    self._string_start = 0
+    # The last string completed in the top-level object, and where it ended.
+    self._last_string: str | None = None
+    self._last_string_end = 0
+    self._in_array = False
+    self._found_array = False
+    self._item_start: int | None = None
+    # Where the text between elements of the extractions array starts.
+    self._gap_start = 0
+    self._done = False
+
+  def feed(self, text: str) -> list[dict[str, Any]]:
+    """Adds a piece of output and returns the elements it completed.
+
+    Args:
+      text: The next piece of the output.
+
+    Returns:
+      The elements of the extractions array completed by `text`, in order.
+
+    Raises:
+      ResolverParsingError: If the output is not valid JSON or an element of
+        the extractions array is not a mapping.
+    """
+    if self._done:
+      return []
+    buffer = self._buffer + text
+    pos = self._pos
+    stack = self._stack
+    items = []
+    while True:
+      if self._in_string:
+        match = _JSON_STRING_END.search(buffer, pos)
+        if match is None:
+          pos = len(buffer)
+          break
+        pos = match.start()
+        if buffer[pos] == "\\":
+          if pos + 1 == len(buffer):
+            # The escaped character has not been received yet.
+            break
+          pos += 2
+          continue
+        self._in_string = False
+        pos += 1
+        if len(stack) == 1:
+          self._last_string = buffer[self._string_start : pos - 1]
+          self._last_string_end = pos
+        continue
+
+      match = _JSON_STRUCTURE.search(buffer, pos)
+      if match is None:
+        pos = len(buffer)
+        break
+      pos = match.start()
+      char = buffer[pos]
+      pos += 1
+      if not stack and char != "{":
+        continue
+      in_array_body = self._in_array and len(stack) == 2
+      if in_array_body and self._item_start is None and (
+          char in '"[' or buffer[self._gap_start : pos - 1].strip(" \t\r\n,")
+      ):
+        raise ResolverParsingError(
+            "Each item in the sequence must be a mapping."
+        )
+
+      if char == '"':
+        self._in_string = True
+        self._string_start = pos
+      elif char == "{":
+        if in_array_body:
+          self._item_start = pos - 1
+        stack.append(char)
+      elif char == "[":
+        if (
+            len(stack) == 1
+            and not self._found_array
+            and self._last_string == schema.EXTRACTIONS_KEY
+            and buffer[self._last_string_end : pos - 1].strip() == ":"
+        ):
+          self._in_array = self._found_array = True
+          self._gap_start = pos
+        stack.append(char)
+      else:
+        if stack.pop() != ("{" if char == "}" else "["):
+          raise ResolverParsingError(
+              f"Unbalanced {char!r} in content at offset {pos - 1}."
+          )
+        if self._in_array and len(stack) == 2 and char == "}":
+          try:
+            items.append(self._json_loads(buffer[self._item_start : pos]))
+          except json.JSONDecodeError as e:
+            raise ResolverParsingError("Failed to parse content.") from e
+          self._item_start = None
+          # Drop the text that has been parsed.
+          buffer = buffer[pos:]
+          self._last_string_end -= pos
+          self._gap_start = pos = 0
+        elif self._in_array and len(stack) == 1:
+          self._in_array = False
+        elif not stack:
+          self._done = True
+          break
+
+    self._buffer = buffer
+    self._pos = pos
+    return items
+
+  def close(self) -> None:
+    """Checks that the complete output has been fed.
+
+    Raises:
+      ResolverParsingError: If the top-level object was not closed or had no
+        extractions array.
+    """
+    if not self._done:
+      raise ResolverParsingError(
+          "Output ended before its top-level object was closed."
+      )
+    if not self._found_array:
+      raise ResolverParsingError(
+          f"Content must contain an '{schema.EXTRACTIONS_KEY}' key."
+      )
+
+
 class Resolver(AbstractResolver):
   """Resolver for YAML/JSON-based information extraction.
 
@@ -175,6 +442,8 @@ class Resolver(AbstractResolver):
       extraction_attributes_suffix: str | None = "_attributes",
       constraint: schema.Constraint = schema.Constraint(),
       format_type: data.FormatType = data.FormatType.JSON,
+      segmenter: tokenizer.Segmenter | None = None,
+      json_loads: JsonLoads | None = None,
   ):
     """Constructor.
 
@@ -186,6 +455,10 @@ class Resolver(AbstractResolver):
         with extractions.
       constraint: Applies constraints when decoding the output.
       format_type: The format to parse (YAML or JSON).
+      segmenter: Optional CJK word segmenter used when tokenizing text for
+        alignment. Must match the segmenter used to tokenize the documents.
+      json_loads: Parses JSON output. Defaults to `default_json_loads()`,
+        which uses orjson when it is installed.
     """
     super().__init__(
         fence_output=fence_output,
@@ -194,6 +467,8 @@ class Resolver(AbstractResolver):
     self.extraction_index_suffix = extraction_index_suffix
     self.extraction_attributes_suffix = extraction_attributes_suffix
     self.format_type = format_type
+    self.segmenter = segmenter
+    self.json_loads = json_loads or default_json_loads()
 
   def resolve(
       self,
@@ -219,23 +494,105 @@ class Resolver(AbstractResolver):
     logging.debug("Input Text: %s", input_text)
 
     try:
-      extraction_data = self.string_to_extraction_data(input_text)
+      extraction_data = self._extraction_list(
+          self._extract_and_parse_content(input_text)
+      )
       logging.debug("Parsed content: %s", extraction_data)
-
     except (ResolverParsingError, ValueError) as e:
-      if suppress_parse_errors:
-        logging.exception(
-            "Failed to parse input_text: %s, error: %s", input_text, e
-        )
-        return []
-      raise ResolverParsingError("Failed to parse content.") from e
+      return self._parse_failure(input_text, e, suppress_parse_errors)
 
-    processed_extractions = self.extract_ordered_extractions(extraction_data)
+    # The items are validated while they are converted, in a single pass.
+    try:
+      processed_extractions = self.extract_ordered_extractions(
+          extraction_data
+      )
+    except ResolverParsingError as e:
+      return self._parse_failure(input_text, e, suppress_parse_errors)
 
     logging.debug("Completed the resolver process.")
 
     return processed_extractions
 
+  def _parse_failure(
+      self, input_text: str, error: Exception, suppress_parse_errors: bool
+  ) -> list[data.Extraction]:
+    """Returns no extractions for unparsable input, or raises.
+
+    Args:
+        input_text: The input text that failed to parse.
+        error: The parsing error.
+        suppress_parse_errors: Whether to log the error instead of raising.
+
+    Returns:
+        An empty list, if suppress_parse_errors is set.
+
+    Raises:
+        ResolverParsingError: If suppress_parse_errors is not set.
+    """
+    if suppress_parse_errors:
+      logging.exception(
+          "Failed to parse input_text: %s, error: %s", input_text, error
+      )
+      return []
+    raise ResolverParsingError("Failed to parse content.") from error
+
+  def resolve_stream(
+      self,
+      output_pieces: Iterable[str],
+      suppress_parse_errors: bool = False,
+      **kwargs,
+  ) -> Iterator[Sequence[data.Extraction]]:
+    """Resolves JSON output while it is streamed, one group at a time.
+
+    Each element of the `extractions` array is validated and converted as soon
+    as it is complete, so the first extractions are available long before a
+    long output has been generated. Extractions within a group are ordered as
+    by `resolve`; groups are yielded in the order they were generated. YAML
+    output is resolved once it is complete.
+
+    Args:
+        output_pieces: Successive pieces of the output text, e.g. from
+          `BaseLanguageModel.infer_stream`.
+        suppress_parse_errors: Log errors and stop instead of raising them.
+          Groups already yielded are kept.
+        **kwargs: Additional keyword arguments.
+
+    Yields:
+        The extractions of each group.
+
+    Raises:
+        ResolverParsingError: If the output cannot be parsed.
+    """
+    if self.format_type != data.FormatType.JSON:
+      yield from super().resolve_stream(
+          output_pieces, suppress_parse_errors=suppress_parse_errors, **kwargs
+      )
+      return
+
+    parser = IncrementalExtractionParser(self.json_loads)
+    group_index = 0
+    extraction_index = 0
+    try:
+      for piece in output_pieces:
+        for item in parser.feed(piece):
+          try:
+            extractions, extraction_index = self._group_extractions(
+                group_index, item, extraction_index
+            )
+          except ValueError:
+            # A malformed item takes precedence over a bad value.
+            _check_extraction_item(item)
+            raise
+          group_index += 1
+          if extractions:
+            extractions.sort(key=operator.attrgetter("extraction_index"))
+            yield extractions
+      parser.close()
+    except ResolverParsingError as e:
+      if not suppress_parse_errors:
+        raise
+      logging.exception("Failed to parse streamed output: %s", e)
+
   def align(
       self,
       extractions: Sequence[data.Extraction],
@@ -245,6 +602,9 @@ class Resolver(AbstractResolver):
       enable_fuzzy_alignment: bool = True,
       fuzzy_alignment_threshold: float = _FUZZY_ALIGNMENT_MIN_THRESHOLD,
       accept_match_lesser: bool = True,
+      fuzzy_alignment_max_window: int | None = None,
+      tokenized_text: tokenizer.TokenizedText | None = None,
+      token_interval: tokenizer.TokenInterval | None = None,
   ) -> Iterator[data.Extraction]:
     """Aligns annotated extractions with source text.
 
@@ -264,6 +624,14 @@ class Resolver(AbstractResolver):
         alignment.
       accept_match_lesser: Whether to accept partial exact matches (MATCH_LESSER
         status).
+      fuzzy_alignment_max_window: Maximum window size in tokens considered by
+        fuzzy alignment. Bounds the cost of aligning against long chunks. If
+        None, defaults to 4 times the extraction's token count; pass at least
+        the chunk's token count to let windows span the whole chunk.
+      tokenized_text: Optional tokenized parent document of the chunk. Given
+        together with `token_interval`, alignment reuses its tokens instead of
+        tokenizing `source_text` again.
+      token_interval: The chunk's token interval within `tokenized_text`.
 
     Yields:
         Iterator on aligned extractions.
@@ -279,7 +647,7 @@ class Resolver(AbstractResolver):
     else:
       extractions_group = [extractions]
 
-    aligner = WordAligner()
+    aligner = WordAligner(segmenter=self.segmenter)
     aligned_yaml_extractions = aligner.align_extractions(
         extractions_group,
         source_text,
@@ -288,6 +656,9 @@ class Resolver(AbstractResolver):
         enable_fuzzy_alignment=enable_fuzzy_alignment,
         fuzzy_alignment_threshold=fuzzy_alignment_threshold,
         accept_match_lesser=accept_match_lesser,
+        fuzzy_alignment_max_window=fuzzy_alignment_max_window,
+        tokenized_text=tokenized_text,
+        token_interval=token_interval,
     )
     logging.debug(
         "Aligned extractions count: %d",
@@ -344,9 +715,9 @@ class Resolver(AbstractResolver):
 
     try:
       if self.format_type == data.FormatType.YAML:
-        parsed_data = yaml.safe_load(content)
+        parsed_data = yaml.load(content, Loader=_YAML_LOADER)
       else:
-        parsed_data = json.loads(content)
+        parsed_data = self.json_loads(content)
       logging.debug("Successfully parsed content.")
     except (yaml.YAMLError, json.JSONDecodeError) as e:
       logging.exception("Failed to parse content.")
@@ -390,8 +761,28 @@ class Resolver(AbstractResolver):
         ResolverParsingError: If the content within the string cannot be parsed.
         ValueError: If the input is invalid or does not contain expected format.
     """
-    parsed_data = self._extract_and_parse_content(input_string)
+    extractions = self._extraction_list(
+        self._extract_and_parse_content(input_string)
+    )
+    for item in extractions:
+      _check_extraction_item(item)
+
+    logging.info("Completed parsing of string.")
+    return extractions
+
+  def _extraction_list(self, parsed_data: Any) -> list[Any]:
+    """Returns the extractions list of parsed content, without its items.
+
+    Args:
+        parsed_data: The parsed YAML or JSON content.
+
+    Returns:
+        The value of the content's extractions key.
 
+    Raises:
+        ResolverParsingError: If the content is not a mapping with an
+          extractions list.
+    """
     if not isinstance(parsed_data, dict):
       logging.error("Expected content to be a mapping (dict).")
       raise ResolverParsingError(
@@ -407,26 +798,6 @@ class Resolver(AbstractResolver):
       raise ResolverParsingError(
           "The extractions must be a sequence (list) of mappings."
       )
-
-    # Validate each item in the extractions list
-    for item in extractions:
-      if not isinstance(item, dict):
-        logging.error("Each item in the sequence must be a mapping.")
-        raise ResolverParsingError(
-            "Each item in the sequence must be a mapping."
-        )
-
-      for key, value in item.items():
-        if not isinstance(key, str) or not isinstance(
-            value, ExtractionValueType
-        ):
-          logging.error("Invalid key or value type detected in content.")
-          raise ResolverParsingError(
-              "All keys must be strings and values must be either strings,"
-              " integers, floats, dicts, or None."
-          )
-
-    logging.info("Completed parsing of string.")
     return extractions
 
   def extract_ordered_extractions(
@@ -453,6 +824,8 @@ class Resolver(AbstractResolver):
         extractions have the same index, their group order dictates the sorting
         order.
     Raises:
+        ResolverParsingError: If an item is not a mapping of strings to
+          extraction values.
         ValueError: If the extraction text is not a string or integer, or if the
         index is not an integer.
     """
@@ -463,82 +836,126 @@ class Resolver(AbstractResolver):
 
     processed_extractions = []
     extraction_index = 0
+    for group_index, group in enumerate(extraction_data):
+      try:
+        group_extractions, extraction_index = self._group_extractions(
+            group_index, group, extraction_index
+        )
+      except ValueError:
+        # A malformed item anywhere takes precedence over a bad value, as
+        # when all items were checked before converting any.
+        for item in extraction_data[group_index:]:
+          _check_extraction_item(item)
+        raise
+      processed_extractions.extend(group_extractions)
+
+    processed_extractions.sort(key=operator.attrgetter("extraction_index"))
+    logging.info("Completed extraction and ordering of extractions.")
+    return processed_extractions
+
+  def _group_extractions(
+      self,
+      group_index: int,
+      group: Mapping[str, ExtractionValueType],
+      extraction_index: int,
+  ) -> tuple[list[data.Extraction], int]:
+    """Converts one element of the extraction data into extractions.
+
+    Args:
+        group_index: Position of the element in the extraction data.
+        group: Extraction classes mapped to their values, indexes and
+          attributes.
+        extraction_index: Index of the last extraction of the previous
+          groups, from which extractions are numbered without an index suffix.
+
+    Returns:
+        The group's extractions, unsorted, and the index of its last
+        extraction.
+
+    Raises:
+        ResolverParsingError: If the group is not a mapping of strings to
+          extraction values.
+        ValueError: If the extraction text is not a string or integer, or if
+        the index is not an integer.
+    """
+    if not isinstance(group, dict):
+      raise _not_a_mapping_error()
+    processed_extractions = []
     index_suffix = self.extraction_index_suffix
     attributes_suffix = self.extraction_attributes_suffix
 
-    for group_index, group in enumerate(extraction_data):
-      for extraction_class, extraction_value in group.items():
-        if index_suffix and extraction_class.endswith(index_suffix):
-          if not isinstance(extraction_value, int):
-            logging.error(
-                "Index must be a string or integer. Found: %s",
-                type(extraction_value),
-            )
-            raise ValueError(
-                "Extraction text must must be a string or integer."
-            )
-          continue
-
-        if attributes_suffix and extraction_class.endswith(attributes_suffix):
-          if not isinstance(extraction_value, (dict, type(None))):
-            logging.error(
-                "Attributes must be a dict or None. Found: %s",
-                type(extraction_value),
-            )
-            raise ValueError(
-                "Extraction value must be a dict or None for attributes."
-            )
-          continue
+    for extraction_class, extraction_value in group.items():
+      if not isinstance(extraction_class, str) or not isinstance(
+          extraction_value, _EXTRACTION_VALUE_TYPES
+      ):
+        raise _invalid_entry_error()
+      if index_suffix and extraction_class.endswith(index_suffix):
+        if not isinstance(extraction_value, int):
+          logging.error(
+              "Index must be a string or integer. Found: %s",
+              type(extraction_value),
+          )
+          raise ValueError(
+              "Extraction text must must be a string or integer."
+          )
+        continue
 
-        if not isinstance(extraction_value, ExtractionValueType):
+      if attributes_suffix and extraction_class.endswith(attributes_suffix):
+        if not isinstance(extraction_value, (dict, type(None))):
           logging.error(
-              "Extraction text must be a string or integer. Found: %s",
+              "Attributes must be a dict or None. Found: %s",
               type(extraction_value),
           )
-          raise ValueError("Extraction text must must be a string or integer.")
+          raise ValueError(
+              "Extraction value must be a dict or None for attributes."
+          )
+        continue
 
-        if not isinstance(extraction_value, str):
-          extraction_value = str(extraction_value)
+      if not isinstance(extraction_value, str):
+        extraction_value = str(extraction_value)
 
-        if index_suffix:
-          index_key = extraction_class + index_suffix
-          extraction_index = group.get(index_key, None)
-          if extraction_index is None:
-            logging.debug(
-                "No index value for %s. Skipping extraction.", extraction_class
-            )
-            continue
-        else:
-          extraction_index += 1
-
-        attributes = None
-        if attributes_suffix:
-          attributes_key = extraction_class + attributes_suffix
-          attributes = group.get(attributes_key, None)
-
-        processed_extractions.append(
-            data.Extraction(
-                extraction_class=extraction_class,
-                extraction_text=extraction_value,
-                extraction_index=extraction_index,
-                group_index=group_index,
-                attributes=attributes,
-            )
-        )
+      if index_suffix:
+        index_key = extraction_class + index_suffix
+        extraction_index = group.get(index_key, None)
+        if extraction_index is None:
+          logging.debug(
+              "No index value for %s. Skipping extraction.", extraction_class
+          )
+          continue
+      else:
+        extraction_index += 1
+
+      attributes = None
+      if attributes_suffix:
+        attributes_key = extraction_class + attributes_suffix
+        attributes = group.get(attributes_key, None)
+
+      processed_extractions.append(
+          data.Extraction(
+              extraction_class=extraction_class,
+              extraction_text=extraction_value,
+              extraction_index=extraction_index,
+              group_index=group_index,
+              attributes=attributes,
+          )
+      )
 
-    processed_extractions.sort(key=operator.attrgetter("extraction_index"))
-    logging.info("Completed extraction and ordering of extractions.")
-    return processed_extractions
+    return processed_extractions, extraction_index
 
 
 class WordAligner:
   """Aligns words between two sequences of tokens using Python's difflib."""
 
-  def __init__(self):
-    """Initialize the WordAligner with difflib SequenceMatcher."""
+  def __init__(self, segmenter: tokenizer.Segmenter | None = None):
+    """Initialize the WordAligner with difflib SequenceMatcher.
+
+    Args:
+      segmenter: Optional CJK word segmenter passed to the tokenizer.
+    """
     self.matcher = difflib.SequenceMatcher(autojunk=False)
     self.source_tokens: Sequence[str] | None = None
     self.extraction_tokens: Sequence[str] | None = None
+    self.segmenter = segmenter
 
   def _set_seqs(
       self,
@@ -591,13 +1008,22 @@ class WordAligner:
       token_offset: int,
       char_offset: int,
       fuzzy_alignment_threshold: float = _FUZZY_ALIGNMENT_MIN_THRESHOLD,
+      max_window: int | None = None,
+      token_positions: Mapping[str, Sequence[int]] | None = None,
+      extraction_tokens: Sequence[str] | None = None,
+      token_start: int = 0,
   ) -> data.Extraction | None:
     """Fuzzy-align an extraction using difflib.SequenceMatcher on tokens.
 
-    The algorithm scans every candidate window in `source_tokens` and selects
-    the window with the highest SequenceMatcher `ratio`. It uses an efficient
-    token-count intersection as a fast pre-check to discard windows that cannot
-    meet the alignment threshold. A match is accepted when the ratio is ≥
+    The algorithm selects the window of `source_tokens` with the highest
+    SequenceMatcher match count against the extraction, preferring smaller and
+    then earlier windows on ties. Only windows that can win are scored: windows
+    of the extraction's length, and longer windows that start and end on a
+    source token occurring in the extraction (trimming other tokens from the
+    edges never changes the match count). Each candidate's token-count
+    intersection, an upper bound on its match count, is computed incrementally
+    and candidates are scored from the highest bound down until no remaining
+    bound can beat the best score. A match is accepted when the ratio is ≥
     `fuzzy_alignment_threshold`. This only runs on unmatched extractions, which
     is usually a small subset of the total extractions.
 
@@ -608,14 +1034,23 @@ class WordAligner:
       token_offset: The token offset of the current chunk.
       char_offset: The character offset of the current chunk.
       fuzzy_alignment_threshold: The minimum ratio for a fuzzy match.
+      max_window: Maximum window size in tokens. Windows are never smaller than
+        the extraction. If None, defaults to 4 times the extraction's token
+        count.
+      token_positions: Positions of each normalized token in `source_tokens`,
+        as built by `_index_token_positions`. Built on demand if None.
+      extraction_tokens: Lowercased tokens of the extraction text. Tokenized
+        on demand if None.
+      token_start: Index in `tokenized_text` of the first source token.
 
     Returns:
       The aligned data.Extraction if successful, None otherwise.
     """
 
-    extraction_tokens = list(
-        _tokenize_with_lowercase(extraction.extraction_text)
-    )
+    if extraction_tokens is None:
+      extraction_tokens = list(
+          _tokenize_with_lowercase(extraction.extraction_text, self.segmenter)
+      )
     # Work with lightly stemmed tokens so pluralisation doesn't block alignment
     extraction_tokens_norm = [_normalize_token(t) for t in extraction_tokens]
 
@@ -628,58 +1063,19 @@ class WordAligner:
         len(extraction_tokens),
     )
 
-    best_ratio = 0.0
-    best_span: tuple[int, int] | None = None  # (start_idx, window_size)
-
-    len_e = len(extraction_tokens)
-    max_window = len(source_tokens)
-
-    extraction_counts = collections.Counter(extraction_tokens_norm)
-    min_overlap = int(len_e * fuzzy_alignment_threshold)
-
-    matcher = difflib.SequenceMatcher(autojunk=False, b=extraction_tokens_norm)
-
-    for window_size in range(len_e, max_window + 1):
-      if window_size > len(source_tokens):
-        break
+    source_tokens_norm = [_normalize_token(t) for t in source_tokens]
+    if token_positions is None:
+      token_positions = _index_token_positions(source_tokens_norm)
 
-      # Initialize for sliding window
-      window_deque = collections.deque(source_tokens[0:window_size])
-      window_counts = collections.Counter(
-          [_normalize_token(t) for t in window_deque]
-      )
+    best_span = _find_best_fuzzy_window(
+        source_tokens_norm,
+        token_positions,
+        extraction_tokens_norm,
+        fuzzy_alignment_threshold,
+        max_window,
+    )
 
-      for start_idx in range(len(source_tokens) - window_size + 1):
-        # Optimization: check if enough overlapping tokens exist before expensive
-        # sequence matching. This is an upper bound on the match count.
-        if (extraction_counts & window_counts).total() >= min_overlap:
-          window_tokens_norm = [_normalize_token(t) for t in window_deque]
-          matcher.set_seq1(window_tokens_norm)
-          matches = sum(size for _, _, size in matcher.get_matching_blocks())
-          if len_e > 0:
-            ratio = matches / len_e
-          else:
-            ratio = 0.0
-          if ratio > best_ratio:
-            best_ratio = ratio
-            best_span = (start_idx, window_size)
-
-        # Slide the window to the right
-        if start_idx + window_size < len(source_tokens):
-          # Remove the leftmost token from the count
-          old_token = window_deque.popleft()
-          old_token_norm = _normalize_token(old_token)
-          window_counts[old_token_norm] -= 1
-          if window_counts[old_token_norm] == 0:
-            del window_counts[old_token_norm]
-
-          # Add the new rightmost token to the deque and count
-          new_token = source_tokens[start_idx + window_size]
-          window_deque.append(new_token)
-          new_token_norm = _normalize_token(new_token)
-          window_counts[new_token_norm] += 1
-
-    if best_span and best_ratio >= fuzzy_alignment_threshold:
+    if best_span:
       start_idx, window_size = best_span
 
       try:
@@ -688,11 +1084,11 @@ class WordAligner:
             end_index=start_idx + window_size + token_offset,
         )
 
-        start_token = tokenized_text.tokens[start_idx]
-        end_token = tokenized_text.tokens[start_idx + window_size - 1]
         extraction.char_interval = data.CharInterval(
-            start_pos=char_offset + start_token.char_interval.start_pos,
-            end_pos=char_offset + end_token.char_interval.end_pos,
+            start_pos=char_offset
+            + tokenized_text.starts[token_start + start_idx],
+            end_pos=char_offset
+            + tokenized_text.ends[token_start + start_idx + window_size - 1],
         )
 
         extraction.alignment_status = data.AlignmentStatus.MATCH_FUZZY
@@ -715,6 +1111,9 @@ class WordAligner:
       enable_fuzzy_alignment: bool = True,
       fuzzy_alignment_threshold: float = _FUZZY_ALIGNMENT_MIN_THRESHOLD,
       accept_match_lesser: bool = False,
+      fuzzy_alignment_max_window: int | None = None,
+      tokenized_text: tokenizer.TokenizedText | None = None,
+      token_interval: tokenizer.TokenInterval | None = None,
   ) -> Sequence[Sequence[data.Extraction]]:
     """Aligns extractions with their positions in the source text.
 
@@ -741,10 +1140,24 @@ class WordAligner:
         (0-1).
       accept_match_lesser: Whether to accept partial exact matches (MATCH_LESSER
         status).
+      fuzzy_alignment_max_window: Maximum window size in tokens considered by
+        fuzzy alignment. If None, defaults to 4 times the extraction's token
+        count; pass at least the source text's token count to let windows span
+        all of it.
+      tokenized_text: Optional already tokenized text containing
+        `source_text`, typically the parent document. When given together with
+        `token_interval`, its tokens are used instead of tokenizing
+        `source_text` again.
+      token_interval: The interval of `tokenized_text` covering `source_text`.
 
     Returns:
       A sequence of extractions aligned with the source text, including token
       intervals.
+
+    Raises:
+      ValueError: If only one of `tokenized_text` and `token_interval` is
+        given, or if the delimiter is not a single token or appears inside an
+        extraction text.
     """
     logging.debug(
         "WordAligner: Starting alignment of extractions with the source text."
@@ -755,25 +1168,61 @@ class WordAligner:
       logging.info("No extraction groups provided; returning empty list.")
       return []
 
-    source_tokens = list(_tokenize_with_lowercase(source_text))
-
-    delim_len = len(list(_tokenize_with_lowercase(delim)))
-    if delim_len != 1:
+    if (tokenized_text is None) != (token_interval is None):
+      raise ValueError(
+          "tokenized_text and token_interval must be provided together."
+      )
+    if tokenized_text is None:
+      tokenized_text = tokenizer.tokenize_cached(source_text, self.segmenter)
+      token_start = 0
+      token_end = len(tokenized_text.starts)
+    else:
+      # Align against a view of the parent's tokens. Character positions are
+      # made relative to the view so char_offset keeps its meaning.
+      token_start = token_interval.start_index
+      token_end = token_interval.end_index
+      if token_start < token_end:
+        char_offset -= tokenized_text.starts[token_start]
+    source_tokens = _lowercase_tokens(tokenized_text, token_start, token_end)
+
+    delim_tokens = list(_tokenize_with_lowercase(delim))
+    if len(delim_tokens) != 1:
       raise ValueError(f"Delimiter {delim!r} must be a single token.")
+    delim_len = 1
 
     logging.debug("Using delimiter %r for extraction alignment", delim)
 
-    extraction_tokens = _tokenize_with_lowercase(
-        f" {delim} ".join(
-            extraction.extraction_text
-            for extraction in itertools.chain(*extraction_groups)
+    extraction_texts = []
+    for extraction in itertools.chain(*extraction_groups):
+      # Validate delimiter doesn't appear in extraction text
+      if delim in extraction.extraction_text:
+        raise ValueError(
+            f"Delimiter {delim!r} appears inside extraction text"
+            f" {extraction.extraction_text!r}. This would corrupt alignment"
+            " mapping."
+        )
+      extraction_texts.append(extraction.extraction_text)
+
+    # All extraction texts are tokenized in a single call; splitting on the
+    # delimiter token recovers each extraction's tokens for reuse below.
+    extraction_tokens = list(
+        _tokenize_with_lowercase(
+            f" {delim} ".join(extraction_texts), self.segmenter
         )
     )
+    tokens_by_extraction: list[list[str]] = [[]]
+    for token in extraction_tokens:
+      if token == delim_tokens[0]:
+        tokens_by_extraction.append([])
+      else:
+        tokens_by_extraction[-1].append(token)
 
     self._set_seqs(source_tokens, extraction_tokens)
 
     index_to_extraction_group = {}
+    index_to_extraction_tokens = {}
     extraction_index = 0
+    extraction_text_tokens_iter = iter(tokens_by_extraction)
     for group_index, group in enumerate(extraction_groups):
       logging.debug(
           "Processing extraction group %d with %d extractions.",
@@ -781,24 +1230,14 @@ class WordAligner:
           len(group),
       )
       for extraction in group:
-        # Validate delimiter doesn't appear in extraction text
-        if delim in extraction.extraction_text:
-          raise ValueError(
-              f"Delimiter {delim!r} appears inside extraction text"
-              f" {extraction.extraction_text!r}. This would corrupt alignment"
-              " mapping."
-          )
-
         index_to_extraction_group[extraction_index] = (extraction, group_index)
-        extraction_text_tokens = list(
-            _tokenize_with_lowercase(extraction.extraction_text)
-        )
+        extraction_text_tokens = next(extraction_text_tokens_iter)
+        index_to_extraction_tokens[extraction_index] = extraction_text_tokens
         extraction_index += len(extraction_text_tokens) + delim_len
 
     aligned_extraction_groups: list[list[data.Extraction]] = [
         [] for _ in extraction_groups
     ]
-    tokenized_text = tokenizer.tokenize(source_text)
 
     # Track which extractions were aligned in the exact matching phase
     aligned_extractions = []
@@ -822,22 +1261,18 @@ class WordAligner:
       )
 
       try:
-        start_token = tokenized_text.tokens[i]
-        end_token = tokenized_text.tokens[i + n - 1]
         extraction.char_interval = data.CharInterval(
-            start_pos=char_offset + start_token.char_interval.start_pos,
-            end_pos=char_offset + end_token.char_interval.end_pos,
+            start_pos=char_offset + tokenized_text.starts[token_start + i],
+            end_pos=char_offset + tokenized_text.ends[token_start + i + n - 1],
         )
       except IndexError as e:
         raise IndexError(
             "Failed to align extraction with source text. Extraction token"
             f" interval {extraction.token_interval} does not match source text"
-            f" tokens {tokenized_text.tokens}."
+            f" tokens {tokenized_text.tokens[token_start:token_end]}."
         ) from e
 
-      extraction_text_len = len(
-          list(_tokenize_with_lowercase(extraction.extraction_text))
-      )
+      extraction_text_len = len(index_to_extraction_tokens[j])
       if extraction_text_len < n:
         raise ValueError(
             "Delimiter prevents blocks greater than extraction length: "
@@ -861,9 +1296,9 @@ class WordAligner:
 
     # Collect unaligned extractions
     unaligned_extractions = []
-    for extraction, _ in index_to_extraction_group.values():
+    for index, (extraction, _) in index_to_extraction_group.items():
       if extraction not in aligned_extractions:
-        unaligned_extractions.append(extraction)
+        unaligned_extractions.append((extraction, index))
 
     # Apply fuzzy alignment to remaining extractions
     if enable_fuzzy_alignment and unaligned_extractions:
@@ -871,7 +1306,10 @@ class WordAligner:
           "Starting fuzzy alignment for %d unaligned extractions",
           len(unaligned_extractions),
       )
-      for extraction in unaligned_extractions:
+      token_positions = _index_token_positions(
+          [_normalize_token(t) for t in source_tokens]
+      )
+      for extraction, index in unaligned_extractions:
         aligned_extraction = self._fuzzy_align_extraction(
             extraction,
             source_tokens,
@@ -879,6 +1317,10 @@ class WordAligner:
             token_offset,
             char_offset,
             fuzzy_alignment_threshold,
+            max_window=fuzzy_alignment_max_window,
+            token_positions=token_positions,
+            extraction_tokens=index_to_extraction_tokens[index],
+            token_start=token_start,
         )
         if aligned_extraction:
           aligned_extractions.append(aligned_extraction)
@@ -896,7 +1338,9 @@ class WordAligner:
     return aligned_extraction_groups
 
 
-def _tokenize_with_lowercase(text: str) -> Iterator[str]:
+def _tokenize_with_lowercase(
+    text: str, segmenter: tokenizer.Segmenter | None = None
+) -> Iterator[str]:
   """Extract and lowercase tokens from the input text into words.
 
   This function utilizes the tokenizer module to tokenize text and yields
@@ -904,18 +1348,150 @@ def _tokenize_with_lowercase(text: str) -> Iterator[str]:
 
   Args:
     text (str): The text to be tokenized.
+    segmenter: Optional CJK word segmenter passed to the tokenizer.
 
   Yields:
     Iterator[str]: An iterator over tokenized words.
   """
-  tokenized_pb2 = tokenizer.tokenize(text)
-  original_text = tokenized_pb2.text
-  for token in tokenized_pb2.tokens:
-    start = token.char_interval.start_pos
-    end = token.char_interval.end_pos
-    token_str = original_text[start:end]
-    token_str = token_str.lower()
-    yield token_str
+  tokenized = tokenizer.tokenize_cached(text, segmenter)
+  yield from _lowercase_tokens(tokenized, 0, len(tokenized.starts))
+
+
+def _lowercase_tokens(
+    tokenized_text: tokenizer.TokenizedText, start_index: int, end_index: int
+) -> list[str]:
+  """Returns the lowercased text of tokens [start_index, end_index)."""
+  text = tokenized_text.text
+  return [
+      text[start:end].lower()
+      for start, end in zip(
+          tokenized_text.starts[start_index:end_index],
+          tokenized_text.ends[start_index:end_index],
+      )
+  ]
+
+
+def _index_token_positions(tokens: Sequence[str]) -> dict[str, list[int]]:
+  """Maps each distinct token to the ascending positions where it occurs."""
+  positions = collections.defaultdict(list)
+  for i, token in enumerate(tokens):
+    positions[token].append(i)
+  return positions
+
+
+def _find_best_fuzzy_window(
+    source_tokens: Sequence[str],
+    token_positions: Mapping[str, Sequence[int]],
+    extraction_tokens: Sequence[str],
+    threshold: float,
+    max_window: int | None = None,
+) -> tuple[int, int] | None:
+  """Finds the source window that best fuzzy-matches the extraction tokens.
+
+  Equivalent to scoring every window of at least `len(extraction_tokens)`
+  tokens with SequenceMatcher and keeping the first window, by ascending size
+  then start, with the highest match count.
+
+  Args:
+    source_tokens: Normalized source tokens.
+    token_positions: Positions of each token in `source_tokens`.
+    extraction_tokens: Normalized extraction tokens.
+    threshold: Minimum ratio of matched extraction tokens to accept a window.
+    max_window: Maximum window size in tokens. If None, defaults to
+      `_FUZZY_ALIGNMENT_WINDOW_FACTOR` times the extraction's token count:
+      every extraction token pair can become a candidate window, so without a
+      cap the work grows quadratically with the number of hits in the chunk.
+
+  Returns:
+    The (start_index, window_size) of the best window, or None if no window
+    meets the threshold.
+  """
+  len_e = len(extraction_tokens)
+  if max_window is None:
+    max_window = _FUZZY_ALIGNMENT_WINDOW_FACTOR * len_e
+  max_size = min(len(source_tokens), max(len_e, max_window))
+  if not len_e or len_e > max_size:
+    return None
+
+  min_matches = next(
+      (m for m in range(1, len_e + 1) if m / len_e >= threshold), None
+  )
+  if min_matches is None:
+    return None
+
+  extraction_counts = collections.Counter(extraction_tokens)
+  hits = sorted(
+      itertools.chain.from_iterable(
+          token_positions.get(token, ()) for token in extraction_counts
+      )
+  )
+  if len(hits) < min_matches:
+    return None
+
+  # Candidate windows as (size, start), bucketed by their token-count
+  # intersection with the extraction, an upper bound on the match count.
+  candidates: dict[int, list[tuple[int, int]]] = collections.defaultdict(list)
+
+  # Windows of exactly the extraction length, slid across the source.
+  window_counts = collections.Counter()
+  overlap = 0
+  for end, token in enumerate(source_tokens):
+    if token in extraction_counts:
+      window_counts[token] += 1
+      if window_counts[token] <= extraction_counts[token]:
+        overlap += 1
+    start = end - len_e + 1
+    if start > 0:
+      old_token = source_tokens[start - 1]
+      if old_token in extraction_counts:
+        if window_counts[old_token] <= extraction_counts[old_token]:
+          overlap -= 1
+        window_counts[old_token] -= 1
+    if start >= 0 and overlap >= min_matches:
+      candidates[overlap].append((len_e, start))
+
+  # Longer windows only win if they start and end on a hit.
+  for left_index, left in enumerate(hits):
+    if len(hits) - left_index < min_matches:
+      break
+    window_counts.clear()
+    overlap = 0
+    for right in itertools.islice(hits, left_index, None):
+      size = right - left + 1
+      if size > max_size:
+        break
+      token = source_tokens[right]
+      window_counts[token] += 1
+      if window_counts[token] <= extraction_counts[token]:
+        overlap += 1
+      if size > len_e and overlap >= min_matches:
+        candidates[overlap].append((size, left))
+
+  matcher = difflib.SequenceMatcher(autojunk=False, b=extraction_tokens)
+  best_matches = 0
+  best_span: tuple[int, int] | None = None  # (window_size, start_idx)
+  for overlap in sorted(candidates, reverse=True):
+    if overlap < best_matches:
+      break
+    for span in sorted(candidates[overlap]):
+      if overlap == best_matches and span >= best_span:
+        break
+      size, start = span
+      matcher.set_seq1(source_tokens[start : start + size])
+      matches = sum(n for _, _, n in matcher.get_matching_blocks())
+      if matches > best_matches or (
+          matches == best_matches and best_span is not None and span < best_span
+      ):
+        best_matches = matches
+        best_span = span
+      if matches == overlap:
+        # Later spans in this bucket are larger and cannot score higher.
+        break
+
+  if best_span is None or best_matches / len_e < threshold:
+    return None
+  size, start = best_span
+  return start, size
 
 
 @functools.lru_cache(maxsize=10000)
@@ -0,0 +1,178 @@
+# Copyright 2025 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Retry policies for individual chunks of an annotation run.
+
+`Annotator` retries a failed chunk on its own rather than the whole document:
+only the prompts that failed are sent again, after a jittered exponential
+backoff. `classify_error` sorts failures into rate limits, server errors,
+timeouts and unparseable model output, and a `RetryPolicy` decides which of
+those are worth another attempt. Other errors, such as authentication
+failures or bad requests, fail immediately.
+
+Example usage:
+  policy = retry.RetryPolicy(max_attempts=4, initial_backoff_seconds=2.0)
+  result = lx.extract(..., retry_policy=policy, allow_partial_documents=True)
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import enum
+import random
+import re
+
+import requests
+
+from langextract import resolver as resolver_lib
+
+# Matches an HTTP status code in error messages, e.g. "429 Client Error",
+# "503 UNAVAILABLE" or "Error code: 502". The surrounding words keep numbers
+# in echoed prompts from matching.
+_STATUS_CODE_PATTERN = re.compile(
+    r"\b(429|5\d\d)\s+(?:client |server )?(?:error|unavailable|internal"
+    r"|bad gateway|service unavailable|gateway timeout|too many requests"
+    r"|resource.?exhausted)\b|\b(?:status|code)\s*[:=]?\s*(429|5\d\d)\b",
+    re.IGNORECASE,
+)
+_RATE_LIMIT_PATTERN = re.compile(
+    r"rate.?limit|too many requests|resource.?exhausted|quota", re.IGNORECASE
+)
+_TIMEOUT_PATTERN = re.compile(r"timed? ?out|timeout", re.IGNORECASE)
+
+
+class FailureKind(enum.Enum):
+  """Kinds of chunk failures that may succeed when retried."""
+
+  RATE_LIMIT = "rate_limit"
+  SERVER_ERROR = "server_error"
+  TIMEOUT = "timeout"
+  PARSE_ERROR = "parse_error"
+
+
+def _error_chain(error: BaseException) -> list[BaseException]:
+  """Returns `error` and the exceptions it was raised from, outermost first."""
+  chain = []
+  while error is not None and error not in chain:
+    chain.append(error)
+    error = error.__cause__ or error.__context__
+  return chain
+
+
+def classify_error(error: BaseException) -> FailureKind | None:
+  """Returns the kind of a chunk failure, or None if it is not transient.
+
+  Model wrappers re-raise client errors, so the whole exception chain is
+  inspected for exception types and HTTP responses. Failing that, the message
+  of the root cause is searched for status codes; outer messages are not,
+  since they may quote the prompt.
+
+  Args:
+    error: The exception raised while annotating a chunk.
+
+  Returns:
+    The failure kind, or None for errors that a retry would not fix.
+  """
+  chain = _error_chain(error)
+  for cause in chain:
+    if isinstance(cause, resolver_lib.ResolverParsingError):
+      return FailureKind.PARSE_ERROR
+    response = getattr(cause, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if isinstance(status_code, int):
+      if status_code == 429:
+        return FailureKind.RATE_LIMIT
+      if status_code >= 500:
+        return FailureKind.SERVER_ERROR
+      return None
+    if isinstance(cause, (requests.exceptions.Timeout, TimeoutError)):
+      return FailureKind.TIMEOUT
+
+  root_cause = chain[-1]
+  if isinstance(root_cause, requests.exceptions.ConnectionError):
+    return FailureKind.SERVER_ERROR
+  message = str(root_cause)
+  match = _STATUS_CODE_PATTERN.search(message)
+  if match:
+    if "429" in match.groups():
+      return FailureKind.RATE_LIMIT
+    return FailureKind.SERVER_ERROR
+  if _RATE_LIMIT_PATTERN.search(message):
+    return FailureKind.RATE_LIMIT
+  if _TIMEOUT_PATTERN.search(message):
+    return FailureKind.TIMEOUT
+  return None
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+  """How often and how long to wait before retrying a failed chunk.
+
+  The wait before attempt n + 1 is drawn uniformly from
+  [(1 - jitter) * d, d], where d is initial_backoff_seconds *
+  backoff_multiplier ** (n - 1), capped at max_backoff_seconds. Rate limits
+  wait at least rate_limit_backoff_seconds before jitter, since the server
+  asked the client to slow down.
+
+  Attributes:
+    max_attempts: Attempts per chunk, including the first. Inference and
+      parse failures share this budget.
+    initial_backoff_seconds: Wait before the second attempt.
+    backoff_multiplier: Factor by which the wait grows with each attempt.
+    max_backoff_seconds: Upper bound on a single wait.
+    rate_limit_backoff_seconds: Lower bound on the wait after a rate limit.
+    jitter: Fraction of each wait that is randomized, between 0 and 1, so
+      that chunks that failed together do not retry together.
+    retry_on: Failure kinds that are retried.
+  """
+
+  max_attempts: int = 3
+  initial_backoff_seconds: float = 1.0
+  backoff_multiplier: float = 2.0
+  max_backoff_seconds: float = 60.0
+  rate_limit_backoff_seconds: float = 5.0
+  jitter: float = 0.5
+  retry_on: frozenset[FailureKind] = frozenset(FailureKind)
+
+  def __post_init__(self):
+    if self.max_attempts < 1:
+      raise ValueError("max_attempts must be at least 1.")
+    if self.initial_backoff_seconds < 0 or self.max_backoff_seconds < 0:
+      raise ValueError("Backoff seconds must be non-negative.")
+    if self.backoff_multiplier < 1:
+      raise ValueError("backoff_multiplier must be at least 1.")
+    if not 0 <= self.jitter <= 1:
+      raise ValueError("jitter must be between 0 and 1.")
+    object.__setattr__(self, "retry_on", frozenset(self.retry_on))
+
+  def should_retry(self, error: BaseException, attempt: int) -> bool:
+    """Returns whether a chunk that failed on `attempt` (from 1) is retried."""
+    if attempt >= self.max_attempts:
+      return False
+    return classify_error(error) in self.retry_on
+
+  def backoff_seconds(
+      self, attempt: int, kind: FailureKind | None = None
+  ) -> float:
+    """Returns how long to wait after a chunk failed on `attempt` (from 1)."""
+    delay = self.initial_backoff_seconds * self.backoff_multiplier ** (
+        attempt - 1
+    )
+    if kind is FailureKind.RATE_LIMIT:
+      delay = max(delay, self.rate_limit_backoff_seconds)
+    delay = min(delay, self.max_backoff_seconds)
+    return delay * (1 - self.jitter * random.random())
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
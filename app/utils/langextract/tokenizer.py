@@ -20,18 +20,32 @@ between extracted data and the source text in resolver.py. (2) Tokenization
 is also used in forming sentence boundaries for LLM information extraction for
 smaller context use cases. These smaller context use cases are less necessary,
 with newer larger context LLMs. This module is not used within the language
-model to represent tokens during inference.
+model to represent tokens during inference. `tokenize_cached` shares results
+for repeated texts through a bounded `TokenizationCache`.
 """
 
-from collections.abc import Sequence, Set
+import array
+import bisect
+import collections
+from collections.abc import Callable, Iterable, Iterator, Sequence, Set
 import dataclasses
 import enum
+import hashlib
+import itertools
+import math
 import re
+import sys
+import threading
 
 from absl import logging
 
 from langextract import exceptions
 
+# Array type codes of the token columns: 64-bit character positions, and
+# 8-bit token types and newline flags.
+_POSITION_TYPECODE = "q"
+_FLAG_TYPECODE = "b"
+
 
 class BaseTokenizerError(exceptions.LangExtractError):
   """Base class for all tokenizer-related errors."""
@@ -45,6 +59,14 @@ class SentenceRangeError(BaseTokenizerError):
   """Error raised when the start token index for a sentence is out of range."""
 
 
+class SegmenterError(BaseTokenizerError):
+  """Error raised when a CJK segmenter returns words that do not cover its input."""
+
+
+class ReadOnlyTokenizedTextError(BaseTokenizerError):
+  """Error raised when a shared, read-only `TokenizedText` is modified."""
+
+
 @dataclasses.dataclass
 class CharInterval:
   """Represents a range of character positions in the original text.
@@ -82,12 +104,14 @@ class TokenType(enum.IntEnum):
     NUMBER: Represents a numeric token.
     PUNCTUATION: Represents punctuation characters.
     ACRONYM: Represents an acronym or slash-delimited abbreviation.
+    CJK: Represents a CJK character or, when a segmenter is used, a CJK word.
   """
 
   WORD = 0
   NUMBER = 1
   PUNCTUATION = 2
   ACRONYM = 3
+  CJK = 4
 
 
 @dataclasses.dataclass
@@ -119,30 +143,244 @@ class Token:
   first_token_after_newline: bool = False
 
 
-@dataclasses.dataclass
+class TokenSequence(Sequence[Token]):
+  """A read-only sequence of `Token` views over the columns of a text.
+
+  Tokens are created on access, so changing one does not change the
+  `TokenizedText` it came from.
+  """
+
+  __slots__ = ("_tokenized_text",)
+
+  def __init__(self, tokenized_text: "TokenizedText"):
+    self._tokenized_text = tokenized_text
+
+  def __len__(self) -> int:
+    return len(self._tokenized_text.starts)
+
+  def _token(self, index: int) -> Token:
+    tokenized = self._tokenized_text
+    return Token(
+        index=index,
+        token_type=TokenType(tokenized.types[index]),
+        char_interval=CharInterval(
+            start_pos=tokenized.starts[index], end_pos=tokenized.ends[index]
+        ),
+        first_token_after_newline=bool(tokenized.after_newline[index]),
+    )
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self._token(i) for i in range(*index.indices(len(self)))]
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("token index out of range")
+    return self._token(index)
+
+  def __eq__(self, other) -> bool:
+    if isinstance(other, (TokenSequence, list, tuple)):
+      return len(self) == len(other) and all(
+          a == b for a, b in zip(self, other)
+      )
+    return NotImplemented
+
+  def __repr__(self) -> str:
+    return repr(list(self))
+
+
 class TokenizedText:
   """Holds the result of tokenizing a text string.
 
+  Tokens are stored column-wise, in one compact array per attribute, which
+  takes a few bytes per token instead of three objects. `tokens` presents
+  them as `Token` objects for compatibility; code that walks many tokens
+  should read the columns.
+
   Attributes:
     text: The original text that was tokenized.
-    tokens: A list of Token objects extracted from the text.
+    starts: Start character position of each token.
+    ends: End character position (exclusive) of each token.
+    types: `TokenType` value of each token.
+    after_newline: 1 for each token that follows a newline, else 0.
+    read_only: Whether the object is shared, e.g. by a `TokenizationCache`.
+      Appending, replacing the tokens or assigning attributes then raises
+      `ReadOnlyTokenizedTextError`; `copy()` returns a modifiable copy.
   """
 
-  text: str
-  tokens: list[Token] = dataclasses.field(default_factory=list)
+  __slots__ = (
+      "text",
+      "starts",
+      "ends",
+      "types",
+      "after_newline",
+      "_sentence_ends",
+      "_read_only",
+  )
 
+  def __init__(self, text: str, tokens: Iterable[Token] = ()):
+    """Initializes the tokenized text.
+
+    Args:
+      text: The original text.
+      tokens: Optional tokens of `text`, in order.
+    """
+    self._read_only = False
+    self.text = text
+    self.tokens = tokens
+
+  def __setattr__(self, name: str, value) -> None:
+    if name != "_sentence_ends" and getattr(self, "_read_only", False):
+      raise ReadOnlyTokenizedTextError(
+          f"Cannot set {name} of a shared TokenizedText; modify a copy()."
+      )
+    object.__setattr__(self, name, value)
+
+  @property
+  def read_only(self) -> bool:
+    return self._read_only
+
+  def make_read_only(self) -> None:
+    """Marks the object as shared, so that it can no longer be modified."""
+    object.__setattr__(self, "_read_only", True)
+
+  def copy(self) -> "TokenizedText":
+    """Returns a modifiable copy with its own token columns."""
+    copied = TokenizedText(self.text)
+    copied.starts = array.array(_POSITION_TYPECODE, self.starts)
+    copied.ends = array.array(_POSITION_TYPECODE, self.ends)
+    copied.types = array.array(_FLAG_TYPECODE, self.types)
+    copied.after_newline = array.array(_FLAG_TYPECODE, self.after_newline)
+    copied._sentence_ends = self._sentence_ends
+    return copied
+
+  def append(
+      self,
+      start_pos: int,
+      end_pos: int,
+      token_type: TokenType,
+      first_token_after_newline: bool = False,
+  ) -> None:
+    """Appends a token spanning text[start_pos:end_pos].
+
+    Raises:
+      ReadOnlyTokenizedTextError: If the object is read-only.
+    """
+    if self._read_only:
+      raise ReadOnlyTokenizedTextError(
+          "Cannot append to a shared TokenizedText; modify a copy()."
+      )
+    self.starts.append(start_pos)
+    self.ends.append(end_pos)
+    self.types.append(token_type)
+    self.after_newline.append(first_token_after_newline)
+    self._sentence_ends = None
+
+  @property
+  def tokens(self) -> TokenSequence:
+    """The tokens, as `Token` views."""
+    return TokenSequence(self)
+
+  @tokens.setter
+  def tokens(self, tokens: Iterable[Token]) -> None:
+    self.starts = array.array(_POSITION_TYPECODE)
+    self.ends = array.array(_POSITION_TYPECODE)
+    self.types = array.array(_FLAG_TYPECODE)
+    self.after_newline = array.array(_FLAG_TYPECODE)
+    self._sentence_ends = None
+    for token in tokens:
+      self.append(
+          token.char_interval.start_pos,
+          token.char_interval.end_pos,
+          token.token_type,
+          token.first_token_after_newline,
+      )
+
+  def token_text(self, index: int) -> str:
+    """Returns the text of the token at `index`."""
+    return self.text[self.starts[index] : self.ends[index]]
+
+  def sentence_ends(self) -> array.array:
+    """Returns the sorted indices one past the last token of each sentence.
+
+    Whether a token ends a sentence does not depend on where the sentence
+    started, so the boundaries are found once, on first use, and kept with
+    the tokens. Appending tokens discards them. The end of the text is
+    included only if its last token ends a sentence.
+    """
+    if self._sentence_ends is None:
+      self._sentence_ends = _find_sentence_ends(self)
+    return self._sentence_ends
+
+  def sentence_end(self, token_index: int) -> int:
+    """Returns the end of the sentence containing the token at `token_index`."""
+    sentence_ends = self.sentence_ends()
+    i = bisect.bisect_right(sentence_ends, token_index)
+    return sentence_ends[i] if i < len(sentence_ends) else len(self.starts)
+
+  def __eq__(self, other) -> bool:
+    if not isinstance(other, TokenizedText):
+      return NotImplemented
+    return (
+        self.text == other.text
+        and self.starts == other.starts
+        and self.ends == other.ends
+        and self.types == other.types
+        and self.after_newline == other.after_newline
+    )
+
+  def __repr__(self) -> str:
+    return (
+        f"TokenizedText(text={self.text!r}, tokens={len(self.starts)} tokens)"
+    )
+
+  def __getstate__(self):
+    # The sentence index is rebuilt on demand rather than pickled, and an
+    # unpickled copy is not shared.
+    return {
+        name: getattr(self, name)
+        for name in self.__slots__
+        if name not in ("_sentence_ends", "_read_only")
+    }
+
+  def __setstate__(self, state) -> None:
+    self._read_only = False
+    self._sentence_ends = None
+    for name, value in state.items():
+      setattr(self, name, value)
+
+
+# Splits a run of CJK characters into words. The returned words must
+# concatenate back to the input run (e.g. `jieba.lcut`).
+Segmenter = Callable[[str], Iterable[str]]
 
 # Regex patterns for tokenization.
 _LETTERS_PATTERN = r"[A-Za-z]+"
 _DIGITS_PATTERN = r"[0-9]+"
-_SYMBOLS_PATTERN = r"[^A-Za-z0-9\s]+"
+# Han ideographs (incl. extensions and compatibility forms) and kana.
+_CJK_CHARS = (
+    "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+    "\U00020000-\U0002fa1f"
+)
+_CJK_PATTERN = rf"[{_CJK_CHARS}]+"
+_SYMBOLS_PATTERN = rf"[^A-Za-z0-9\s{_CJK_CHARS}]+"
 _END_OF_SENTENCE_PATTERN = re.compile(r"[.?!]$")
+# Full-width terminators may be followed by closing quotes or brackets.
+_CJK_END_OF_SENTENCE_PATTERN = re.compile(r"[。！？；][”’」』）》]*$")
 _SLASH_ABBREV_PATTERN = r"[A-Za-z0-9]+(?:/[A-Za-z0-9]+)+"
 
+# One alternative per token type, tried in order, so a match's type is the
+# name of its group.
 _TOKEN_PATTERN = re.compile(
-    rf"{_SLASH_ABBREV_PATTERN}|{_LETTERS_PATTERN}|{_DIGITS_PATTERN}|{_SYMBOLS_PATTERN}"
+    rf"(?P<ACRONYM>{_SLASH_ABBREV_PATTERN})|(?P<WORD>{_LETTERS_PATTERN})"
+    rf"|(?P<NUMBER>{_DIGITS_PATTERN})|(?P<CJK>{_CJK_PATTERN})"
+    rf"|(?P<PUNCTUATION>{_SYMBOLS_PATTERN})"
 )
-_WORD_PATTERN = re.compile(rf"(?:{_LETTERS_PATTERN}|{_DIGITS_PATTERN})\Z")
+# Token type values by group name, as plain ints for the token columns.
+_TOKEN_TYPE_BY_GROUP = {
+    token_type.name: int(token_type) for token_type in TokenType
+}
+_CJK_TYPE = int(TokenType.CJK)
 
 # Known abbreviations that should not count as sentence enders.
 # TODO: This can potentially be removed given most use cases
@@ -150,52 +388,306 @@ _WORD_PATTERN = re.compile(rf"(?:{_LETTERS_PATTERN}|{_DIGITS_PATTERN})\Z")
 _KNOWN_ABBREVIATIONS = frozenset({"Mr.", "Mrs.", "Ms.", "Dr.", "Prof.", "St."})
 
 
-def tokenize(text: str) -> TokenizedText:
-  """Splits text into tokens (words, digits, or punctuation).
+def _segment_cjk_run(
+    run: str, segmenter: Segmenter | None
+) -> Iterator[tuple[int, int]]:
+  """Yields (start, end) offsets of the words in a run of CJK characters.
+
+  Args:
+    run: A run of consecutive CJK characters.
+    segmenter: Optional word segmenter. If None, every character is a word.
+
+  Yields:
+    Offsets relative to the start of `run`.
+
+  Raises:
+    SegmenterError: If the segmenter output does not reproduce `run`.
+  """
+  if segmenter is None:
+    for i in range(len(run)):
+      yield i, i + 1
+    return
+
+  pos = 0
+  for word in segmenter(run):
+    if not word:
+      continue
+    if not run.startswith(word, pos):
+      raise SegmenterError(
+          f"Segmenter returned {word!r} at offset {pos}, which does not match"
+          f" the input run {run!r}."
+      )
+    yield pos, pos + len(word)
+    pos += len(word)
+  if pos != len(run):
+    raise SegmenterError(
+        f"Segmenter output covers {pos} of {len(run)} characters of {run!r}."
+    )
+
+
+def tokenize(text: str, segmenter: Segmenter | None = None) -> TokenizedText:
+  """Splits text into tokens (words, digits, CJK characters or punctuation).
 
   Each token is annotated with its character position and type (WORD or
   PUNCTUATION). If there is a newline or carriage return in the gap before
   a token, that token's `first_token_after_newline` is set to True.
 
+  Runs of CJK characters are not space-delimited, so they are split into one
+  CJK token per character, or into words when a `segmenter` is given.
+
+  Tokens are found and classified in a single regex pass, by the named group
+  they match, and newlines are located by offset rather than by slicing the
+  gaps between tokens.
+
   Args:
     text: The text to tokenize.
+    segmenter: Optional callable that splits a run of CJK characters into
+      words, e.g. `jieba.lcut`. Defaults to one token per character.
 
   Returns:
     A TokenizedText object containing all extracted tokens.
+
+  Raises:
+    SegmenterError: If `segmenter` returns words that do not reproduce its
+      input.
   """
-  logging.debug("Entering tokenize() with text:\n%r", text)
+  if logging.level_debug():
+    logging.debug("Entering tokenize() with text:\n%r", text)
   tokenized = TokenizedText(text=text)
-  previous_end = 0
-  for token_index, match in enumerate(_TOKEN_PATTERN.finditer(text)):
+  starts, ends = tokenized.starts, tokenized.ends
+  types, after_newlines = tokenized.types, tokenized.after_newline
+  # Gaps between tokens hold only whitespace, so a token follows a newline if
+  # the next "\n" or "\r" after the previous token comes before it.
+  next_newline = next_return = -1
+  previous_end = None
+  for match in _TOKEN_PATTERN.finditer(text):
     start_pos, end_pos = match.span()
-    matched_text = match.group()
-    # Create a new token.
-    token = Token(
-        index=token_index,
-        char_interval=CharInterval(start_pos=start_pos, end_pos=end_pos),
-        token_type=TokenType.WORD,
-        first_token_after_newline=False,
-    )
-    # Check if there's a newline in the gap before this token.
-    if token_index > 0:
-      gap = text[previous_end:start_pos]
-      if "\n" in gap or "\r" in gap:
-        token.first_token_after_newline = True
-    # Classify token type.
-    if re.fullmatch(_DIGITS_PATTERN, matched_text):
-      token.token_type = TokenType.NUMBER
-    elif re.fullmatch(_SLASH_ABBREV_PATTERN, matched_text):
-      token.token_type = TokenType.ACRONYM
-    elif _WORD_PATTERN.fullmatch(matched_text):
-      token.token_type = TokenType.WORD
-    else:
-      token.token_type = TokenType.PUNCTUATION
-    tokenized.tokens.append(token)
+    after_newline = False
+    if previous_end is not None and previous_end < start_pos:
+      if next_newline < previous_end:
+        next_newline = _find_or_end(text, "\n", previous_end)
+      if next_return < previous_end:
+        next_return = _find_or_end(text, "\r", previous_end)
+      after_newline = min(next_newline, next_return) < start_pos
     previous_end = end_pos
-  logging.debug("Completed tokenize(). Total tokens: %d", len(tokenized.tokens))
+
+    token_type = _TOKEN_TYPE_BY_GROUP[match.lastgroup]
+    if token_type == _CJK_TYPE and segmenter is None:
+      # One token per character.
+      count = end_pos - start_pos
+      starts.extend(range(start_pos, end_pos))
+      ends.extend(range(start_pos + 1, end_pos + 1))
+      types.extend(itertools.repeat(_CJK_TYPE, count))
+      after_newlines.append(after_newline)
+      after_newlines.extend(itertools.repeat(False, count - 1))
+    elif token_type == _CJK_TYPE:
+      for word_start, word_end in _segment_cjk_run(match.group(), segmenter):
+        tokenized.append(
+            start_pos + word_start,
+            start_pos + word_end,
+            TokenType.CJK,
+            after_newline,
+        )
+        after_newline = False
+    else:
+      starts.append(start_pos)
+      ends.append(end_pos)
+      types.append(token_type)
+      after_newlines.append(after_newline)
+  logging.debug("Completed tokenize(). Total tokens: %d", len(starts))
   return tokenized
 
 
+def estimate_tokens(text: str) -> int:
+  """Roughly estimates the number of model tokens in `text`.
+
+  Counts four ASCII characters, or one other character (e.g. a CJK
+  character), per token.
+  """
+  ascii_chars = len(text.encode("ascii", "ignore"))
+  return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def _find_or_end(text: str, sub: str, start: int) -> int:
+  """Returns the first index of `sub` in text[start:], or len(text)."""
+  index = text.find(sub, start)
+  return len(text) if index < 0 else index
+
+
+@dataclasses.dataclass
+class TokenizationCacheStats:
+  """Counters for a `TokenizationCache`.
+
+  Attributes:
+    hits: Lookups answered from the cache.
+    misses: Lookups that tokenized the text.
+    evictions: Entries dropped to stay within the memory limit.
+  """
+
+  hits: int = 0
+  misses: int = 0
+  evictions: int = 0
+
+  @property
+  def hit_rate(self) -> float:
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+
+def _tokenized_nbytes(tokenized: TokenizedText) -> int:
+  """Returns the memory held by `tokenized`: its text and token columns."""
+  return sys.getsizeof(tokenized.text) + sum(
+      sys.getsizeof(column)
+      for column in (
+          tokenized.starts,
+          tokenized.ends,
+          tokenized.types,
+          tokenized.after_newline,
+      )
+  )
+
+
+class TokenizationCache:
+  """An LRU cache of `tokenize` results, bounded by memory.
+
+  Entries are keyed on a hash of the text and on the segmenter, so equal
+  texts share one `TokenizedText` whichever string object holds them. The
+  returned objects are shared between callers and therefore read-only; use
+  `TokenizedText.copy()` to modify one.
+
+  Safe to share between threads. Texts being tokenized are not locked, so
+  two threads may occasionally tokenize the same new text; the first result
+  stored is kept.
+  """
+
+  def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+    """Initializes the cache.
+
+    Args:
+      max_bytes: Approximate memory limit of the cached texts and token
+        columns. Least recently used entries are evicted first; a single text
+        larger than the limit is tokenized but not kept.
+
+    Raises:
+      ValueError: If max_bytes is negative.
+    """
+    if max_bytes < 0:
+      raise ValueError("max_bytes must be non-negative.")
+    self.max_bytes = max_bytes
+    self.stats = TokenizationCacheStats()
+    self._lock = threading.Lock()
+    # Maps key to (size in bytes, tokenized text), most recently used last.
+    self._entries: collections.OrderedDict[
+        tuple[bytes, Segmenter | None], tuple[int, TokenizedText]
+    ] = collections.OrderedDict()
+    self._nbytes = 0
+
+  @staticmethod
+  def _key(
+      text: str, segmenter: Segmenter | None
+  ) -> tuple[bytes, Segmenter | None]:
+    digest = hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+    return digest, segmenter
+
+  def tokenize(
+      self, text: str, segmenter: Segmenter | None = None
+  ) -> TokenizedText:
+    """Returns `tokenize(text, segmenter)`, from the cache when possible."""
+    key = self._key(text, segmenter)
+    with self._lock:
+      entry = self._entries.get(key)
+      # Comparing the text rules out hash collisions at memcmp speed.
+      if entry is not None and entry[1].text == text:
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+      self.stats.misses += 1
+
+    tokenized = tokenize(text, segmenter)
+    tokenized.make_read_only()
+    size = _tokenized_nbytes(tokenized)
+    if size > self.max_bytes:
+      return tokenized
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and entry[1].text == text:
+        return entry[1]
+      if entry is not None:
+        self._nbytes -= entry[0]
+      self._entries[key] = (size, tokenized)
+      self._nbytes += size
+      while self._nbytes > self.max_bytes:
+        _, (evicted_size, _) = self._entries.popitem(last=False)
+        self._nbytes -= evicted_size
+        self.stats.evictions += 1
+    return tokenized
+
+  @property
+  def nbytes(self) -> int:
+    """Approximate memory held by the cached entries."""
+    with self._lock:
+      return self._nbytes
+
+  def clear(self) -> None:
+    """Removes all entries. Counters are kept."""
+    with self._lock:
+      self._entries.clear()
+      self._nbytes = 0
+
+  def __len__(self) -> int:
+    with self._lock:
+      return len(self._entries)
+
+
+_tokenization_cache: TokenizationCache | None = TokenizationCache()
+
+
+def get_tokenization_cache() -> TokenizationCache | None:
+  """Returns the cache used by `tokenize_cached`, or None if disabled."""
+  return _tokenization_cache
+
+
+def set_tokenization_cache(
+    cache: TokenizationCache | None,
+) -> TokenizationCache | None:
+  """Replaces the cache used by `tokenize_cached`.
+
+  Args:
+    cache: The new cache, or None to tokenize every call afresh.
+
+  Returns:
+    The previous cache.
+  """
+  global _tokenization_cache
+  previous, _tokenization_cache = _tokenization_cache, cache
+  return previous
+
+
+def tokenize_cached(
+    text: str, segmenter: Segmenter | None = None
+) -> TokenizedText:
+  """Tokenizes `text` through the process-wide `TokenizationCache`.
+
+  Documents, chunk alignment and extraction alignment tokenize through this
+  function, so repeated runs over the same text (extraction passes, retries,
+  separate extraction calls) tokenize it once. The result is shared and
+  read-only while the cache is enabled.
+
+  Args:
+    text: The text to tokenize.
+    segmenter: Optional CJK word segmenter, as for `tokenize`.
+
+  Returns:
+    The tokenized text.
+  """
+  cache = _tokenization_cache
+  if cache is None:
+    return tokenize(text, segmenter)
+  return cache.tokenize(text, segmenter)
+
+
 def tokens_text(
     tokenized_text: TokenizedText,
     token_interval: TokenInterval,
@@ -216,37 +708,44 @@ def tokens_text(
   """
   if (
       token_interval.start_index < 0
-      or token_interval.end_index > len(tokenized_text.tokens)
+      or token_interval.end_index > len(tokenized_text.starts)
       or token_interval.start_index >= token_interval.end_index
   ):
 
     raise InvalidTokenIntervalError(
         f"Invalid token interval. start_index={token_interval.start_index}, "
         f"end_index={token_interval.end_index}, "
-        f"total_tokens={len(tokenized_text.tokens)}."
+        f"total_tokens={len(tokenized_text.starts)}."
     )
 
-  start_token = tokenized_text.tokens[token_interval.start_index]
-  end_token = tokenized_text.tokens[token_interval.end_index - 1]
-  return tokenized_text.text[
-      start_token.char_interval.start_pos : end_token.char_interval.end_pos
-  ]
+  start_pos = tokenized_text.starts[token_interval.start_index]
+  end_pos = tokenized_text.ends[token_interval.end_index - 1]
+  return tokenized_text.text[start_pos:end_pos]
+
+
+def _token_columns(text: str, tokens: Sequence[Token]) -> TokenizedText:
+  """Returns the columns behind `tokens`, converting a plain token list."""
+  if isinstance(tokens, TokenSequence):
+    return tokens._tokenized_text  # pylint: disable=protected-access
+  return TokenizedText(text, tokens)
 
 
 def _is_end_of_sentence_token(
     text: str,
-    tokens: Sequence[Token],
+    tokenized: TokenizedText,
     current_idx: int,
     known_abbreviations: Set[str] = _KNOWN_ABBREVIATIONS,
 ) -> bool:
   """Checks if the punctuation token at `current_idx` ends a sentence.
 
   A token is considered a sentence terminator and is not part of a known
-  abbreviation. Only searches the text corresponding to the current token.
+  abbreviation. Full-width CJK terminators (。！？；) also end a sentence, even
+  when followed by closing quotes or brackets. Only searches the text
+  corresponding to the current token.
 
   Args:
     text: The entire input text.
-    tokens: The sequence of Token objects.
+    tokenized: The token columns of `text`.
     current_idx: The current token index to check.
     known_abbreviations: Abbreviations that should not count as sentence enders
       (e.g., "Dr.").
@@ -254,18 +753,13 @@ def _is_end_of_sentence_token(
   Returns:
     True if the token at `current_idx` ends a sentence, otherwise False.
   """
-  current_token_text = text[
-      tokens[current_idx]
-      .char_interval.start_pos : tokens[current_idx]
-      .char_interval.end_pos
-  ]
+  starts, ends = tokenized.starts, tokenized.ends
+  current_token_text = text[starts[current_idx] : ends[current_idx]]
+  if _CJK_END_OF_SENTENCE_PATTERN.search(current_token_text):
+    return True
   if _END_OF_SENTENCE_PATTERN.search(current_token_text):
     if current_idx > 0:
-      prev_token_text = text[
-          tokens[current_idx - 1]
-          .char_interval.start_pos : tokens[current_idx - 1]
-          .char_interval.end_pos
-      ]
+      prev_token_text = text[starts[current_idx - 1] : ends[current_idx - 1]]
       if f"{prev_token_text}{current_token_text}" in known_abbreviations:
         return False
     return True
@@ -274,7 +768,7 @@ def _is_end_of_sentence_token(
 
 def _is_sentence_break_after_newline(
     text: str,
-    tokens: Sequence[Token],
+    tokenized: TokenizedText,
     current_idx: int,
 ) -> bool:
   """Checks if there's a newline before the next token and if that next token starts uppercase.
@@ -282,36 +776,58 @@ def _is_sentence_break_after_newline(
   This is a heuristic for determining sentence boundaries. It favors terminating
   a sentence prematurely over missing a sentence boundary, and will terminate a
   sentence early if the first line ends with new line and the second line begins
-  with a capital letter.
+  with a capital letter. CJK scripts have no letter case, so a line beginning
+  with a CJK token is treated the same way.
 
   Args:
     text: The entire input text.
-    tokens: The sequence of Token objects.
+    tokenized: The token columns of `text`.
     current_idx: The current token index.
 
   Returns:
     True if a newline is found between current_idx and current_idx+1, and
     the next token (if any) begins with an uppercase character.
   """
-  if current_idx + 1 >= len(tokens):
+  starts, ends = tokenized.starts, tokenized.ends
+  if current_idx + 1 >= len(starts):
     return False
 
-  gap_text = text[
-      tokens[current_idx]
-      .char_interval.end_pos : tokens[current_idx + 1]
-      .char_interval.start_pos
-  ]
+  gap_text = text[ends[current_idx] : starts[current_idx + 1]]
   if "\n" not in gap_text:
     return False
 
-  next_token_text = text[
-      tokens[current_idx + 1]
-      .char_interval.start_pos : tokens[current_idx + 1]
-      .char_interval.end_pos
-  ]
+  if tokenized.types[current_idx + 1] == TokenType.CJK:
+    return True
+
+  next_token_text = text[starts[current_idx + 1] : ends[current_idx + 1]]
   return bool(next_token_text) and next_token_text[0].isupper()
 
 
+def _find_sentence_ends(tokenized: TokenizedText) -> array.array:
+  """Returns the indices one past each sentence-ending token, in order."""
+  text, types = tokenized.text, tokenized.types
+  punctuation = int(TokenType.PUNCTUATION)
+  sentence_ends = {
+      i + 1
+      for i in itertools.compress(
+          range(len(types)), map(punctuation.__eq__, types)
+      )
+      if _is_end_of_sentence_token(text, tokenized, i, _KNOWN_ABBREVIATIONS)
+  }
+  # A break after a newline needs a "\n" between two tokens.
+  starts, ends = tokenized.starts, tokenized.ends
+  position = text.find("\n")
+  while position >= 0:
+    next_token = bisect.bisect_right(starts, position)
+    if 0 < next_token < len(starts) and ends[next_token - 1] <= position:
+      if _is_sentence_break_after_newline(text, tokenized, next_token - 1):
+        sentence_ends.add(next_token)
+      # Skip the rest of the gap.
+      position = starts[next_token]
+    position = text.find("\n", position + 1)
+  return array.array(_POSITION_TYPECODE, sorted(sentence_ends))
+
+
 def find_sentence_range(
     text: str,
     tokens: Sequence[Token],
@@ -320,8 +836,9 @@ def find_sentence_range(
   """Finds a 'sentence' interval from a given start index.
 
   Sentence boundaries are defined by:
-    - punctuation tokens in _END_OF_SENTENCE_PATTERN
-    - newline breaks followed by an uppercase letter
+    - punctuation tokens in _END_OF_SENTENCE_PATTERN or
+      _CJK_END_OF_SENTENCE_PATTERN
+    - newline breaks followed by an uppercase letter or a CJK token
     - not abbreviations in _KNOWN_ABBREVIATIONS (e.g., "Dr.")
 
   This favors terminating a sentence prematurely over missing a sentence
@@ -330,7 +847,10 @@ def find_sentence_range(
 
   Args:
     text: The original text.
-    tokens: The tokens that make up `text`.
+    tokens: The tokens that make up `text`. The columns behind
+      `TokenizedText.tokens` are read directly, and their sentence boundaries
+      looked up in `TokenizedText.sentence_ends`; other sequences are
+      converted and scanned.
     start_token_index: The token index from which to begin the sentence.
 
   Returns:
@@ -347,13 +867,20 @@ def find_sentence_range(
         f"Total tokens: {len(tokens)}."
     )
 
+  tokenized = _token_columns(text, tokens)
+  if isinstance(tokens, TokenSequence) and tokenized.text is text:
+    return TokenInterval(
+        start_index=start_token_index,
+        end_index=tokenized.sentence_end(start_token_index),
+    )
+  types = tokenized.types
   i = start_token_index
-  while i < len(tokens):
-    if tokens[i].token_type == TokenType.PUNCTUATION:
-      if _is_end_of_sentence_token(text, tokens, i, _KNOWN_ABBREVIATIONS):
+  while i < len(types):
+    if types[i] == TokenType.PUNCTUATION:
+      if _is_end_of_sentence_token(text, tokenized, i, _KNOWN_ABBREVIATIONS):
         return TokenInterval(start_index=start_token_index, end_index=i + 1)
-    if _is_sentence_break_after_newline(text, tokens, i):
+    if _is_sentence_break_after_newline(text, tokenized, i):
       return TokenInterval(start_index=start_token_index, end_index=i + 1)
     i += 1
 
-  return TokenInterval(start_index=start_token_index, end_index=len(tokens))
+  return TokenInterval(start_index=start_token_index, end_index=len(types))